@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2017, Ivan Luchko and Project Contributors
+Licensed under the terms of the MIT License
+https://github.com/luchko/latticegraph_designer
+
+This module contains the batch conversion of CIF files into ALPS lattice
+graphs. Files are processed in parallel by a pool of worker processes.
+
+    def collect_files(paths, extension=".cif"):
+    def convert_cif(fileName, edges, atoms=None, ASSIGN_DIFF_TYPES=True):
+    def process_file(fileName, options):
+    def convert_batch(fileNames, edges, ...):
+
+Only the core module is imported.
+
+"""
+
+from __future__ import division
+
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from latticegraph_designer.app.core import ParseCIF, ExportXML, CrystalCluster
+
+
+def collect_files(paths, extension=".cif"):
+    '''
+    returns sorted list of files with given extension, directories are
+    searched recursively, files given explicitly are always included
+
+    '''
+    fileNames = []
+    for path in paths:
+        if os.path.isdir(path):
+            found = []
+            for root, dirs, files in os.walk(path):
+                found += [os.path.join(root, fn) for fn in files
+                          if fn.lower().endswith(extension)]
+            fileNames += sorted(found)
+        else:
+            fileNames.append(path)
+
+    return fileNames
+
+
+def convert_cif(fileName, edges, atoms=None, ASSIGN_DIFF_TYPES=True):
+    '''
+    returns Lattice and UnitCell objects build from CIF file
+
+    input: edges - [(type, dist, tolerance), ...] distance based edges search
+           atoms - list of atom types used as vertices (default: all)
+
+    '''
+    cif = ParseCIF(fileName)
+    if atoms is None:
+        atoms = [site["type"] for site in cif.UC_data]
+    lattice, UC = cif.build_UC(atoms, ASSIGN_DIFF_TYPES)
+
+    if len(edges) > 0:
+        cluster = CrystalCluster(UC, lattice, (1,1,1))
+        cluster.edges.search_edges_by_dists(edges)
+
+    return lattice, UC
+
+
+def process_file(fileName, options):
+    '''
+    worker: converts single CIF file (must be picklable, i.e. module level)
+
+    input: options - {"edges":_, "atoms":_, "ASSIGN_DIFF_TYPES":_,
+                      "name":_, "output_dir":_}
+
+    returns: result - {"fileName":_, "name":_, "error":_, "xml":_,
+                       "output":_, "vertices":_, "edges":_}
+             where "xml" is LATTICEGRAPH element string if output_dir is None
+             otherwise the library is written to "output" file
+
+    '''
+    result = {"fileName": fileName, "name": options["name"], "error": None,
+              "xml": None, "output": None, "vertices": 0, "edges": 0}
+    try:
+        lattice, UC = convert_cif(fileName, options["edges"], options["atoms"],
+                                  options["ASSIGN_DIFF_TYPES"])
+        exporter = ExportXML(lattice, UC, options["name"])
+        if options["output_dir"] is None:
+            stream = io.StringIO()
+            exporter.write_LATTICEGRAPH(stream, 1)
+            result["xml"] = stream.getvalue()
+        else:
+            result["output"] = os.path.join(options["output_dir"],
+                                            options["name"]+".xml")
+            exporter.export_to_lib(result["output"])
+        result["vertices"], result["edges"] = UC.num_vertices, UC.num_edges
+    except Exception as e: # report error of single file and continue
+        result["error"] = "{0}: {1}".format(type(e).__name__, e)
+
+    return result
+
+
+def get_names(fileNames):
+    '''returns unique LATTICEGRAPH names based on files names'''
+
+    names, used = [], set()
+    for fileName in fileNames:
+        base = os.path.splitext(os.path.basename(fileName))[0]
+        name, count = base, 1
+        while name in used:
+            count += 1
+            name = "{0}_{1}".format(base, count)
+        used.add(name)
+        names.append(name)
+
+    return names
+
+
+def convert_batch(fileNames, edges, atoms=None, ASSIGN_DIFF_TYPES=True,
+                  output=None, output_dir=None, max_workers=None, progress=None):
+    '''
+    converts CIF files into ALPS lattice graphs using pool of processes
+
+    input: fileNames - list of CIF files
+           edges - [(type, dist, tolerance), ...] distance based edges search
+           atoms - list of atom types used as vertices (default: all)
+           output - merged library file (LATTICEGRAPH per structure)
+           output_dir - directory for library file per structure
+           max_workers - number of processes (1 - run in current process)
+           progress - function(count, total, result) called for each file
+                      in order of completion
+
+    returns: list of results (see process_file) in order of fileNames
+
+    '''
+    if (output is None) == (output_dir is None):
+        raise ValueError("Either output or output_dir has to be provided")
+    if output_dir is not None and not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    total = len(fileNames)
+    results = [None]*total
+    tasks = []
+    for fileName, name in zip(fileNames, get_names(fileNames)):
+        tasks.append((fileName, {"edges": list(edges), "atoms": atoms,
+                                 "ASSIGN_DIFF_TYPES": ASSIGN_DIFF_TYPES,
+                                 "name": name, "output_dir": output_dir}))
+
+    def done(ind, result, count):
+        results[ind] = result
+        if progress is not None:
+            progress(count, total, result)
+
+    if max_workers == 1:
+        for ind, task in enumerate(tasks):
+            done(ind, process_file(*task), ind+1)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(process_file, *task): ind
+                       for ind, task in enumerate(tasks)}
+            for count, future in enumerate(as_completed(futures)):
+                done(futures[future], future.result(), count+1)
+
+    if output is not None:
+        with io.open(output, 'w', encoding='us-ascii',
+                     errors='xmlcharrefreplace', newline='\n') as f:
+            f.write(u'<LATTICES>\n')
+            for result in results:
+                if result["xml"] is not None:
+                    f.write(result["xml"])
+            f.write(u'</LATTICES>')
+
+    return results
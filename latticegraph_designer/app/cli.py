@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Copyright (c) 2017, Ivan Luchko and Project Contributors
+Licensed under the terms of the MIT License
+https://github.com/luchko/latticegraph_designer
+
+This module contains the headless command line interface which allows
+to build lattice graphs in batch jobs without PyQt and matplotlib.
+
+    def get_parser():
+    def build_lattice_graph(args):
+    def write_output(args, lattice, UC, LATTICEGRAPH_name):
+    def run_batch(args):
+    def run(argv=None):
+
+Only the core module is imported.
+
+Example:
+
+    $ latticegraph-designer test.cif --atoms Cu -e 0:5.514:1 -e 1:7.55 -o lib.xml
+    $ latticegraph-designer cif_dir/ -e 0:5.514:1 -j 8 --output-dir libs/
+
+"""
+
+from __future__ import division, print_function
+
+import os
+import sys
+import argparse
+
+from latticegraph_designer.app.core import (ParseXML, ParseCIF, ExportXML,
+                                            CrystalCluster)
+from latticegraph_designer.app.batch import collect_files, convert_batch
+
+
+def parse_edge_search(string):
+    '''parse "TYPE:DIST[:TOL]" argument into (type, dist, tolerance)'''
+
+    values = string.split(':')
+    try:
+        if len(values) not in (2, 3):
+            raise ValueError
+        _type, dist = int(values[0]), float(values[1])
+        tolerance = float(values[2]) if len(values) == 3 else 0.1
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+                "edge search should be defined as TYPE:DIST[:TOL], got '{}'".format(string))
+
+    return _type, dist, tolerance
+
+
+def get_parser():
+    '''returns command line arguments parser'''
+
+    parser = argparse.ArgumentParser(prog="latticegraph-designer",
+                description="Build lattice graph from CIF or ALPS XML file "
+                            "without GUI.")
+    parser.add_argument("input", nargs="+", 
+                        help="input CIF or XML lattice graph library file. "
+                             "Several CIF files or directories are converted "
+                             "in batch mode.")
+    parser.add_argument("-n", "--name", default=None,
+                        help="name of the LATTICEGRAPH to import from XML library "
+                             "(default: first one)")
+    parser.add_argument("-a", "--atoms", default=None,
+                        help="comma separated list of CIF atom types used as "
+                             "vertices (default: all)")
+    parser.add_argument("--same-type", action="store_true",
+                        help="assign the same type to all vertices generated from CIF")
+    parser.add_argument("-e", "--edges", action="append", default=[],
+                        type=parse_edge_search, metavar="TYPE:DIST[:TOL]",
+                        help="add edges of TYPE between vertices at distance DIST "
+                             "with tolerance TOL in %% (default 0.1). "
+                             "Can be given several times.")
+    parser.add_argument("--clear-edges", action="store_true",
+                        help="remove imported edges before the edges search")
+    parser.add_argument("-o", "--output", default=None,
+                        help="output file (default: stdout)")
+    parser.add_argument("-f", "--format", choices=["xml", "txt"], default=None,
+                        help="output format (default: by output file extension "
+                             "or xml)")
+    parser.add_argument("--lg-name", default=None,
+                        help="name of the exported LATTICEGRAPH")
+    parser.add_argument("-l", "--list", action="store_true",
+                        help="list LATTICEGRAPH names of XML library and exit")
+    parser.add_argument("--output-dir", default=None,
+                        help="batch mode: write library file per structure "
+                             "into the directory instead of merged library")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="batch mode: number of worker processes "
+                             "(default: number of CPUs)")
+
+    return parser
+
+
+def build_lattice_graph(args):
+    '''
+    import lattice graph from args.input and add edges found by distance
+
+    returns: lattice, UC, LATTICEGRAPH_name
+
+    '''
+    fileName = args.input[0]
+    if not os.path.exists(fileName):
+        raise ValueError("file {} doesn't exist.".format(fileName))
+
+    if fileName.lower().endswith(".cif"):
+        cif = ParseCIF(fileName)
+        if args.atoms is None:
+            types = [site["type"] for site in cif.UC_data]
+        else:
+            types = [t.strip() for t in args.atoms.split(',') if t.strip() != '']
+        lattice, UC = cif.build_UC(types, ASSIGN_DIFF_TYPES=not args.same_type)
+        name = os.path.splitext(os.path.basename(fileName))[0]
+    else:
+        parser = ParseXML(fileName=fileName)
+        names = parser.get_LATTICEGRAPH_names()
+        if len(names) == 0:
+            raise ValueError("no LATTICEGRAPH is defined in {}".format(fileName))
+        name = names[0] if args.name is None else args.name
+        if name not in names:
+            raise ValueError("LATTICEGRAPH '{}' is not defined".format(name))
+        lattice, UC = parser.parse_LATTICEGRAPH(name)
+
+    if args.clear_edges:
+        UC.clearEdges()
+
+    if len(args.edges) > 0:
+        cluster = CrystalCluster(UC, lattice, (1,1,1))
+        cluster.edges.search_edges_by_dists(args.edges)
+
+    return lattice, UC, name if args.lg_name is None else args.lg_name
+
+
+def write_output(args, lattice, UC, LATTICEGRAPH_name):
+    '''writes lattice graph in required format to the file or stdout'''
+
+    _format = args.format
+    if _format is None:
+        isTxt = args.output is not None and args.output.lower().endswith(".txt")
+        _format = "txt" if isTxt else "xml"
+
+    if _format == "xml":
+        exporter = ExportXML(lattice, UC, LATTICEGRAPH_name)
+        if args.output is None:
+            exporter.dump_lib()
+        else:
+            exporter.export_to_lib(args.output)
+    else:
+        text = str(UC)
+        if args.output is None:
+            sys.stdout.write(text)
+        else:
+            with open(args.output, 'w') as f:
+                f.write(text)
+
+
+def run_batch(args):
+    '''converts several CIF files, progress and errors are printed to stderr'''
+    
+    if (args.output is None) == (args.output_dir is None):
+        raise ValueError("batch mode requires either --output or --output-dir")
+    
+    fileNames = collect_files(args.input)
+    atoms = None
+    if args.atoms is not None:
+        atoms = [t.strip() for t in args.atoms.split(',') if t.strip() != '']
+    
+    def progress(count, total, result):
+        if result["error"] is None:
+            msg = "OK ({0} vertices, {1} edges)".format(result["vertices"],
+                                                        result["edges"])
+        else:
+            msg = "error: " + result["error"]
+        print("[{0}/{1}] {2}: {3}".format(count, total, result["fileName"], msg),
+              file=sys.stderr)
+    
+    results = convert_batch(fileNames, args.edges, atoms, not args.same_type,
+                            args.output, args.output_dir, args.jobs, progress)
+    
+    failed = [result for result in results if result["error"] is not None]
+    print("{0} of {1} files converted".format(len(results)-len(failed), len(results)),
+          file=sys.stderr)
+    
+    return 1 if len(failed) > 0 else 0
+
+
+def run(argv=None):
+    '''run the command line tool'''
+
+    args = get_parser().parse_args(argv)
+
+    try:
+        if (len(args.input) > 1 or os.path.isdir(args.input[0]) 
+            or args.output_dir is not None):
+            return run_batch(args)
+        
+        if args.list:
+            for name in ParseXML(fileName=args.input[0]).get_LATTICEGRAPH_names():
+                print(name)
+            return 0
+
+        lattice, UC, name = build_lattice_graph(args)
+        write_output(args, lattice, UC, name)
+    except (ValueError, NameError, SyntaxError, IOError, OSError) as e:
+        print("latticegraph-designer: error: {}".format(e), file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+
+    sys.exit(run())
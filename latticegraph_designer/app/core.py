@@ -11,27 +11,91 @@ This module contains the definition of core classes:
     class Edge(object):
     class Lattice(object):
     class UnitCell(object):
+    class VertexView(ArrayView, Vertex):
+    class EdgeView(ArrayView, Edge):
+    class ArrayStore(MutableMapping):
+    class VertexStore(ArrayStore):
+    class EdgeStore(ArrayStore):
+    class EdgeKeyIndex(object):
+    class LengthIndex(object):
+    class EdgesLengthView(Mapping):
     class ClusterVertices(object):
+    class NeighbourIndex(object):
     class ClusterEdges(object):
+    class GeometryCache(object):
     class CrystalCluster(object):
     class DealXML(object):
     class ParseXML(object):
+    class ParseCache(object):
+    class ParseCIF(object):
     class ExportXML(object):
 
 """
 
 from __future__ import division # make python 2 use float division
 
+import io
+import os
+import copy
+import sys
+import json
+import hashlib
+import zipfile
+import threading
 import numpy as np
 import itertools
+from collections import OrderedDict
+try:
+    from collections.abc import Mapping, MutableMapping
+except ImportError: # python 2
+    from collections import Mapping, MutableMapping
 import xml.etree.ElementTree as ET
+from xml.parsers import expat
 from xml.dom import minidom
 from math import *
 
+
+_symops_cache = {} # {symop strings: compiled 3x4 affine matrix}
+
+def import_sparse():
+    '''returns scipy.sparse module (optional dependency, imported on demand)'''
+    
+    try:
+        import scipy.sparse
+    except ImportError:
+        raise ImportError("scipy is required for the sparse matrices "
+                          "of the lattice graph")
+    return scipy.sparse
+
+def compile_symop(symop):
+    '''
+    returns 3x4 affine matrix [R|t] of the space group symmetry operation 
+    so that new_site = R.dot(site) + t
+    
+    input: symop - ['-y','x-y+1/2','z']
+    
+    The strings are evaluated only once (at the origin and unit vectors)
+    and the result is cached.
+    '''
+    key = tuple(symop)
+    matrix = _symops_cache.get(key)
+    if matrix is None:
+        points = np.vstack((np.zeros(3), np.eye(3)))
+        values = np.array([[eval(expr, {'x':x, 'y':y, 'z':z}) for expr in symop]
+                           for x, y, z in points], dtype=float)
+        matrix = np.zeros((3,4))
+        matrix[:,3] = values[0]
+        matrix[:,:3] = (values[1:] - values[0]).T
+        _symops_cache[key] = matrix
+        
+    return matrix
+
         
 class Vertex(object):
     '''Vertex class'''
     
+    __slots__ = ('id', 'type', 'coords')
+    
     def __init__(self,  _id=0, _type=0, coordinates=[0,0,0]):
         
         self.id = int(_id)
@@ -46,6 +110,8 @@ class Vertex(object):
 class Edge(object):
     '''Edge class'''
     
+    __slots__ = ('id', 'type', 'source', 'target', 'offset', 'length')
+    
     def __init__(self, _id=0, _type=0, source_target=(0,0), offset=[0,0,0]):
         
         self.id = int(_id)
@@ -91,6 +157,8 @@ class Edge(object):
 class Lattice(object):
     '''lattice class'''
     
+    CACHE_SIZE = 16 # max number of memoized finite lattice arrays
+    
     def __init__(self, basisMatrix=np.eye(3), **kwargs):
         '''
         basis is defined by basisMatrix 3x3 numpy array
@@ -104,6 +172,8 @@ class Lattice(object):
         self.atrib["dimension"] = "3"
         self.atrib["BOUNDARY"] = "periodic"
         self.atrib.update(kwargs)
+        self.cache = OrderedDict() # {(name, size, basisMatrix bytes): array}
+        self.lock = threading.Lock() # clusters are resized in worker thread
                   
         keys = kwargs.keys()
         if 'cell_lengths' in keys and 'angles' in keys:
@@ -155,47 +225,105 @@ class Lattice(object):
         
         '''
         return np.dot(self.basisMatrix, coords)
+
+    def fingerprint(self):
+        '''returns stable content hash (hex string) of the lattice basis'''
+        
+        basisMatrix = np.round(np.asarray(self.basisMatrix, dtype=float), 10) + 0.0
+        
+        return hashlib.sha1(basisMatrix.tobytes()).hexdigest()
    
+    def get_cached(self, name, size, compute):
+        '''
+        returns memoized result of compute(size) for the current basisMatrix,
+        numpy arrays are returned read-only since they are shared
+        
+        '''
+        key = (name, tuple(size), np.asarray(self.basisMatrix).tobytes())
+        with self.lock:
+            result = self.cache.pop(key, None)
+            if result is not None:
+                self.cache[key] = result # most recently used
+                return result
+        
+        result = compute(size) # outside of the lock, may be computed twice
+        for array in (result if isinstance(result, tuple) else (result,)):
+            array.flags.writeable = False
+        with self.lock:
+            self.cache.pop(key, None)
+            if len(self.cache) >= self.CACHE_SIZE:
+                self.cache.popitem(last=False) # least recently used
+            self.cache[key] = result
+        
+        return result
+
     def get_finite_lattice_sites(self, size=(1,1,1)):
         '''
         input: size = (L,W,H) - size of finite lattice
         
-        returns: 3x(L*W*H) numpy array - lattice sites of the finite 
+        returns: (L*W*H)x3 numpy array (read-only) - lattice sites of the 
+                 finite lattice ordered as itertools.product(L,W,H)
         
         '''
-        try:
-            L,W,H = size
-        except ValueError:
-            print('Size should has 3 dimensions')
+        if len(size) != 3:
+            raise ValueError('Size should has 3 dimensions')
         
-        count = 0
-        sitesCoord = np.zeros((L*W*H,3))
-        for site in itertools.product(range(L),range(W),range(H)):
-            sitesCoord[count,:] = np.dot(self.basisMatrix, site)
-            count += 1
+        def compute(size):
+            sites = np.indices(size).reshape(3,-1).T
+            return np.dot(sites, np.transpose(self.basisMatrix)).reshape(-1,3)
         
-        return sitesCoord  
+        return self.get_cached("sites", size, compute)
+
+    def get_lattice_lines(self, size=(1,1,1)):
+        '''
+        input: size = (L,W,H) - size of finite lattice
+        
+        returns: lines - nx2x3 numpy array (read-only) of lattice net lines
+                 outline - 12x2x3 numpy array (read-only) of the box edges
+        
+        '''
+        def compute(size):
+            n = np.array(size)
+            lines, outline = [], []
+            # lines along axis c for each site of the (a,b) plane
+            for a, b, c in ((0,1,2),(0,2,1),(1,2,0)):
+                ia, ib = np.indices((n[a]+1, n[b]+1)).reshape(2,-1)
+                begin = np.zeros((len(ia),3))
+                begin[:,a], begin[:,b] = ia, ib
+                end = begin.copy()
+                end[:,c] = n[c]
+                lines.append(np.stack((begin, end), axis=1))
+                outline.append(((ia == 0)|(ia == n[a])) & ((ib == 0)|(ib == n[b])))
+            lines = np.dot(np.concatenate(lines), np.transpose(self.basisMatrix))
+            
+            return lines, lines[np.concatenate(outline)]
+        
+        return self.get_cached("lines", size, compute)
 
 
 class UnitCell(object):
     '''Unit cell class'''
+    
+    ARRAY_STORAGE = False # compact array backed storage (see ArrayStore)
+    LENGTH_TOLERANCE = 1.5e-4 # lengths are equal within rounding (4 decimals)
 
     def __init__(self, lattice=Lattice(), **kwargs):
-        '''lattice is used for calculating edges length'''
-		
+        '''
+        lattice is used for calculating edges length
+        ARRAY_STORAGE=True - store vertices and edges in arrays instead of
+                             dictionaries of objects (for large unit cells)
+        
+        '''
         self.lattice = lattice
+        self.ARRAY_STORAGE = kwargs.pop("ARRAY_STORAGE", self.ARRAY_STORAGE)
        
         self.atrib={}
         self.atrib["name"] = "myUC"
         self.atrib["dimension"] = "3"
         self.atrib.update(kwargs)
 
-        self.vertices = {}
-        self.edges = {}
-        self.lengthDic = {}
-        self.num_vertices = 0
-        self.num_edges = 0
-        self.new_id = 1
+        self.clearVertices()
+        self.clearEdges()
           
     def add_vertex(self, vertex):
         '''Add vertex to unit cell'''
@@ -213,46 +341,207 @@ class UnitCell(object):
             return None
         else:       
             edge.id = self.new_id
+            if RECOMPUTE_LENGTH:
+                edge.recompute_length(self, self.lattice)
+            
             self.edges[edge.id] = edge	
+            self.edgesIndex[self.get_edge_key(edge)] = edge.id
             self.num_edges += 1
             self.new_id += 1
-            
-            if RECOMPUTE_LENGTH:
-                edge.recompute_length(self, self.lattice)
-
-            if self.lengthDic.get(edge.length) is None:
-                self.lengthDic[edge.length] = [edge.id]
-            else:
-                self.lengthDic.get(edge.length).append(edge.id)
+            self.add_length(edge)
                             
             return edge.id
 
+    def add_edges(self, source_target, offsets, _type=0, lengths=None):
+        '''
+        add batch of edges to the UC and returns the list of new edges ids
+        
+        duplicates (within the batch or of existing edges) are skipped
+        
+        input: source_target - Mx2 array of vertices ids
+               offsets - Mx3 array of target offsets
+               _type - type of edges: int or array of M ints
+               lengths - edges lengths: float, array of M floats 
+                         or None (lengths are recomputed)
+        
+        '''
+        source_target = np.array(source_target, dtype=int).reshape(-1,2)
+        offsets = np.array(offsets, dtype=int).reshape(-1,3)
+        num = len(source_target)
+        types = np.broadcast_to(np.array(_type, dtype=int), num)
+        if lengths is not None:
+            lengths = np.broadcast_to(np.array(lengths, dtype=float), num)
+        
+        # bring all edges to the standart form (see Edge.standart_form)
+        source, target = source_target.T
+        nonzero = offsets != 0
+        first = np.argmax(nonzero, axis=1) # first nonzero offset component
+        isZero = ~np.any(nonzero, axis=1)
+        swap = np.where(isZero, source > target,
+                        offsets[np.arange(num), first] < 0)
+        source, target = np.where(swap, target, source), np.where(swap, source, target)
+        offsets = np.where((swap & ~isZero)[:,np.newaxis], -offsets, offsets)
+        
+        # drop duplicates within the batch keeping the order of the first entry
+        keys = np.hstack((source[:,np.newaxis], target[:,np.newaxis], offsets))
+        if num > 0:
+            _, first_ind = np.unique(keys, axis=0, return_index=True)
+            first_ind = np.sort(first_ind)
+        else:
+            first_ind = np.array([], dtype=int)
+        
+        if self.ARRAY_STORAGE:
+            return self.append_edges(keys[first_ind], types[first_ind],
+                                     None if lengths is None else lengths[first_ind])
+        
+        new_ids = []
+        for j in first_ind:
+            key = tuple(int(val) for val in keys[j])
+            if key in self.edgesIndex: # duplicate of existing edge
+                continue
+            edge = Edge(0, types[j], key[:2], key[2:])
+            # length first, so that edge with unknown vertex is not added
+            if lengths is None:
+                edge.recompute_length(self, self.lattice)
+            else:
+                edge.length = float(lengths[j])
+            
+            edge.id = self.new_id
+            self.edges[edge.id] = edge
+            self.edgesIndex[key] = edge.id
+            self.num_edges += 1
+            self.new_id += 1
+            new_ids.append(edge.id)
+        
+        self.lengthIndex.extend([self.edges[_id].length for _id in new_ids], new_ids)
+                
+        return new_ids
+
+    def append_edges(self, keys, types, lengths=None):
+        '''
+        ARRAY_STORAGE version of add_edges: appends edges to the arrays
+        
+        input: keys - Mx5 array of unique edges keys in the standart form
+               types, lengths - arrays of M values (lengths are recomputed
+                                if None)
+                                
+        '''
+        isNew = self.edgesIndex.find(keys) < 0
+        keys, types = keys[isNew], types[isNew]
+        if lengths is None:
+            lengths = self.get_edges_lengths(keys)
+        else:
+            lengths = lengths[isNew]
+        
+        ids = np.arange(self.new_id, self.new_id+len(keys))
+        self.edges.append(ids, types=types, sources=keys[:,0], targets=keys[:,1],
+                          offsets=keys[:,2:], lengths=lengths)
+        self.edgesIndex.add(keys, ids)
+        self.lengthIndex.extend(lengths, ids)
+        self.num_edges += len(ids)
+        self.new_id += len(ids)
+        
+        return ids.tolist()
+    
+    def get_edges_lengths(self, keys):
+        '''
+        returns the list of lengths (rounded like Edge.recompute_length) of 
+        the edges defined by Mx5 array of keys (source, target, x, y, z)
+        
+        '''
+        ids, types, coords = self.get_vertices_data()
+        order = np.argsort(ids)
+        pos = np.searchsorted(ids, keys[:,:2], sorter=order)
+        missing = pos == len(ids)
+        ind = order[np.where(missing, 0, pos)] if len(ids) > 0 else pos
+        missing[~missing] = ids[ind[~missing]] != keys[:,:2][~missing]
+        if np.any(missing): # the same error as Edge.recompute_length
+            raise KeyError(int(keys[:,:2][missing][0]))
+        basis = np.transpose(self.lattice.basisMatrix)
+        sourceCoord = np.dot(coords[ind[:,0]], basis)
+        targetCoord = np.dot(coords[ind[:,1]] + keys[:,2:], basis)
+        lengths = np.linalg.norm(targetCoord-sourceCoord, axis=1)
+        
+        return [round(length, 4) for length in lengths.tolist()]
+    
+    def add_length(self, edge):
+        '''adds edge to lengthIndex'''
+        self.lengthIndex.add(edge.length, edge.id)
+    
+    @property
+    def lengthDic(self):
+        '''read-only {length: [edges ids]} view of lengthIndex'''
+        return EdgesLengthView(self.lengthIndex)
+    
+    def find_edges_by_length(self, length, tolerance=None):
+        '''
+        returns ids of the edges with the length within tolerance 
+        (default: LENGTH_TOLERANCE) sorted by length
+        
+        '''
+        if tolerance is None:
+            tolerance = self.LENGTH_TOLERANCE
+            
+        return self.lengthIndex.find(length, tolerance)
+
+    @staticmethod
+    def get_edge_key(edge):
+        '''returns hashable key (source, target, x, y, z) of the edge'''
+        return (int(edge.source), int(edge.target)) + tuple(int(c) for c in edge.offset)
+
     def is_duplicate(self,new_edge):        
         '''checks if edge already exist in edges container'''
         
-        for key, edge in self.edges.items():
-            if new_edge.source == edge.source and\
-               new_edge.target == edge.target and\
-               tuple(new_edge.offset) == tuple(edge.offset):
-                   return True               
+        return self.get_edge_key(new_edge) in self.edgesIndex
 
-        return False		
+    def get_edge_id(self, source, target, offset=(0,0,0)):
+        '''returns id of the edge defined by source, target, offset or None'''
+        
+        edge = Edge(0, 0, (source, target), offset)
+        edge.standart_form()
+        
+        return self.edgesIndex.get(self.get_edge_key(edge))
 
     def remove_edge(self, _id):
         '''Removes edge with _id'''
         
         edge = self.edges[_id]
-        ids = self.lengthDic[edge.length]
-        ids.remove(_id)
-        if len(ids) == 0:
-            del self.lengthDic[edge.length]
-            
+        self.lengthIndex.remove(edge.length, _id)
+        del self.edgesIndex[self.get_edge_key(edge)]
         del self.edges[_id]
         self.num_edges -= 1
         
+    def snapshot(self):
+        '''
+        returns read-only copy of the unit cell which is not affected by 
+        adding and removing of vertices and edges of this one, so that it 
+        can be read from a worker thread (see CrystalCluster.compute_size), 
+        vertices and edges objects are shared if ARRAY_STORAGE=False
+        
+        '''
+        UC = copy.copy(self)
+        UC.atrib = dict(self.atrib)
+        if self.ARRAY_STORAGE:
+            UC.vertices, UC.edges = self.vertices.copy(), self.edges.copy()
+        else:
+            UC.vertices, UC.edges = dict(self.vertices), dict(self.edges)
+        
+        return UC
+    
+    def clearVertices(self):
+        
+        self.vertices = VertexStore() if self.ARRAY_STORAGE else {}
+        self.num_vertices = 0
+        
     def clearEdges(self):
-        self.edges = {}
-        self.lengthDic = {}
+        
+        if self.ARRAY_STORAGE:
+            self.edges = EdgeStore()
+            self.edgesIndex = EdgeKeyIndex()
+        else:
+            self.edges = {}
+            self.edgesIndex = {} # {(source, target, offset): edge id}
+        self.lengthIndex = LengthIndex() # sorted edges lengths
         self.num_edges = 0
         self.new_id = 1
 
@@ -271,17 +560,33 @@ class UnitCell(object):
                symops_list - [['x','y','z'], ['-y','-x+1/2','z'], ...]
         
         returns: sites - [[x1,y1,z1],...]
+        
+        Each symop is applied to all sites found so far as a single matrix 
+        product. Sites are wrapped into UC and compared on the grid of 
+        ndigits decimals (the precision of the given site).
         '''
-        ndigits=self.get_min_ndigits(site)    
-        sites = [tuple(round(coord%1,ndigits) for coord in site)]
-        dic = {} 
+        ndigits = self.get_min_ndigits(site)
+        scale = 10**ndigits
+        
+        def grid_keys(coords):
+            '''integer keys of the wrapped and rounded coordinates'''
+            return np.mod(np.rint(np.mod(coords,1)*scale).astype(np.int64), scale)
+        
+        keys = grid_keys(np.array([site], dtype=float))
+        found = set([tuple(keys[0])])
         for symop in symops_list:
-            for site0 in sites[:]:
-                dic['x'], dic['y'], dic['z'] = site0
-                new_site = tuple(round(eval(new,dic)%1,ndigits) for new in symop)        
-                if new_site not in sites:
-                    sites.append(new_site)                        
-        return sites
+            matrix = compile_symop(symop)
+            coords = keys/scale
+            new_keys = grid_keys(coords.dot(matrix[:,:3].T) + matrix[:,3])
+            new = []
+            for key in map(tuple, new_keys.tolist()):
+                if key not in found:
+                    found.add(key)
+                    new.append(key)
+            if len(new) > 0:
+                keys = np.vstack((keys, np.array(new, dtype=np.int64)))
+                
+        return [tuple(coords) for coords in (keys/scale).tolist()]
     
     def add_vertices_using_symops(self, sites, symops_list, ASSIGN_DIFF_TYPES=True):
         '''
@@ -293,7 +598,7 @@ class UnitCell(object):
                ASSIGN_DIFF_TYPES = True assign different types fro each site
         
         '''
-        self.vertices = {}        
+        self.clearVertices()
         for v_type,site in enumerate(sites):
             if ASSIGN_DIFF_TYPES == False:
                 v_type = 0
@@ -301,17 +606,74 @@ class UnitCell(object):
             for site0 in sym_sites:
                 self.add_vertex(Vertex(self.num_vertices,v_type,site0))
     
+    def fingerprint(self):
+        '''
+        returns stable content hash (hex string) of the unit cell: dimension, 
+        vertices (ids, types, coordinates) and edges in the standart form
+        (ids, types, source, target, offset) in the order they are stored
+        
+        '''
+        ids, types, coords = self.get_vertices_data()
+        e_ids, e_types, keys, lengths = self.get_edges_data()
+        sha = hashlib.sha1("{0}:{1}:{2}".format(self.atrib["dimension"], 
+                           len(ids), len(e_ids)).encode())
+        sha.update(np.column_stack((ids, types)).astype(np.int64).tobytes())
+        sha.update((np.round(coords, 10) + 0.0).tobytes()) # +0.0 drops -0.0
+        sha.update(np.column_stack((e_ids, e_types, keys)).astype(np.int64).tobytes())
+        
+        return sha.hexdigest()
+
+    def get_vertices_data(self):
+        '''returns arrays of vertices ids, types and Nx3 coords (stored order)'''
+        
+        if self.ARRAY_STORAGE:
+            return tuple(self.vertices.get_alive(name) 
+                         for name in ("ids", "types", "coords"))
+        
+        vertices = list(self.vertices.values())
+        
+        return (np.array([v.id for v in vertices], dtype=np.int64),
+                np.array([v.type for v in vertices], dtype=int),
+                np.array([v.coords for v in vertices], dtype=float).reshape(-1,3))
+    
+    def get_edges_data(self):
+        '''
+        returns arrays of edges ids, types, Mx5 keys (source, target, x, y, z)
+        and lengths (nan if undefined) in the stored order
+        
+        '''
+        if self.ARRAY_STORAGE:
+            keys = np.column_stack([self.edges.get_alive(name) 
+                                    for name in ("sources", "targets", "offsets")])
+            return (self.edges.get_alive("ids"), self.edges.get_alive("types"),
+                    keys.reshape(-1,5), self.edges.get_alive("lengths"))
+        
+        edges = list(self.edges.values())
+        keys = np.hstack((np.array([(e.source, e.target) for e in edges], dtype=int).reshape(-1,2),
+                          np.array([e.offset for e in edges], dtype=int).reshape(-1,3)))
+        
+        return (np.array([e.id for e in edges], dtype=np.int64),
+                np.array([e.type for e in edges], dtype=int), keys,
+                np.array([np.nan if e.length is None else e.length for e in edges],
+                         dtype=float))
+
     def compute_edgesLength(self, lattice):
-        '''compute Euclidian length of edges with given lattice'''
+        '''
+        compute Euclidian length of edges with given lattice (all edges at 
+        once, see get_edges_lengths) and rebuild lengthIndex
         
+        '''
         self.lattice = lattice
-        self.lengthDic = {}
-        for key, edge in self.edges.items():
-            length = round(edge.recompute_length(self, lattice), 4)
-            if self.lengthDic.get(length) is None:
-                self.lengthDic[length] = [key]
-            else:
-                self.lengthDic.get(length).append(key)
+        ids, types, keys = self.get_edges_data()[:3]
+        lengths = self.get_edges_lengths(keys)
+        if self.ARRAY_STORAGE:
+            self.edges.set_alive("lengths", lengths)
+        else:
+            for edge, length in zip(self.edges.values(), lengths):
+                edge.length = length
+        
+        self.lengthIndex.clear()
+        self.lengthIndex.extend(lengths, ids)
 
     def __str__(self):
         
@@ -328,10 +690,504 @@ class UnitCell(object):
         return string
     
 
+def array_field(name, convert=None):
+    '''property of the array view which reads/writes the row of store array'''
+    
+    def fget(self):
+        value = getattr(self.store, name)[self.get_row()]
+        return value if convert is None else convert(value)
+    
+    def fset(self, value):
+        getattr(self.store, name)[self.get_row()] = np.nan if value is None else value
+        
+    return property(fget, fset)
+
+
+class ArrayView(object):
+    '''base class of the views of ArrayStore rows'''
+    
+    __slots__ = ()
+    
+    def __init__(self, store, key, row):
+        
+        self.store, self.key = store, key
+        self.row, self.generation = row, store.generation
+    
+    def get_row(self):
+        '''returns the row in the store arrays (rows move by compaction)'''
+        
+        if self.generation != self.store.generation:
+            self.row, self.generation = self.store.get_row(self.key), self.store.generation
+            if self.row is None:
+                raise KeyError("{} was removed".format(self.key))
+        
+        return self.row
+    
+    @property
+    def id(self):
+        return self.key
+    
+    
+class VertexView(ArrayView, Vertex):
+    '''Vertex stored in VertexStore arrays'''
+    
+    __slots__ = ('store', 'key', 'row', 'generation')
+    
+    type = array_field("types", int)
+    coords = array_field("coords")
+    
+
+class EdgeView(ArrayView, Edge):
+    '''Edge stored in EdgeStore arrays'''
+    
+    __slots__ = ('store', 'key', 'row', 'generation')
+    
+    type = array_field("types", int)
+    source = array_field("sources", int)
+    target = array_field("targets", int)
+    offset = array_field("offsets")
+    length = array_field("lengths", lambda value: None if np.isnan(value) else float(value))
+
+
+class ArrayStore(MutableMapping):
+    '''
+    Base class of the array backed {id: object} containers used by 
+    UnitCell with ARRAY_STORAGE=True.
+    
+    Objects are stored as rows of contiguous arrays (structure of arrays 
+    defined by FIELDS) in the order they were added, so ids have to be 
+    increasing. Arrays capacity is doubled when exhausted. Removed rows are
+    marked as dead and arrays are compacted when half of the rows is dead.
+    Stored objects are returned as lightweight __slots__ views of the rows.
+    
+    '''
+    FIELDS = () # ((array name, object attribute, dtype, shape), ...)
+    VIEW = None
+    
+    def __init__(self):
+        
+        self.size = 0 # number of used rows (including dead ones)
+        self.num_dead = 0
+        self.generation = 0 # is increased when rows are moved
+        self.reserve(16)
+    
+    def get_fields(self):
+        '''returns FIELDS including ids and alive mask'''
+        return (("ids", None, np.int64, ()), ("alive", None, bool, ())) + self.FIELDS
+    
+    def reserve(self, num):
+        '''makes sure that num more rows can be added without reallocation'''
+        
+        capacity = len(getattr(self, "ids", ()))
+        if self.size + num <= capacity:
+            return
+        
+        capacity = max(2*capacity, self.size + num, 16)
+        for name, attribute, dtype, shape in self.get_fields():
+            array = np.zeros((capacity,)+shape, dtype=dtype)
+            if hasattr(self, name):
+                array[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, array)
+    
+    def get_row(self, key):
+        '''returns row of the object with id=key or None'''
+        
+        row = int(np.searchsorted(self.ids[:self.size], key))
+        if row < self.size and self.ids[row] == key and self.alive[row]:
+            return row
+        
+        return None
+    
+    def get_alive(self, name):
+        '''returns array name of the stored objects'''
+        
+        array = getattr(self, name)[:self.size]
+        
+        return array if self.num_dead == 0 else array[self.alive[:self.size]]
+        
+    def set_alive(self, name, values):
+        '''sets array name of the stored objects'''
+        
+        array = getattr(self, name)
+        if self.num_dead == 0:
+            array[:self.size] = values
+        else:
+            array[:self.size][self.alive[:self.size]] = values
+        
+    def append(self, ids, **arrays):
+        '''appends rows (ids have to be increasing), missing fields are zeros'''
+        
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        if len(ids) == 0:
+            return
+        if self.size > 0 and ids[0] <= self.ids[self.size-1]:
+            raise ValueError("ids have to be added in increasing order")
+        
+        self.reserve(len(ids))
+        begin, end = self.size, self.size+len(ids)
+        self.ids[begin:end], self.alive[begin:end] = ids, True
+        for name, attribute, dtype, shape in self.FIELDS:
+            getattr(self, name)[begin:end] = arrays.get(name, 0)
+        self.size = end
+            
+    def compact(self):
+        '''removes dead rows from the arrays'''
+        
+        alive = self.alive[:self.size].copy()
+        num = self.size - self.num_dead
+        for name, attribute, dtype, shape in self.get_fields():
+            array = getattr(self, name)
+            array[:num] = array[:self.size][alive]
+        self.alive[num:self.size] = False
+        self.size, self.num_dead = num, 0
+        self.generation += 1
+    
+    def __getitem__(self, key):
+        
+        row = self.get_row(key)
+        if row is None:
+            raise KeyError(key)
+        
+        return self.VIEW(self, int(key), row)
+    
+    def __setitem__(self, key, obj):
+        
+        row = self.get_row(key)
+        if row is None:
+            self.append([key])
+            row = self.size-1
+        for name, attribute, dtype, shape in self.FIELDS:
+            value = getattr(obj, attribute)
+            getattr(self, name)[row] = np.nan if value is None else value
+        
+    def __delitem__(self, key):
+        
+        row = self.get_row(key)
+        if row is None:
+            raise KeyError(key)
+        self.alive[row] = False
+        self.num_dead += 1
+        if 2*self.num_dead > self.size:
+            self.compact()
+    
+    def __len__(self):
+        return self.size - self.num_dead
+    
+    def copy(self):
+        '''returns independent copy of the store (arrays are copied)'''
+        
+        store = copy.copy(self)
+        for name, attribute, dtype, shape in self.get_fields():
+            setattr(store, name, getattr(self, name).copy())
+        
+        return store
+    
+    def __iter__(self):
+        return iter(self.get_alive("ids").tolist())
+    
+    def values(self):
+        return [view for key, view in self.items()]
+    
+    def items(self):
+        
+        rows = np.arange(self.size)[self.alive[:self.size]]
+        
+        return [(key, self.VIEW(self, key, row)) 
+                for key, row in zip(self.ids[rows].tolist(), rows.tolist())]
+
+
+class VertexStore(ArrayStore):
+    '''array backed {id: Vertex} container (see ArrayStore)'''
+    
+    FIELDS = (("types", "type", np.int32, ()), 
+              ("coords", "coords", float, (3,)))
+    VIEW = VertexView
+    
+    
+class EdgeStore(ArrayStore):
+    '''array backed {id: Edge} container (see ArrayStore)'''
+    
+    FIELDS = (("types", "type", np.int32, ()), 
+              ("sources", "source", np.int32, ()),
+              ("targets", "target", np.int32, ()),
+              ("offsets", "offset", np.int32, (3,)),
+              ("lengths", "length", float, ()))
+    VIEW = EdgeView
+
+
+class EdgeKeyIndex(object):
+    '''
+    Compact {(source, target, x, y, z): edge id} index of the unit cell 
+    edges used instead of dictionary with ARRAY_STORAGE=True.
+    
+    Keys are packed into int64 and stored in sorted arrays. Recently added
+    keys are collected in small dictionary which is merged into the arrays
+    when it grows. Keys which can't be packed are kept in a dictionary.
+    
+    '''
+    SHIFT = np.array([0, 0, 64, 64, 64], dtype=np.int64)
+    LIMIT = np.array([2**20, 2**20, 128, 128, 128], dtype=np.int64)
+    
+    def __init__(self):
+        
+        self.keys = np.zeros(0, dtype=np.int64) # sorted packed keys
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.recent = {} # {packed key: id}
+        self.other = {}  # {key: id} keys out of packing range
+        
+    def pack(self, keys):
+        '''returns packed Mx5 keys, -1 for keys out of range'''
+        
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1,5) + self.SHIFT
+        fits = np.all((keys >= 0) & (keys < self.LIMIT), axis=1)
+        packed = keys[:,0]
+        for j in range(1,5):
+            packed = packed*self.LIMIT[j] + keys[:,j]
+        
+        return np.where(fits, packed, -1)
+    
+    def merge(self):
+        '''merges recently added keys into the sorted arrays'''
+        
+        if len(self.recent) == 0:
+            return
+        keys = np.concatenate((self.keys, np.fromiter(self.recent.keys(), np.int64)))
+        ids = np.concatenate((self.ids, np.fromiter(self.recent.values(), np.int64)))
+        order = np.argsort(keys, kind='stable')
+        self.keys, self.ids = keys[order], ids[order]
+        self.recent = {}
+    
+    def find(self, keys):
+        '''returns ids of the edges with given Mx5 keys, -1 if not found'''
+        
+        self.merge()
+        packed = self.pack(keys)
+        ids = np.full(len(packed), -1, dtype=np.int64)
+        if len(self.keys) > 0:
+            pos = np.minimum(np.searchsorted(self.keys, packed), len(self.keys)-1)
+            found = (self.keys[pos] == packed) & (packed >= 0)
+            ids[found] = self.ids[pos[found]]
+        for j in np.nonzero(packed < 0)[0]:
+            ids[j] = self.other.get(tuple(int(val) for val in keys[j]), -1)
+        
+        return ids
+        
+    def add(self, keys, ids):
+        '''adds Mx5 keys of the edges with given ids'''
+        
+        packed, ids = self.pack(keys), np.asarray(ids, dtype=np.int64)
+        for j in np.nonzero(packed < 0)[0]:
+            self.other[tuple(int(val) for val in keys[j])] = int(ids[j])
+        self.merge()
+        keys = np.concatenate((self.keys, packed[packed >= 0]))
+        ids = np.concatenate((self.ids, ids[packed >= 0]))
+        order = np.argsort(keys, kind='stable')
+        self.keys, self.ids = keys[order], ids[order]
+    
+    def get(self, key, default=None):
+        
+        packed = int(self.pack(key)[0])
+        if packed < 0:
+            return self.other.get(tuple(key), default)
+        if packed in self.recent:
+            return self.recent[packed]
+        pos = int(np.searchsorted(self.keys, packed))
+        if pos < len(self.keys) and self.keys[pos] == packed:
+            return int(self.ids[pos])
+        
+        return default
+    
+    def __contains__(self, key):
+        return self.get(key) is not None
+    
+    def __setitem__(self, key, _id):
+        
+        packed = int(self.pack(key)[0])
+        if packed < 0:
+            self.other[tuple(key)] = _id
+        else:
+            self.recent[packed] = _id
+            if len(self.recent) > max(256, len(self.keys)//8):
+                self.merge()
+    
+    def __delitem__(self, key):
+        
+        packed = int(self.pack(key)[0])
+        if packed < 0:
+            del self.other[tuple(key)]
+        elif packed in self.recent:
+            del self.recent[packed]
+        else:
+            pos = int(np.searchsorted(self.keys, packed))
+            if pos == len(self.keys) or self.keys[pos] != packed:
+                raise KeyError(key)
+            self.keys = np.delete(self.keys, pos)
+            self.ids = np.delete(self.ids, pos)
+    
+    def __len__(self):
+        return len(self.keys) + len(self.recent) + len(self.other)
+    
+
+class LengthIndex(object):
+    '''
+    Sorted index of the edges lengths: sorted array of lengths with the 
+    parallel array of edges ids. Edges with the length within tolerance 
+    are found by bisection (numpy.searchsorted). Edges with undefined 
+    length (None) are kept in the separate list.
+    
+    '''
+    def __init__(self):
+        
+        self.lengths = np.zeros(16)
+        self.ids = np.zeros(16, dtype=np.int64)
+        self.size = 0
+        self.undefined = [] # ids of the edges with undefined length
+        
+    def reserve(self, num):
+        '''makes sure that num more lengths can be added without reallocation'''
+        
+        if self.size + num > len(self.lengths):
+            capacity = max(2*len(self.lengths), self.size + num)
+            for name in ("lengths", "ids"):
+                array = np.zeros(capacity, dtype=getattr(self, name).dtype)
+                array[:self.size] = getattr(self, name)[:self.size]
+                setattr(self, name, array)
+    
+    def add(self, length, _id):
+        '''adds edge, edges of the same length are kept in order of adding'''
+        
+        if length is None:
+            self.undefined.append(_id)
+            return
+        
+        self.reserve(1)
+        pos = int(np.searchsorted(self.lengths[:self.size], length, side='right'))
+        for array, value in ((self.lengths, length), (self.ids, _id)):
+            array[pos+1:self.size+1] = array[pos:self.size].copy()
+            array[pos] = value
+        self.size += 1
+    
+    def remove(self, length, _id):
+        '''removes edge with given length and id'''
+        
+        if length is None:
+            self.undefined.remove(_id)
+            return
+        
+        begin, end = self.get_range(length, 0)
+        found = np.nonzero(self.ids[begin:end] == _id)[0]
+        if len(found) == 0:
+            raise KeyError(_id)
+        pos = begin + found[0]
+        for array in (self.lengths, self.ids):
+            array[pos:self.size-1] = array[pos+1:self.size].copy()
+        self.size -= 1
+    
+    def extend(self, lengths, ids):
+        '''adds batch of edges (lengths - array of floats, nan is undefined)'''
+        
+        lengths = np.asarray(lengths, dtype=float).reshape(-1)
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        isNan = np.isnan(lengths)
+        self.undefined.extend(ids[isNan].tolist())
+        
+        lengths = np.concatenate((self.lengths[:self.size], lengths[~isNan]))
+        ids = np.concatenate((self.ids[:self.size], ids[~isNan]))
+        order = np.argsort(lengths, kind='stable')
+        self.size = 0
+        self.reserve(len(order))
+        self.lengths[:len(order)], self.ids[:len(order)] = lengths[order], ids[order]
+        self.size = len(order)
+    
+    def clear(self):
+        
+        self.size = 0
+        self.undefined = []
+    
+    def get_range(self, length, tolerance):
+        '''returns [begin, end) range of lengths within tolerance from length'''
+        
+        lengths = self.lengths[:self.size]
+        begin = int(np.searchsorted(lengths, length-tolerance, side='left'))
+        end = int(np.searchsorted(lengths, length+tolerance, side='right'))
+        
+        return begin, end
+    
+    def find(self, length, tolerance=0):
+        '''returns ids of the edges with the length within tolerance'''
+        
+        if length is None:
+            return list(self.undefined)
+        begin, end = self.get_range(length, tolerance)
+        
+        return self.ids[begin:end].tolist()
+    
+    def get_lengths(self):
+        '''returns sorted list of distinct lengths'''
+        return np.unique(self.lengths[:self.size]).tolist()
+    
+    def get_shells(self, tolerance):
+        '''
+        returns edges grouped into shells of lengths: the new shell starts 
+        when the gap between sorted lengths is larger than tolerance
+        
+        returns: [{"dist":_, "lengths":[...], "ids":[...]}, ...] where "dist" 
+                 is the mean length and "lengths" are distinct lengths
+        
+        '''
+        lengths = self.lengths[:self.size]
+        bounds = np.nonzero(np.diff(lengths) > tolerance)[0] + 1
+        bounds = [0] + bounds.tolist() + [self.size] if self.size > 0 else []
+        
+        return [{"dist": round(float(np.mean(lengths[begin:end])), 4),
+                 "lengths": np.unique(lengths[begin:end]).tolist(),
+                 "ids": self.ids[begin:end].tolist()}
+                for begin, end in zip(bounds[:-1], bounds[1:])]
+    
+    def __len__(self):
+        return self.size + len(self.undefined)
+    
+
+class EdgesLengthView(Mapping):
+    '''
+    read-only {length: [edges ids]} view of the LengthIndex used as 
+    UnitCell.lengthDic (lengths are exact keys in increasing order)
+    
+    '''
+    def __init__(self, index):
+        
+        self.index = index
+        
+    def __getitem__(self, length):
+        
+        ids = self.index.find(length)
+        if len(ids) == 0:
+            raise KeyError(length)
+            
+        return ids
+    
+    def __iter__(self):
+        
+        for length in self.index.get_lengths():
+            yield length
+        if len(self.index.undefined) > 0:
+            yield None
+    
+    def __len__(self):
+        return len(self.index.get_lengths()) + (len(self.index.undefined) > 0)
+
+
 class ClusterVertices(object):
-    '''Class containing cluster data of Vertices'''
+    '''
+    Class containing cluster data of Vertices
+    
+    Vertices are stored site by site: vertex of the j-th UC vertex placed 
+    on the lattice site sites[k] has index k*num_UC+j in the arrays. 
+    The sites added by growing the cluster are appended to the end, so that 
+    indexes of the existing vertices are kept.
     
-    def __init__(self, UC, lattice, size):
+    '''
+    def __init__(self, UC, lattice, size, geometry=None):
         '''
          dictionaries which binds UC_id as a key and list of site indeces
          pointing on the data of the same element extendet on lattice
@@ -340,94 +1196,520 @@ class ClusterVertices(object):
         '''
         self.UC = UC
         self.lattice = lattice
-        self.process_vertices(size) # will be later used for resizing cluster
+        # will be later used for resizing cluster
+        self.process_vertices(size, geometry) 
         
-    def process_vertices(self, size):
-        '''compute cluseterVertex parameters from UC'''
+    def process_vertices(self, size, geometry=None):
+        '''
+        compute cluseterVertex parameters from UC
         
+        input: geometry - cached arrays (see GeometryCache) used instead
+                          of computing them
+        
+        '''
+        self.size  = self.L, self.W, self.H = size
+        self.N = self.L*self.W*self.H
+        self.process_UC()
+        
+        if geometry is not None:
+            self.sites = geometry["vertices_sites"]
+            self.siteIndex = geometry["vertices_siteIndex"]
+            self.sitesCoord = geometry["sitesCoord"]
+            self.ids = geometry["vertices_ids"]
+            self.types = geometry["vertices_types"]
+            self.coords = geometry["vertices_coords"]
+            return
+        
+        # lattice sites (same order as itertools.product) and their positions
+        self.sites = np.indices(size).reshape(3,-1).T
+        self.siteIndex = np.arange(self.N).reshape(size)
         self.sitesCoord = self.lattice.get_finite_lattice_sites(size)
+        self.ids = np.tile(self.UC_ids, self.N)  # UC vertex id
+        self.types = np.tile(self.UC_types, self.N)
+        self.coords = self.get_coords(self.sitesCoord)
+
+    def process_UC(self):
+        '''store ids, types and Cartesian coordinates of the UC vertices'''
+        
+        vertices = list(self.UC.vertices.values())
+        self.num_UC = len(vertices)
+        self.UC_ids = np.array([vertex.id for vertex in vertices], dtype=int)
+        self.UC_types = np.array([vertex.type for vertex in vertices], dtype=int)
+        coords = np.array([vertex.coords for vertex in vertices], dtype=float)
+        self.UC_coords = self.lattice.convert_to_Cartesian(coords.reshape(-1,3).T).T
+        # UC vertex id -> ordinal (position in UC), -1 for undefined ids 
+        self.UC_ord = np.full(np.max(self.UC_ids, initial=-1)+1, -1, dtype=int)
+        self.UC_ord[self.UC_ids] = np.arange(self.num_UC)
+        self.array_ind = {} #{UC_vertex_id: range of cluster array indexes}
+        for j, _id in enumerate(self.UC_ids):
+            self.array_ind[_id] = range(j, self.num_UC*self.N, self.num_UC)
+
+    def get_coords(self, sitesCoord):
+        '''returns coordinates of the vertices placed on the given sites'''
+        
+        coords = sitesCoord[:,np.newaxis,:] + self.UC_coords[np.newaxis,:,:]
+        
+        return coords.reshape(-1,3)
+        
+    def grow(self, size):
+        '''
+        extends cluster to the larger size appending the vertices of the 
+        new lattice sites only (indexes of the existing vertices are kept)
+        
+        '''
+        oldSize, oldN = np.array(self.size), self.N
+        sites = np.indices(size).reshape(3,-1).T
+        newSites = sites[np.any(sites >= oldSize, axis=1)]
+        siteIndex = np.empty(size, dtype=int)
+        siteIndex[:self.L,:self.W,:self.H] = self.siteIndex
+        siteIndex[tuple(newSites.T)] = np.arange(oldN, oldN+len(newSites))
+        newCoord = self.lattice.convert_to_Cartesian(newSites.T).T.reshape(-1,3)
+        
         self.size  = self.L, self.W, self.H = size
         self.N = self.L*self.W*self.H
+        self.sites = np.concatenate((self.sites, newSites))
+        self.siteIndex = siteIndex
+        self.sitesCoord = np.concatenate((self.sitesCoord, newCoord))
+        self.ids = np.concatenate((self.ids, np.tile(self.UC_ids, len(newSites))))
+        self.types = np.concatenate((self.types, np.tile(self.UC_types, len(newSites))))
+        self.coords = np.concatenate((self.coords, self.get_coords(newCoord)))
+        self.process_UC()
+        
+    def get_arrayIndex(self, ids, latticeIndex):
+        '''
+        get indexes in vertices arrays of the UC vertices placed on the
+        lattice sites
         
-        self.ids = []    # UC edge id
-        self.types =  []
-        self.coords = [] # [cluster_vertex_coords, ...]
-        self.array_ind = {} #{UC_vertex_id:[cluster array indexes] }
-                
-        count = 0
-        for key,vertex in self.UC.vertices.items():
-            num = self.N
-            self.array_ind[vertex.id] = range(count,count+num)
-            self.ids += [vertex.id]*self.N
-            self.types += [vertex.type]*self.N
-            coords=self.sitesCoord + \
-                    self.lattice.convert_to_Cartesian(vertex.coords)
-            self.coords.append(coords)
-            count += 1
+        input: ids - UC vertex id or array of ids
+               latticeIndex - lattice site index (x,y,z) or array of them 
+                              (...x3) broadcastable with ids
         
-        self.ids = np.array(self.ids, dtype = int)
-        self.types = np.array(self.types, dtype = int)
-        self.coords = np.vstack(tuple(self.coords))
- 
-    def get_arrayIndex(self, _id, latticeIndex):
-        '''get index in vertices array based on lattice site index (X,y,x)'''
-        
-        x,y,z = latticeIndex
-        ind = list(self.UC.vertices.keys()).index(_id)
-        if (0<=x<self.L)and(0<=y<self.W)and(0<=z<self.H):
-            return ind*self.N + x*self.W*self.H + y*self.H + z
-        else:  
-            return None # if index is ouside of the cluster
+        returns: array of indexes, -1 if site is outside of the cluster or 
+                 vertex is not defined (single index or None for single id 
+                 and site)
+        
+        '''
+        ids = np.asarray(ids, dtype=int)
+        sites = np.asarray(latticeIndex, dtype=int)
+        valid = (ids >= 0) & (ids < len(self.UC_ord))
+        ords = np.where(valid, self.UC_ord[np.where(valid, ids, 0)], -1)
+        inside = np.all((sites >= 0) & (sites < np.array(self.size)), axis=-1)
+        inside &= ords >= 0
+        sites = np.where(inside[...,np.newaxis], sites, 0)
+        ind = np.where(inside, self.siteIndex[sites[...,0], sites[...,1], sites[...,2]]
+                               *self.num_UC + ords, -1)
+        if ind.ndim == 0:
+            return None if ind < 0 else int(ind)
+        
+        return ind
   
     
+class NeighbourIndex(object):
+    '''
+    Cell list spatial index of the UC vertices and their periodic images.
+    
+    It is used for searching all pairs of vertices within arbitrary cutoff 
+    distance in time and memory proportional to the number of found pairs.
+    
+    '''
+    NEIGHBOURS = 50 # number of neighbours used for default shells cutoff
+    shellsCache = None # GeometryCache of coordination shells (see get_shells)
+    
+    def __init__(self, UC, lattice):
+        
+        self.UC = UC
+        self.lattice = lattice
+        self.ids = np.array(list(UC.vertices.keys()), dtype=int)
+        self.types = np.array([vertex.type for vertex in UC.vertices.values()], dtype=int)
+        self.coords = np.array([vertex.coords for vertex in UC.vertices.values()],
+                               dtype=float).reshape(-1,3)
+        # only the first "dimension" lattice directions are periodic
+        self.periodic = np.arange(3) < int(UC.atrib["dimension"])
+        self.cutoff, self.pairs = None, None # result of the largest query
+    
+    def fingerprint(self):
+        '''returns content hash of the indexed vertices and the lattice'''
+        
+        sha = hashlib.sha1(self.lattice.fingerprint().encode())
+        sha.update(self.periodic.tobytes())
+        sha.update(np.column_stack((self.ids, self.types)).astype(np.int64).tobytes())
+        sha.update((np.round(self.coords, 10) + 0.0).tobytes())
+        
+        return sha.hexdigest()
+        
+    def get_images_range(self, cutoff):
+        '''
+        returns (nx,ny,nz) - the max cell offset of the periodic images which
+        can be within cutoff distance from the vertices in the origin cell
+        
+        '''
+        # rows of pseudo inverse are reciprocal vectors (works for 2D lattice)
+        reciprocal = np.linalg.pinv(self.lattice.basisMatrix)
+        reach = cutoff*np.linalg.norm(reciprocal, axis=1)
+        span = np.ptp(self.coords, axis=0)
+        n = np.ceil(reach + span).astype(int)
+        n[~self.periodic] = 0
+        
+        return n
+
+    def get_pairs(self, cutoff):
+        '''
+        search all pairs of vertices within cutoff distance
+        
+        returns: source_target - Mx2 array of vertices ids
+                 offsets - Mx3 array of target offsets
+                 dists - array of M distances
+                 
+        each pair is returned once in the edge standart form
+        
+        '''
+        if self.cutoff is None or cutoff > self.cutoff:
+            self.cutoff, self.pairs = cutoff, self.search_pairs(cutoff)
+        
+        source_target, offsets, dists = self.pairs
+        found = dists <= cutoff
+        
+        return source_target[found], offsets[found], dists[found]
+        
+    def search_pairs(self, cutoff):
+        '''search pairs of vertices within cutoff using cell list'''
+        
+        num = len(self.coords)
+        if num == 0 or cutoff <= 0:
+            return np.zeros((0,2), dtype=int), np.zeros((0,3), dtype=int), np.zeros(0)
+        
+        # periodic images: (num_images*num, 3) with images offsets in cells
+        nx, ny, nz = self.get_images_range(cutoff)
+        cells = np.indices((2*nx+1, 2*ny+1, 2*nz+1)).reshape(3,-1).T - [nx,ny,nz]
+        images = (cells[:,np.newaxis,:] + self.coords[np.newaxis,:,:]).reshape(-1,3)
+        imagesCoords = self.lattice.convert_to_Cartesian(images.T).T
+        verticesCoords = self.lattice.convert_to_Cartesian(self.coords.T).T
+        
+        # sort images by cubic bins of the cutoff size
+        bins = np.floor(imagesCoords/cutoff).astype(int)
+        binMin = bins.min(axis=0) - 1
+        shape = bins.max(axis=0) - binMin + 2
+        keys = np.ravel_multi_index((bins - binMin).T, shape)
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        
+        # collect candidates from 27 neighbouring bins of every vertex
+        vertexBins = np.floor(verticesCoords/cutoff).astype(int) - binMin
+        source, target = [], []
+        for shift in itertools.product((-1,0,1), repeat=3):
+            query = np.ravel_multi_index((vertexBins + shift).T, shape)
+            begin = np.searchsorted(keys, query, side='left')
+            end = np.searchsorted(keys, query, side='right')
+            counts = end - begin
+            total = np.sum(counts)
+            if total == 0:
+                continue
+            # indexes of sorted images in [begin, end) ranges of every vertex
+            start = np.repeat(begin - np.cumsum(counts) + counts, counts)
+            source.append(np.repeat(np.arange(num), counts))
+            target.append(order[start + np.arange(total)])
+            
+        source, target = np.hstack(source), np.hstack(target)
+        dists = np.linalg.norm(imagesCoords[target] - verticesCoords[source], axis=1)
+        offsets = cells[target // num]
+        target = target % num
+        
+        # keep pairs within cutoff which are in the edge standart form
+        nonzero = offsets != 0
+        first = offsets[np.arange(len(offsets)), np.argmax(nonzero, axis=1)]
+        isZero = ~np.any(nonzero, axis=1)
+        standart = np.where(isZero, source < target, first > 0)
+        found = standart & (dists <= cutoff)
+        
+        source, target = self.ids[source[found]], self.ids[target[found]]
+        offsets, dists = offsets[found], dists[found]
+        order = np.lexsort((offsets[:,2], offsets[:,1], offsets[:,0], target, source))
+        
+        return (np.vstack((source, target)).T[order], offsets[order], dists[order])
+    
+    def get_shells(self, cutoff=None, ndigits=4, num=None):
+        '''
+        returns coordination shells: distinct distances between vertices 
+        (including periodic images) up to cutoff sorted by distance
+        
+        input: cutoff - max distance (default: radius of the sphere which 
+                        contains about NEIGHBOURS vertices around each vertex)
+               ndigits - distances closer than 10**-ndigits belong to the 
+                         same shell, shell distance is rounded to ndigits 
+               num - max number of returned shells (default: all)
+        
+        returns: [{"dist":_, "num":_, "types":[(type1,type2),...]}, ...]
+                 where "num" is the number of edges (per unit cell) and 
+                 "types" are the types of vertices connected by the shell
+        
+        Shells are cached by the vertices and lattice fingerprint.
+        
+        '''
+        if cutoff is None:
+            cutoff = self.get_default_cutoff()
+        
+        key = (self.fingerprint(), float(cutoff), ndigits)
+        shells = self.shellsCache.get(key)
+        if shells is None:
+            shells = self.search_shells(cutoff, ndigits)
+            self.shellsCache.put(key, shells)
+        
+        # rows of "types" are sorted by shell index
+        dists, nums = shells["dists"][:num].tolist(), shells["nums"][:num].tolist()
+        bounds = np.searchsorted(shells["types"][:,0], np.arange(len(dists)+1)).tolist()
+        
+        return [{"dist": dists[j], "num": nums[j], "types": 
+                 [tuple(t) for t in shells["types"][bounds[j]:bounds[j+1],1:].tolist()]}
+                for j in range(len(dists))]
+    
+    def get_default_cutoff(self):
+        '''returns default cutoff of the coordination shells search'''
+        
+        basisMatrix = np.asarray(self.lattice.basisMatrix, dtype=float)
+        volume = abs(np.linalg.det(basisMatrix))
+        if len(self.coords) > 0 and volume > 0:
+            density = len(self.coords)/volume
+            return float((3*self.NEIGHBOURS/(4*np.pi*density))**(1/3))
+        # shortest periodic lattice vector
+        lengths = np.linalg.norm(basisMatrix, axis=0)[self.periodic]
+        
+        return float(np.min(lengths)) if len(lengths) > 0 else 0.0
+        
+    def search_shells(self, cutoff, ndigits):
+        '''
+        returns {"dists":_, "nums":_, "types":_} arrays of coordination 
+        shells, "types" rows are (shell index, type1, type2) 
+        
+        '''
+        source_target, offsets, dists = self.get_pairs(cutoff)
+        order = np.argsort(dists, kind='stable')
+        dists, source_target = dists[order], source_target[order]
+        # new shell starts when the gap between sorted distances is large
+        shellInd = np.cumsum(np.diff(dists, prepend=dists[:1]) > 10.0**-ndigits)
+        nums = np.bincount(shellInd)
+        dists = np.round(np.bincount(shellInd, dists)/np.maximum(nums, 1), ndigits)
+        
+        order = np.argsort(self.ids)
+        types = self.types[order[np.searchsorted(self.ids, source_target, sorter=order)]]
+        types = np.column_stack((shellInd, np.sort(types, axis=1))).reshape(-1,3)
+        
+        return {"dists": dists, "nums": nums, "types": np.unique(types, axis=0)}
+    
+    
 class ClusterEdges(object):
     '''Class containing cluster data of Edges'''
     
-    def __init__(self, UC, vertices, lattice, size):
+    version = 0 # is increased by every change of the edges arrays
+    
+    def __init__(self, UC, vertices, lattice, size, geometry=None):
 
         self.UC = UC
         self.vertices = vertices
         self.lattice = lattice
         
-        self.process_edges(size) # will be later used for resizing cluster
-        self.compute_distMatrix() # is used for searching vertices by distance
+        # will be later used for resizing cluster
+        self.process_edges(size, geometry)
+        # is used for searching vertices by distance
+        self.neighbours = NeighbourIndex(UC, lattice)
+
+    def process_edges(self, size, geometry=None):
+        '''
+        compute cluseterEdge parameters from UC
+        
+        input: geometry - cached arrays (see GeometryCache) used instead
+                          of expanding the UC edges
+        
+        '''
+
+        # list of lattice sites indexes (same order as vertices)
+        self.sites = self.vertices.sites
+        self.sitesCoord = self.vertices.sitesCoord
+        self.size  = self.L, self.W, self.H = size
+        self.N = self.L*self.W*self.H
+
+        edges = list(self.UC.edges.values())
+        # [(source_ind, target_ind), ...] ordered by UC edge and lattice site
+        if geometry is None:
+            source_target, nums = self.expand_edges(edges)
+        else:
+            source_target = geometry["edges_source_target"]
+            nums = geometry["edges_nums"]
+        self.reset_buffers(source_target, nums, edges)
+
+    def reset_buffers(self, source_target, nums, edges):
+        '''
+        (re)initialize edges buffers with the given data
+        
+        Cluster edges are stored in preallocated buffers which capacity is 
+        doubled when exhausted. Removed edges are marked as dead (tombstones)
+        and the buffers are compacted lazily on the next access to the
+        ids, types, source_target or array_ind.
+        
+        '''
+        total = len(source_target)
+        capacity = max(2*total, 16)
+        self.version += 1
+        self._ids = np.zeros(capacity, dtype=int)
+        self._types = np.zeros(capacity, dtype=int)
+        self._source_target = np.zeros((capacity,2), dtype=int)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._size = total
+        self._num_dead = 0
+        self._array_ind = {} #{UC edges_id: range of buffers indexes}
+
+        self._ids[:total] = np.repeat(np.array([edge.id for edge in edges], dtype=int), nums)
+        self._types[:total] = np.repeat(np.array([edge.type for edge in edges], dtype=int), nums)
+        self._source_target[:total] = source_target
+        self._alive[:total] = True
+
+        count = 0
+        for edge, num in zip(edges, nums):
+            self._array_ind[edge.id] = range(count,count+num)
+            count += num
+
+    def reserve(self, num):
+        '''makes sure that num more edges can be added without reallocation'''
+        
+        capacity = len(self._ids)
+        if self._size + num <= capacity:
+            return
+        
+        capacity = max(2*capacity, self._size + num)
+        for name in ('_ids', '_types', '_source_target', '_alive'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,)+old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def compact(self):
+        '''removes dead edges from the buffers and remaps array_ind'''
+        
+        if self._num_dead == 0:
+            return
+        
+        size = self._size
+        alive = self._alive[:size]
+        # number of dead edges in front of each buffer index
+        deadBefore = np.concatenate(([0], np.cumsum(~alive)))
+        for _id, ind in self._array_ind.items():
+            shift = deadBefore[ind.start]
+            self._array_ind[_id] = range(ind.start-shift, ind.stop-shift)
+        
+        num = size - self._num_dead
+        self._ids[:num] = self._ids[:size][alive]
+        self._types[:num] = self._types[:size][alive]
+        self._source_target[:num] = self._source_target[:size][alive]
+        self._alive[:num] = True
+        self._alive[num:size] = False
+        self._size = num
+        self._num_dead = 0
+
+    @property
+    def ids(self):
+        '''UC edge id of each cluster edge'''
+        self.compact()
+        return self._ids[:self._size]
+
+    @property
+    def types(self):
+        '''type of each cluster edge'''
+        self.compact()
+        return self._types[:self._size]
+
+    @property
+    def source_target(self):
+        '''[(source_ind, target_ind), ...] - indexes in vertices arrays'''
+        self.compact()
+        return self._source_target[:self._size]
+
+    @property
+    def array_ind(self):
+        '''{UC edges_id: range of cluster array indexes}'''
+        self.compact()
+        return self._array_ind
+
+    def expand_edges(self, edges, oldSize=None):
+        '''
+        extend the list of UC edges over all lattice sites of the cluster
+        
+        input: oldSize - size of the cluster before growing, if provided only
+                         the edges connecting the new sites are returned
+        
+        returns: source_target - Mx2 numpy array of vertices array indexes 
+                                 ordered by edge and lattice site
+                 nums - number of cluster edges created from each UC edge
+        
+        '''
+        if len(edges) == 0:
+            return np.zeros((0,2), dtype=int), np.zeros(0, dtype=int)
 
-    def process_edges(self, size):
-        '''compute cluseterEdge parameters from UC'''
+        source_ids = np.array([edge.source for edge in edges], dtype=int)[:,np.newaxis]
+        target_ids = np.array([edge.target for edge in edges], dtype=int)[:,np.newaxis]
+        offsets = np.array([edge.offset for edge in edges], dtype=int)[:,np.newaxis,:]
+
+        def inside(sites, size):
+            return np.all((sites >= 0) & (sites < np.array(size)), axis=2)
+
+        # broadcast (num_edges, num_sites, 3) source and target sites 
+        if oldSize is None:
+            sources = np.broadcast_to(self.sites, (len(edges),)+self.sites.shape)
+            targets = sources + offsets
+            mask = inside(targets, self.size)
+        else: # new sites are sources or targets of the edges from old sites
+            newSites = self.sites[np.newaxis,int(np.prod(oldSize)):,:]
+            newSites = np.broadcast_to(newSites, (len(edges),)+newSites.shape[1:])
+            sources = np.concatenate((newSites, newSites - offsets), axis=1)
+            targets = np.concatenate((newSites + offsets, newSites), axis=1)
+            mask = np.concatenate((inside(targets[:,:newSites.shape[1]], self.size),
+                                   inside(sources[:,newSites.shape[1]:], oldSize)), 
+                                  axis=1)
+        
+        source = self.vertices.get_arrayIndex(
+                    np.broadcast_to(source_ids, mask.shape)[mask], sources[mask])
+        target = self.vertices.get_arrayIndex(
+                    np.broadcast_to(target_ids, mask.shape)[mask], targets[mask])
+        
+        return np.vstack((source, target)).T, np.sum(mask, axis=1)
+
+    def grow(self, oldSize):
+        '''
+        append the edges connecting the lattice sites added by growing 
+        vertices from oldSize (indexes of the existing edges may shift)
+        
+        returns: indexes of the new edges in the edges arrays
         
-        self.sitesCoord = self.lattice.get_finite_lattice_sites(size)
-        # list of lattice sites indexes
-        self.sites = np.array(list(itertools.product(*(range(d) for d in size))))
-        self.size  = self.L, self.W, self.H = size
+        '''
+        self.sites = self.vertices.sites
+        self.sitesCoord = self.vertices.sitesCoord
+        self.size  = self.L, self.W, self.H = self.vertices.size
         self.N = self.L*self.W*self.H
-                
-        self.ids=[]    # UC edge id
-        self.types=[]
-        self.source_target=[]     # [(source_ind, target_ind), ...]
-        self.array_ind={}  #{UC edges_id:[cluster array indexes] }
-               
-        count = 0
-        for key,edge in self.UC.edges.items():
-            num = 0
-            for site in self.sites: 
-                source = self.vertices.get_arrayIndex(edge.source, site)
-                target = self.vertices.get_arrayIndex(edge.target, 
-                                                 site+edge.offset)
-                if (source is not None) and (target is not None):                
-                    self.source_target.append((source,target))
-                    num +=1
-            self.ids += [edge.id]*num
-            self.types += [edge.type]*num
-            self.array_ind[edge.id] = range(count,count+num)
-            count += num
-            
-        self.ids = np.array(self.ids, dtype = int)
-        self.types = np.array(self.types, dtype = int)
-        self.source_target = np.array(self.source_target, dtype = int)
+        
+        edges = list(self.UC.edges.values())
+        source_target, nums = self.expand_edges(edges, oldSize)
+        
+        # only reads the buffers, new ones are created by reset_buffers
+        old = [self._array_ind[edge.id] for edge in edges]
+        oldNums = np.array([len(ind) for ind in old], dtype=int)
+        oldInd = np.concatenate([np.arange(ind.start, ind.stop, dtype=int) 
+                                 for ind in old] + [np.zeros(0, dtype=int)])
+        
+        # new edges of each UC edge are placed after its old ones
+        total = oldNums + nums
+        starts = np.cumsum(total) - total
+        newInd = (np.repeat(starts + oldNums - (np.cumsum(nums) - nums), nums) + 
+                  np.arange(len(source_target)))
+        merged = np.empty((np.sum(total),2), dtype=int)
+        isOld = np.ones(len(merged), dtype=bool)
+        isOld[newInd] = False
+        merged[isOld] = self._source_target[oldInd]
+        merged[newInd] = source_target
+        self.reset_buffers(merged, total, edges)
+        
+        return newInd
         
     def get_site(self, vertex_ind):
         '''Return lattice site of the vertex'''
-        return self.sites[vertex_ind-self.N*self.vertices.ids[vertex_ind]]           
+        return self.sites[vertex_ind // self.vertices.num_UC]
     
     def add_edge(self, sourse_ind, target_ind):
         '''
@@ -445,24 +1727,18 @@ class ClusterEdges(object):
         if _id is None: # edge is duplicate
             return None
         else:            
-            source_target=[]     # [(source_ind, target_ind), ...]                   
-            count = len(self.ids)
-            num = 0
-            for site in self.sites: 
-                source = self.vertices.get_arrayIndex(edge.source, site)
-                target = self.vertices.get_arrayIndex(edge.target,
-                                                      site+edge.offset)
-                if(source is not None)and(target is not None):                
-                    source_target.append((source,target))
-                    num +=1
-    
-            self.array_ind[edge.id] = range(count,count+num)
-            self.ids = np.hstack((self.ids, np.array([edge.id]*num)))
-            self.types = np.hstack((self.types,[edge.type]*num))
-            if self.UC.num_edges == 1:
-                self.source_target = np.array(source_target)
-            else:    
-                self.source_target = np.vstack((self.source_target,source_target))
+            source_target, nums = self.expand_edges([edge])
+            num = nums[0]
+            
+            self.reserve(num)
+            begin, end = self._size, self._size+num
+            self._ids[begin:end] = edge.id
+            self._types[begin:end] = edge.type
+            self._source_target[begin:end] = source_target
+            self._alive[begin:end] = True
+            self._size = end
+            self._array_ind[edge.id] = range(begin, end)
+            self.version += 1
             
             return _id
 
@@ -471,52 +1747,12 @@ class ClusterEdges(object):
         
         if self.UC.edges.get(_id) is not None:
             self.UC.remove_edge(_id)
-            # change edge lattice arrays
-            indexes = list(self.array_ind[_id])
-            self.ids = np.delete(self.ids,indexes)
-            self.types = np.delete(self.types,indexes)
-            self.source_target=np.delete(self.source_target,indexes,axis=0)
-            self.array_ind = {}
-            for key in self.UC.edges.keys():
-                self.array_ind[key]=[]
-            for j in range(len(self.ids)):
-                self.array_ind[self.ids[j]].append(j)    
-
-    def compute_distMatrix(self):
-        '''
-        compute Euclidian distance matrix for vetices within UC 
-        and to neigbouring atoms in cells defined by d_site offset
-        
-        it is latter used  self.search_edges_by_dist method
-        
-        '''
-        if self.UC.atrib["dimension"] == "3":
-            sites = [[0,0,0],[1,0,0],[0,1,0],[0,0,1],[1,1,0],
-                     [1,0,1],[0,1,1],[1,-1,0],[1,0,-1],[0,1,-1],
-                     [1,1,1],[-1,1,1],[1,-1,1],[1,1,-1]]
-        else: # if dimension = "2"
-            sites = [[0,0,0],[1,0,0],[0,1,0],[1,1,0],[1,-1,0]]
-            
-        self.d_sites = np.array(sites)
-        sitesCoords = self.lattice.convert_to_Cartesian(self.d_sites.T).T
-        
-        verticesCoords0 = [] # [cluster_vertex_coords, ...]
-        for key,vertex in self.UC.vertices.items():
-            coords=self.lattice.convert_to_Cartesian(vertex.coords)
-            verticesCoords0.append(coords)
-        verticesCoords0 = np.vstack(tuple(verticesCoords0))
-        
-        verticesCoords = []
-        for site in sitesCoords:
-            verticesCoords.append(verticesCoords0+site)         
-        
-        verticesCoords = np.vstack(tuple(verticesCoords))
-        
-        xx, yy = np.meshgrid(np.arange(self.UC.num_vertices),
-                             np.arange(self.UC.num_vertices*len(sites)))
-        
-        self.distMatrix = np.linalg.norm(verticesCoords[xx]-verticesCoords[yy],axis=2)      
-    
+            # mark edge instances as dead, buffers are compacted lazily
+            ind = self._array_ind.pop(_id)
+            self._alive[ind.start:ind.stop] = False
+            self._num_dead += len(ind)
+            self.version += 1
+
     def search_edges_by_dist(self, _type, dist, tolerance=0.1):
         '''
         search edges which corresponds to the same distance between 
@@ -527,18 +1763,30 @@ class ClusterEdges(object):
                 tolerance - distance calculation error (%) 
         
         '''
-        eps = dist*tolerance/100
-                
-        n_vert = self.UC.num_vertices
-        ind_pairs = np.vstack(np.where(np.abs(self.distMatrix-dist) < eps)).T
-        no_duplicates = np.where(ind_pairs[:,0]>ind_pairs[:,1])[0]
-                
-        for ind1, ind2 in ind_pairs[no_duplicates,:]:
-            offset = self.d_sites[int(ind2/n_vert),:]-self.d_sites[int(ind1/n_vert),:]
-            source_target = (ind1 % n_vert + 1,ind2 % n_vert + 1)
-            edge = Edge(0, _type, source_target, offset)
-            edge.length = dist
-            self.UC.add_edge(edge, RECOMPUTE_LENGTH=False)
+        self.search_edges_by_dists([(_type, dist, tolerance)])
+            
+    def search_edges_by_dists(self, searches):
+        '''
+        search edges of several distance shells at once: pairs of vertices 
+        are found once for the largest distance, edges of all shells are 
+        added to UC in one batch and cluster edges are expanded once
+        
+        input:  searches - [(type, dist, tolerance), ...] (see 
+                           search_edges_by_dist), in case of overlapping 
+                           shells the edge gets the type of the first one
+        
+        '''
+        searches = list(searches)
+        if len(searches) > 0:
+            cutoff = max(dist*(1+tolerance/100) for _type, dist, tolerance in searches)
+            source_target, offsets, dists = self.neighbours.get_pairs(cutoff)
+            found = [np.nonzero(np.abs(dists-dist) < dist*tolerance/100)[0]
+                     for _type, dist, tolerance in searches]
+            nums = [len(ind) for ind in found]
+            ind = np.concatenate(found)
+            self.UC.add_edges(source_target[ind], offsets[ind], 
+                              np.repeat([_type for _type, dist, tol in searches], nums),
+                              np.repeat([dist for _type, dist, tol in searches], nums))
             
         self.process_edges(self.size)
             
@@ -557,8 +1805,91 @@ class ClusterEdges(object):
         '''changes type of the edge with _id to new_type (int: 0,1,2,..)'''
         
         self.UC.edges[_id].type = new_type
-        indexes = list(self.array_ind[_id])
-        self.types[indexes] = new_type    
+        ind = self._array_ind[_id]
+        self._types[ind.start:ind.stop] = new_type
+        self.version += 1
+
+    
+class GeometryCache(object):
+    '''
+    Bounded LRU cache of the computed cluster geometry.
+    
+    Entries are keyed by (UC fingerprint, lattice fingerprint, size), so that 
+    returning to a previously visited cluster size or re-importing the same
+    lattice graph doesn't recompute vertices, edges and lattice lines.
+    Cached arrays are read-only since they are shared between clusters.
+    
+    '''
+    def __init__(self, max_entries=32, max_nbytes=256*2**20):
+        '''
+        input: max_entries - max number of cached geometries
+               max_nbytes - max total size of cached arrays in bytes
+               
+        '''
+        self.max_entries = max_entries
+        self.max_nbytes = max_nbytes
+        self.entries = OrderedDict() # {key: (geometry, nbytes)}
+        self.nbytes = 0
+        self.hits, self.misses = 0, 0
+        self.lock = threading.Lock() # clusters are resized in worker thread
+    
+    @staticmethod
+    def get_key(UC, lattice, size):
+        '''returns cache key of the cluster geometry'''
+        return UC.fingerprint(), lattice.fingerprint(), tuple(size)
+    
+    def get(self, key):
+        '''returns cached geometry dictionary or None'''
+        
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries[key] = entry # most recently used
+            self.hits += 1
+            
+            return entry[0]
+        
+    def put(self, key, geometry):
+        '''
+        caches geometry dictionary, least recently used entries are evicted
+        when the cache exceeds max_entries or max_nbytes
+        
+        '''
+        nbytes = 0
+        for array in geometry.values():
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+                nbytes += array.nbytes
+        
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.nbytes -= old[1]
+            self.entries[key] = (geometry, nbytes)
+            self.nbytes += nbytes
+            while len(self.entries) > 1 and (len(self.entries) > self.max_entries
+                                             or self.nbytes > self.max_nbytes):
+                self.nbytes -= self.entries.popitem(last=False)[1][1]
+    
+    def stats(self):
+        '''returns {"hits":_, "misses":_, "entries":_, "nbytes":_}'''
+        
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self.entries), "nbytes": self.nbytes}
+        
+    def clear(self):
+        '''removes all entries and resets statistics'''
+        
+        with self.lock:
+            self.entries.clear()
+            self.nbytes = 0
+            self.hits, self.misses = 0, 0
+
+
+NeighbourIndex.shellsCache = GeometryCache(max_entries=16)
 
     
 class CrystalCluster(object):
@@ -568,7 +1899,17 @@ class CrystalCluster(object):
     most of the fields are L*W*H sized arrays 
     j-element of array corresponds to data for j-lattice-UC
     
+    computed arrays are shared through geometryCache by the clusters
+    with the same UC, lattice and size
+    
+    sparse matrices of the cluster graph (adjacency, incidence) are cached
+    until the edges of the cluster are changed (see ClusterEdges.version)
+    
     ''' 
+    geometryCache = GeometryCache()
+    baseUC = None # UC of the cluster the resized copy is taken from
+    matricesEdges, matricesVersion = None, None # edges state of the matrices
+    
     def __init__(self, UC=UnitCell(), lattice=Lattice(), size=(1,1,1)):
 
         self.UC = UC
@@ -581,11 +1922,14 @@ class CrystalCluster(object):
     def initialize_atributes(self):
         '''generate other cluster atributes like: vertices, edges, lattice, arrows'''
         
-        self.vertices = ClusterVertices(self.UC, self.lattice, self.size)
-        self.edges = ClusterEdges(self.UC, self.vertices, self.lattice, self.size)        
-        self.sitesCoord = self.lattice.get_finite_lattice_sites(self.size)
-        self.generate_lattice()
+        key = self.geometryCache.get_key(self.UC, self.lattice, self.size)
+        geometry = self.geometryCache.get(key)
+        self.vertices = ClusterVertices(self.UC, self.lattice, self.size, geometry)
+        self.edges = ClusterEdges(self.UC, self.vertices, self.lattice, 
+                                  self.size, geometry)
+        self.update_geometry(key, geometry)
         self.generate_arrow()
+        self.growth = None
    
     def initialize_size(self, size):
         '''Initialize Size taking into account dimensionality'''
@@ -598,25 +1942,45 @@ class CrystalCluster(object):
         self.size  = self.L, self.W, self.H
         self.N = self.L*self.W*self.H
         
-    def generate_lattice(self):
-        '''generates coordinates of lattice net lines'''
+    def update_geometry(self, key, geometry):
+        '''
+        takes lattice arrays from the cached geometry or, if it is None, 
+        generates them and caches the geometry of the cluster
         
-        self.latticeLines = []
+        '''
+        if geometry is not None:
+            self.sitesCoord = geometry["sitesCoord"]
+            self.latticeLines = geometry["latticeLines"]
+            self.latticeOutline = geometry["latticeOutline"]
+            return
+            
+        self.sitesCoord = self.lattice.get_finite_lattice_sites(self.size)
+        self.generate_lattice()
+        self.geometryCache.put(key, self.get_geometry())
+        
+    def get_geometry(self):
+        '''returns dictionary of the cluster arrays (see GeometryCache)'''
+        
+        edges = self.UC.edges.values()
+        array_ind = self.edges.array_ind
+        
+        return {"sitesCoord": self.sitesCoord,
+                "latticeLines": self.latticeLines,
+                "latticeOutline": self.latticeOutline,
+                "vertices_ids": self.vertices.ids,
+                "vertices_types": self.vertices.types,
+                "vertices_coords": self.vertices.coords,
+                "vertices_sites": self.vertices.sites,
+                "vertices_siteIndex": self.vertices.siteIndex,
+                "edges_source_target": self.edges.source_target.copy(),
+                "edges_nums": np.array([len(array_ind[edge.id]) for edge in edges],
+                                       dtype=int)}
         
-        for i in range(self.L+1):
-            for j in range(self.W+1):
-                line = np.dot(self.lattice.basisMatrix,np.array([[i,i],[j,j],[0,self.H]])).T
-                self.latticeLines.append(line)
+    def generate_lattice(self):
+        '''generates coordinates of lattice net lines and its outline'''
         
-        for i in range(self.L+1):
-            for j in range(self.H+1):
-                line = np.dot(self.lattice.basisMatrix,np.array([[i,i],[0,self.W],[j,j]])).T
-                self.latticeLines.append(line)
-
-        for i in range(self.W+1):
-            for j in range(self.H+1):
-                line = np.dot(self.lattice.basisMatrix,np.array([[0,self.L],[i,i],[j,j]])).T
-                self.latticeLines.append(line)
+        # nx2x3 and 12x2x3 arrays memoized by lattice
+        self.latticeLines, self.latticeOutline = self.lattice.get_lattice_lines(self.size)
        
     def generate_arrow(self):
         '''generates coordinates of arrows lines'''        
@@ -624,13 +1988,252 @@ class CrystalCluster(object):
         self.arrowVec=np.dot(self.lattice.basisMatrix,ucVec).T    
         
     def reset_size(self,size):
-        '''resize cluseter'''        
+        '''
+        resize cluseter, in case cluster grows only the added lattice sites 
+        and edges are computed and self.growth is set to 
+        {"size": old size, "vertices": old number of vertices, 
+         "edges": indexes of the new edges}
+        
+        '''
+        oldSize = self.size
         self.initialize_size(size)               
-        self.vertices.process_vertices(self.size)
-        self.edges.process_edges(self.size)
-        self.sitesCoord = self.lattice.get_finite_lattice_sites(self.size)
-        self.generate_lattice()
+        key = self.geometryCache.get_key(self.UC, self.lattice, self.size)
+        geometry = self.geometryCache.get(key)
+        if geometry is None and self.is_growth(oldSize):
+            numVertices = len(self.vertices.ids)
+            self.vertices.grow(self.size)
+            newEdges = self.edges.grow(oldSize)
+            self.growth = {"size": oldSize, "vertices": numVertices, 
+                           "edges": newEdges}
+        else:
+            self.vertices.process_vertices(self.size, geometry)
+            self.edges.process_edges(self.size, geometry)
+            self.growth = None
+        self.update_geometry(key, geometry)
         self.generate_arrow()
+
+    def is_growth(self, oldSize):
+        '''
+        True if the cluster grows from oldSize and its arrays are still in 
+        sync with UC, so that only the new sites have to be computed
+        
+        '''
+        if self.size == tuple(oldSize) or np.any(np.less(self.size, oldSize)):
+            return False
+        
+        return (list(self.UC.vertices.keys()) == list(self.vertices.UC_ids) and
+                set(self.UC.edges.keys()) == set(self.edges._array_ind.keys()))
+
+    def copy_for_resize(self, UC=None):
+        '''
+        returns copy of the cluster which can be resized by compute_size
+        in a worker thread while this cluster and its UC are edited
+        
+        input: UC - snapshot of self.UC used by the copy instead of self.UC
+                    (see UnitCell.snapshot)
+        
+        '''
+        # editing of the edges modifies array_ind and the buffers in place, so 
+        # the copy takes compacted array_ind and source_target of its own, 
+        # other arrays are replaced (not modified) by resizing
+        self.edges.compact()
+        cluster = copy.copy(self)
+        cluster.vertices = copy.copy(self.vertices)
+        cluster.edges = copy.copy(self.edges)
+        cluster.edges._array_ind = dict(self.edges._array_ind)
+        cluster.edges._source_target = self.edges._source_target.copy()
+        cluster.edges.vertices = cluster.vertices
+        cluster.baseUC = self.UC
+        if UC is not None:
+            cluster.UC = cluster.vertices.UC = cluster.edges.UC = UC
+        
+        return cluster
+    
+    def compute_size(self, size, cluster=None):
+        '''
+        computes the geometry of resized cluster without changing this one
+        
+        input: cluster - copy of this cluster returned by copy_for_resize, 
+                         if it is taken in the thread editing the cluster, 
+                         compute_size can be called from a worker thread
+                         (default: copy is taken here)
+        
+        returns: resized copy of the cluster (see apply_size)
+        
+        '''
+        if cluster is None:
+            cluster = self.copy_for_resize()
+        cluster.reset_size(size)
+        
+        return cluster
+    
+    def apply_size(self, cluster):
+        '''resize cluster taking over the geometry computed by compute_size'''
+        
+        if cluster.baseUC is not self.UC or cluster.lattice is not self.lattice:
+            raise ValueError("cluster was computed for another UC or lattice")
+        cluster.edges.neighbours = self.edges.neighbours # keep search cache
+        # UC snapshot used by the computation is replaced by UC itself
+        cluster.UC = cluster.vertices.UC = cluster.edges.UC = self.UC
+        self.__dict__.update(cluster.__dict__)
+    
+    def get_cached_matrix(self, key, compute):
+        '''
+        returns matrix cached by key, the cache is dropped when the 
+        cluster edges are changed or replaced
+        
+        '''
+        edges = self.edges
+        if self.matricesEdges is not edges or self.matricesVersion != edges.version:
+            # new dict, since compute_size shares the attributes with the copy
+            self.matrices = {}
+            self.matricesEdges, self.matricesVersion = edges, edges.version
+        
+        matrix = self.matrices.get(key)
+        if matrix is None:
+            matrix = self.matrices[key] = compute()
+            
+        return matrix
+    
+    def get_edges_weights(self, _type=None, couplings=None):
+        '''
+        returns weights of the cluster edges (zero weighted edges are ignored)
+        
+        input: _type - only edges of the given type have weight 1
+               couplings - {edge type: coupling J} weights by edge type
+               (by default all the edges have weight 1)
+        
+        '''
+        types = self.edges.types
+        if couplings is not None:
+            weights = np.zeros(len(types), dtype=float)
+            for key, value in couplings.items():
+                weights[types == key] = value
+        elif _type is not None:
+            weights = (types == _type).astype(float)
+        else:
+            weights = np.ones(len(types), dtype=float)
+        
+        return weights
+    
+    @staticmethod
+    def get_matrix_key(_type=None, couplings=None):
+        '''returns hashable key of the edges weights'''
+        
+        if couplings is not None:
+            return ("couplings", tuple(sorted(couplings.items())))
+        return ("type", _type)
+    
+    def get_adjacency_coo(self, _type=None, couplings=None):
+        '''
+        returns (row, col, data) arrays of the symmetric adjacency matrix
+        of the cluster graph (each edge i-j gives (i,j) and (j,i) entries),
+        numpy only, no dense matrix is created
+        
+        input: see get_edges_weights
+        
+        '''
+        def compute():
+            weights = self.get_edges_weights(_type, couplings)
+            mask = weights != 0
+            source_target = self.edges.source_target[mask]
+            row = np.concatenate((source_target[:,0], source_target[:,1]))
+            col = np.concatenate((source_target[:,1], source_target[:,0]))
+            data = np.tile(weights[mask], 2)
+            return row, col, data
+        
+        key = ("coo",) + self.get_matrix_key(_type, couplings)
+        return self.get_cached_matrix(key, compute)
+    
+    def get_adjacency(self, _type=None, couplings=None, FORMAT="csr"):
+        '''
+        returns NxN sparse adjacency matrix of the cluster graph, 
+        N - number of cluster vertices (requires scipy)
+        
+        input: _type - adjacency of the edges of the given type
+               couplings - {edge type: coupling J} weighted adjacency, e.g.
+               exchange matrix of the Heisenberg model
+               FORMAT - "csr" or "coo"
+        
+        '''
+        if FORMAT not in ("csr", "coo"):
+            raise ValueError("unknown sparse matrix format '{}'".format(FORMAT))
+        
+        def compute():
+            sparse = import_sparse()
+            num = len(self.vertices.ids)
+            row, col, data = self.get_adjacency_coo(_type, couplings)
+            matrix = sparse.coo_matrix((data, (row, col)), shape=(num, num))
+            return matrix.tocsr() if FORMAT == "csr" else matrix
+        
+        key = (FORMAT,) + self.get_matrix_key(_type, couplings)
+        return self.get_cached_matrix(key, compute)
+    
+    def get_degrees(self, _type=None, couplings=None):
+        '''
+        returns array of the vertices degrees (weighted by couplings if given)
+        
+        input: see get_edges_weights
+        
+        '''
+        def compute():
+            row, col, data = self.get_adjacency_coo(_type, couplings)
+            num = len(self.vertices.ids)
+            degrees = np.bincount(row, weights=data, minlength=num)
+            return degrees if couplings is not None else degrees.astype(int)
+        
+        key = ("degrees",) + self.get_matrix_key(_type, couplings)
+        return self.get_cached_matrix(key, compute)
+    
+    def get_incidence(self, _type=None, FORMAT="csr"):
+        '''
+        returns NxM sparse oriented incidence matrix (requires scipy):
+        N - number of cluster vertices, M - number of cluster edges 
+        (of the given type), +1 for the edge source and -1 for the target
+        
+        returns: matrix, indexes of the cluster edges corresponding to the columns
+        
+        '''
+        if FORMAT not in ("csr", "coo"):
+            raise ValueError("unknown sparse matrix format '{}'".format(FORMAT))
+        
+        def compute():
+            sparse = import_sparse()
+            if _type is None:
+                index = np.arange(len(self.edges.types))
+            else:
+                index = np.flatnonzero(self.edges.types == _type)
+            source_target = self.edges.source_target[index]
+            num = len(index)
+            row = source_target.T.ravel()
+            col = np.tile(np.arange(num), 2)
+            data = np.repeat([1, -1], num)
+            matrix = sparse.coo_matrix((data, (row, col)), 
+                                       shape=(len(self.vertices.ids), num))
+            return (matrix.tocsr() if FORMAT == "csr" else matrix), index
+        
+        return self.get_cached_matrix(("incidence", FORMAT, _type), compute)
+    
+    def export_npz(self, fileName, _type=None, couplings=None, COMPRESSED=True):
+        '''
+        export adjacency matrix to .npz file in scipy.sparse COO format 
+        (can be loaded by scipy.sparse.load_npz) together with vertices 
+        and edges arrays, scipy is not required
+        
+        saved arrays: row, col, data, shape, format - adjacency matrix,
+                      vertices_ids, vertices_types, vertices_coords,
+                      edges_ids, edges_types, edges_source_target
+        
+        '''
+        row, col, data = self.get_adjacency_coo(_type, couplings)
+        num = len(self.vertices.ids)
+        save = np.savez_compressed if COMPRESSED else np.savez
+        save(fileName, row=row, col=col, data=data, shape=np.array((num, num)),
+             format=np.array(b"coo"), vertices_ids=self.vertices.ids,
+             vertices_types=self.vertices.types, 
+             vertices_coords=self.vertices.coords, edges_ids=self.edges.ids,
+             edges_types=self.edges.types, 
+             edges_source_target=self.edges.source_target)
     
     def import_fromFile(self, fileName, LATTICEGRAPH_name):
         '''initialize cluster by importing data from file'''
@@ -672,20 +2275,153 @@ class DealXML(object):
         
         return ET.fromstring(pretty_string)
 
+    @staticmethod
+    def escape_text(text):
+        '''escapes special characters of element text'''
+        return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    @staticmethod
+    def escape_attrib(text):
+        '''escapes special characters of attribute value (as ElementTree)'''
+        return (DealXML.escape_text(text).replace('"', "&quot;")
+                .replace("\r", "&#13;").replace("\n", "&#10;").replace("\t", "&#09;"))
+
   
 class ParseXML(object):
-    '''Class for parsing XML LATTICEGRAPH library'''
+    '''
+    Class for parsing XML LATTICEGRAPH library
+    
+    The library is scanned only once to build the index of byte ranges of 
+    LATTICEGRAPH, LATTICE and UNITCELL root children. Only the requested 
+    LATTICEGRAPH and elements it refers to are parsed into ElementTree.
+    
+    '''
+    INDEXED_TAGS = ("LATTICEGRAPH", "LATTICE", "UNITCELL")
     
     def __init__(self, **kwargs):
+        '''
+        kwargs: fileName or string - source of the library
+                cache - ParseCache object used for file source (optional)
         
+        '''
+        self.fileName, self.data = None, None
         if kwargs.get("fileName"):
-            self.LATTICES = ET.parse(kwargs.get("fileName")).getroot()
+            self.fileName = kwargs.get("fileName")
         elif kwargs.get("string"):
-            self.LATTICES = ET.fromstring(kwargs.get("string"))
+            self.data = kwargs.get("string")
+            if not isinstance(self.data, bytes):
+                self.data = self.data.encode('utf-8')
         else:
             raise ValueError("No 'filenane' or 'string' are provided")
-            
+        
+        self.cache, self.fileHash = None, None
+        if self.fileName is not None and kwargs.get("cache") is not None:
+            self.cache = kwargs.get("cache")
+            self.fileHash = self.cache.get_file_hash(self.fileName)
+        
+        index = None if self.cache is None else self.cache.load_index(self.fileHash)
+        if index is not None:
+            self.names, self.index, self.encoding = index
+        else:
+            self.build_index()
+            if self.cache is not None:
+                self.cache.save_index(self.fileHash, self.names, 
+                                      self.index, self.encoding)
+        self._LATTICES = None
         self.lattice, self.UC = None, None
+        
+    def build_index(self):
+        '''
+        scans library and builds index of root children:
+            
+            self.names - {tag: [name, ...]} in order of appearance
+            self.index - {tag: {name: (begin, end)}} byte ranges in the source
+        
+        '''
+        self.names = {tag: [] for tag in self.INDEXED_TAGS}
+        self.index = {tag: {} for tag in self.INDEXED_TAGS}
+        self.encoding = "utf-8"
+        
+        # string source is already utf-8 encoded
+        parser = expat.ParserCreate("utf-8" if self.data is not None else None)
+        state = {"depth": 0, "open": None}
+        
+        def close_element():
+            '''element ends where the next root child or root end tag begins'''
+            if state["open"] is not None:
+                tag, name, begin = state["open"]
+                if name not in self.index[tag]: # first element is used
+                    self.index[tag][name] = (begin, parser.CurrentByteIndex)
+                state["open"] = None
+        
+        def start_element(tag, attrib):
+            state["depth"] += 1
+            if state["depth"] == 2:
+                close_element()
+                if tag in self.index:
+                    name = attrib.get("name")
+                    self.names[tag].append(name)
+                    state["open"] = (tag, name, parser.CurrentByteIndex)
+                
+        def end_element(tag):
+            state["depth"] -= 1
+            if state["depth"] == 0:
+                close_element()
+        
+        def xml_decl(version, encoding, standalone):
+            if encoding and self.data is None:
+                self.encoding = encoding
+                
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.XmlDeclHandler = xml_decl
+        
+        try:
+            if self.data is not None:
+                parser.Parse(self.data, True)
+            else:
+                with open(self.fileName, 'rb') as f:
+                    parser.ParseFile(f)
+        except expat.ExpatError as e:
+            raise ET.ParseError(str(e))
+            
+    def read_range(self, begin, end):
+        '''returns bytes of the source in range [begin, end)'''
+        
+        if self.data is not None:
+            return self.data[begin:end]
+        with open(self.fileName, 'rb') as f:
+            f.seek(begin)
+            return f.read(end-begin)
+        
+    @property
+    def LATTICES(self):
+        '''root element of the whole library (parsed on demand)'''
+        
+        if self._LATTICES is None:
+            if self.data is not None:
+                self._LATTICES = ET.fromstring(self.data)
+            else:
+                self._LATTICES = ET.parse(self.fileName).getroot()
+            
+        return self._LATTICES
+            
+    def get_element(self, tag, name):
+        '''returns root child with tag and name as ElementTree element or None'''
+        
+        if self._LATTICES is not None:
+            return DealXML.get_child_by_name(self._LATTICES, tag, name)
+        
+        ind = self.index[tag].get(name)
+        if ind is None:
+            return None
+        
+        text = self.read_range(*ind)
+        declaration = '<?xml version="1.0" encoding="{0}"?>'.format(self.encoding)
+        try:
+            return ET.fromstring(declaration.encode("ascii") + text)
+        except ET.ParseError: # e.g. entities declared in DTD
+            return DealXML.get_child_by_name(self.LATTICES, tag, name)
                     
     def parse_LATTICEGRAPH(self, name):
         '''
@@ -693,7 +2429,13 @@ class ParseXML(object):
         defined by "name"
         
         '''
-        LATTICEGRAPH = DealXML.get_child_by_name(self.LATTICES,"LATTICEGRAPH",name)
+        if self.cache is not None:
+            graph = self.cache.load_graph(self.fileHash, name)
+            if graph is not None:
+                self.lattice, self.UC = graph
+                return self.lattice, self.UC
+            
+        LATTICEGRAPH = self.get_element("LATTICEGRAPH", name)
         # parse Lattice
         FINITELATTICE = LATTICEGRAPH.find("FINITELATTICE")
         boundary = FINITELATTICE.find("BOUNDARY").get('type')
@@ -702,10 +2444,11 @@ class ParseXML(object):
  
         LATTICE = FINITELATTICE.find('LATTICE')
         # check if LATTICE is defined in root
-        if(LATTICE.getchildren()==[])and(LATTICE.get("ref") is not None):
-            LATTICE = DealXML.get_child_by_name(self.LATTICES, "LATTICE", LATTICE.get("ref"))
+        if (len(LATTICE) == 0) and (LATTICE.get("ref") is not None):
+            ref = LATTICE.get("ref")
+            LATTICE = self.get_element("LATTICE", ref)
             if LATTICE is None:
-                raise NameError("Lattice '"+LATTICE.get("ref")+"' is not defined")
+                raise NameError("Lattice '"+ref+"' is not defined")
         
         self.lattice=Lattice(basisMatrix = self.parse_BASIS(LATTICE),
                              name=LATTICE.get('name') if LATTICE.get('name') else "myLattice",
@@ -714,14 +2457,18 @@ class ParseXML(object):
         # parse UnitCell
         UNITCELL = LATTICEGRAPH.find('UNITCELL')
         # check if UNITCELL is defined in root
-        if (UNITCELL.getchildren()==[]) and (UNITCELL.get("ref") is not None):
-            UNITCELL = DealXML.get_child_by_name(self.LATTICES, "UNITCELL", UNITCELL.get("ref"))
+        if (len(UNITCELL) == 0) and (UNITCELL.get("ref") is not None):
+            ref = UNITCELL.get("ref")
+            UNITCELL = self.get_element("UNITCELL", ref)
             if UNITCELL is None:
-                raise NameError("Lattice '"+UNITCELL.get("ref")+"' is not defined")
+                raise NameError("Unit cell '"+ref+"' is not defined")
 
         self.UC = self.parse_UNITCELL(UNITCELL)
         self.UC.compute_edgesLength(self.lattice)
         
+        if self.cache is not None:
+            self.cache.save_graph(self.fileHash, name, self.lattice, self.UC)
+        
         return self.lattice, self.UC
 
     def parse_BASIS(self, LATTICE):
@@ -791,9 +2538,351 @@ class ParseXML(object):
         return dic
 
     def get_LATTICEGRAPH_names(self):
-        return DealXML.get_list_names(self.LATTICES,"LATTICEGRAPH")
+        return list(self.names["LATTICEGRAPH"])
+    
+
+class ParseCache(object):
+    '''
+    Persistent cache of the parsed lattice graphs.
+    
+    Each LATTICEGRAPH is stored as .npz file (basis, vertices, edges and 
+    their lengths) and the index of the library as .json file. Files are 
+    keyed by the sha1 hash of the library content, so the changed library 
+    never hits the outdated data. The total size of the cache is bounded, 
+    least recently used files are removed first.
+    
+    '''
+    VERSION = 1
+    
+    def __init__(self, cacheDir=None, max_size=50*2**20):
+        '''
+        input: cacheDir - cache directory 
+                          (default: $XDG_CACHE_HOME/latticegraph_designer)
+               max_size - max total size of cache files in bytes
+        
+        '''
+        if cacheDir is None:
+            cacheDir = os.path.join(os.environ.get("XDG_CACHE_HOME", 
+                                    os.path.join(os.path.expanduser("~"), ".cache")),
+                                    "latticegraph_designer")
+        self.cacheDir = cacheDir
+        self.max_size = max_size
+        self.hits, self.misses = 0, 0
+        
+    @staticmethod
+    def get_file_hash(fileName):
+        '''returns sha1 hex digest of the file content'''
+        
+        sha1 = hashlib.sha1()
+        with open(fileName, 'rb') as f:
+            for chunk in iter(lambda: f.read(2**20), b''):
+                sha1.update(chunk)
+                
+        return sha1.hexdigest()
+        
+    def get_path(self, fileHash, name=None):
+        '''returns path of the graph (or library index if name is None) file'''
+        
+        if name is None:
+            return os.path.join(self.cacheDir, fileHash+".json")
+        nameHash = hashlib.sha1(json.dumps(name).encode('utf-8')).hexdigest()[:16]
+        
+        return os.path.join(self.cacheDir, "{0}_{1}.npz".format(fileHash, nameHash))
+    
+    def touch(self, path):
+        '''marks file as recently used'''
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        
+    def write(self, path, save):
+        '''writes file atomically using save(fileObject) function'''
+        
+        try:
+            if not os.path.isdir(self.cacheDir):
+                os.makedirs(self.cacheDir)
+            tmpPath = "{0}.{1}.tmp".format(path, os.getpid())
+            with open(tmpPath, 'wb') as f:
+                save(f)
+            getattr(os, "replace", os.rename)(tmpPath, path)
+        except (IOError, OSError):
+            return # cache is optional
+        
+        self.evict(keep=path)
+    
+    def load_index(self, fileHash):
+        '''returns (names, index, encoding) of ParseXML or None if not cached'''
+        
+        path = self.get_path(fileHash)
+        try:
+            with open(path, 'rb') as f:
+                data = json.loads(f.read().decode('utf-8'))
+            if data["version"] != self.VERSION:
+                return None
+            index = {tag: {} for tag in data["index"]}
+            for tag, elements in data["index"].items():
+                for name, begin, end in elements:
+                    index[tag][name] = (begin, end)
+            self.touch(path)
+            return data["names"], index, data["encoding"]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+    
+    def save_index(self, fileHash, names, index, encoding):
+        '''saves ParseXML index of the library'''
+        
+        data = {"version": self.VERSION, "names": names, "encoding": encoding,
+                "index": {tag: [[name, begin, end] for name, (begin, end) in dic.items()] 
+                          for tag, dic in index.items()}}
+        self.write(self.get_path(fileHash), 
+                   lambda f: f.write(json.dumps(data).encode('utf-8')))
+
+    def load_graph(self, fileHash, name):
+        '''returns (lattice, UC) or None if graph is not cached'''
+        
+        path = self.get_path(fileHash, name)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != self.VERSION:
+                    raise ValueError("Outdated cache file")
+                lattice = Lattice(basisMatrix=data["basisMatrix"],
+                                  **json.loads(str(data["lattice_atrib"])))
+                UC = UnitCell(lattice, **json.loads(str(data["UC_atrib"])))
+                for _type, coords in zip(data["vertices_types"], data["vertices_coords"]):
+                    UC.add_vertex(Vertex(0, _type, coords))
+                UC.add_edges(data["source_target"], data["offsets"], 
+                             data["edges_types"], data["lengths"])
+        except (IOError, OSError, ValueError, KeyError, zipfile.BadZipfile):
+            self.misses += 1
+            return None
+        
+        self.touch(path)
+        self.hits += 1
+        
+        return lattice, UC
+    
+    def save_graph(self, fileHash, name, lattice, UC):
+        '''saves parsed lattice and UC'''
+        
+        try:
+            lattice_atrib, UC_atrib = json.dumps(lattice.atrib), json.dumps(UC.atrib)
+        except TypeError: # not serializable attributes
+            return
+        
+        vertices = list(UC.vertices.values())
+        edges = list(UC.edges.values())
+        data = dict(version=self.VERSION,
+                    basisMatrix=lattice.basisMatrix,
+                    lattice_atrib=lattice_atrib,
+                    UC_atrib=UC_atrib,
+                    vertices_types=np.array([v.type for v in vertices], dtype=int),
+                    vertices_coords=np.array([v.coords for v in vertices], 
+                                             dtype=float).reshape(-1,3),
+                    edges_types=np.array([e.type for e in edges], dtype=int),
+                    source_target=np.array([(e.source, e.target) for e in edges], 
+                                           dtype=int).reshape(-1,2),
+                    offsets=np.array([e.offset for e in edges], dtype=int).reshape(-1,3),
+                    lengths=np.array([e.length for e in edges], dtype=float))
+        
+        self.write(self.get_path(fileHash, name), lambda f: np.savez(f, **data))
+        
+    def evict(self, keep=None):
+        '''removes least recently used files until cache fits max_size'''
+        
+        files = []
+        for fileName in os.listdir(self.cacheDir):
+            path = os.path.join(self.cacheDir, fileName)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+            
+        total = sum(size for mtime, size, path in files)
+        for mtime, size, path in sorted(files):
+            if total <= self.max_size:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+            
+    def clear(self):
+        '''removes all cache files'''
+        
+        if os.path.isdir(self.cacheDir):
+            for fileName in os.listdir(self.cacheDir):
+                try:
+                    os.remove(os.path.join(self.cacheDir, fileName))
+                except OSError:
+                    pass
+        
+        
+class ParseCIF(object):
+    '''Class for parsing crystal structure from CIF file'''
+    
+    def __init__(self, fileName):
+        '''
+        read and process data from cif file:
+
+            self.abc = [a,b,c] - list of unit cell length
+            self.angles = [alpha, beta, gamma] - list of unit cell angles 
+            self.UC_data = [site, ... ] - list of unit cell sites labels and coordinates
+                where: site = {'bool':_ ,'label':_, 'type':_, 'x':_, 'y':_, 'z':_}
+                       site['bool'] - defines wheather to use site in the model 
+            self.sg_data = ['x, y, z', ...] - space group symmetry operation list
+        
+        '''        
+        with open(fileName, 'r') as f:
+            read_data = f.read()
+        
+        read_data = read_data.replace("\r","")
+        read_data = read_data.replace("\n \n","\n\n")
+        blocks = read_data.split("\n\n")
+        
+        self.abc, self.angles = self.get_lattice_data(blocks)
+        self.UC_data = self.get_UC_data(blocks)
+        self.sg_data = self.get_sg_data(blocks)
+        
+    def get_data(self):
+        '''returns abc, angles, UC_data, sg_data'''
+        return self.abc, self.angles, self.UC_data, self.sg_data
+    
+    def get_symops_list(self):
+        '''returns symmetry operations list: [['x','y','z'], ...]'''
+        
+        symops_list = []
+        for line in self.sg_data:
+            symop = ''.join(e for e in line if e not in " '").split(',')
+            if len(symop) != 3:
+                raise ValueError("Symmetry operations are not defined according to 'x, y, z' pattern with comma used as separator")
+            symops_list.append(symop)
+        
+        return symops_list
+    
+    def get_sites(self, types=None):
+        '''
+        returns list of sites coordinates [[x1,y1,z1],...] 
+        
+        input: types - list of atom types to be used in the model,
+                       if None sites selected by default are used
+        
+        '''
+        return [[site["x"], site["y"], site["z"]] for site in self.UC_data 
+                if (site["bool"] if types is None else site["type"] in types)]
+        
+    def build_UC(self, types=None, ASSIGN_DIFF_TYPES=True):
+        '''
+        returns Lattice and UnitCell objects with vertices generated 
+        by space group symmetry operations
+        
+        '''
+        lattice = Lattice(cell_lengths = self.abc, angles = self.angles)
+        UC = UnitCell(lattice)
+        UC.add_vertices_using_symops(self.get_sites(types), self.get_symops_list(),
+                                     ASSIGN_DIFF_TYPES)
+        
+        return lattice, UC
+
+    def get_lattice_data(self, blocks):
+        '''return lattice parameters data'''
+    
+        keys = ["_cell_length_a", "_cell_length_b", "_cell_length_c",
+                "_cell_angle_alpha", "_cell_angle_beta", "_cell_angle_gamma"]
+        
+        latttice_block = self.get_block_by_word(blocks, "_cell_length_a")
+        data = []
+        for key in keys:
+            for line in latttice_block.splitlines():
+                if key in line:
+                    data.append(self._float(line.split()[-1]))
+                    break
+        return data[:3], data[3:]      
     
+    def get_UC_data(self, blocks):
+        '''return unit cell data'''
+    
+        keys = ["_atom_site_label", "_atom_site_type_symbol",
+                "_atom_site_fract_x", "_atom_site_fract_y", "_atom_site_fract_z"]
+    
+        UC_block = self.get_block_by_word(blocks, "_atom_site_fract_x")    
+        data = self.get_list_val(UC_block, keys)
+        # turn to float site coords
+        data = [[val if j<2 else self._float(val) for j, val in enumerate(line)] for line in data]
+
+        data_keys = ["label", "type", "x", "y", "z"]
+        data = [{data_keys[j]:val for j, val in enumerate(line)} for line in data]
+        for line in data:
+            line["bool"] = line["type"] in ["Cu"]  # automaticly selected atoms
+                
+        return data    
+    
+    def get_sg_data(self, blocks):
+        '''return space group symmetry operations'''
+    
+        keys = ["_space_group_symop_operation_xyz"]
+        sg_block = self.get_block_by_word(blocks, keys[0])
+        data = self.get_list_val(sg_block, keys)
+        data = [line[0] for line in data]
+        
+        return data
 
+    # helper functions
+    
+    def get_block_by_word(self, blocks, word):
+        '''helper: return block if it contains a word'''
+        for block in blocks:
+            if word in block:
+                return block
+    
+    def _float(self, string):
+        '''helper: return string without precision parenthesis: 1.23(3)'''
+        return float(string.split("(")[0])
+    
+    def words_split(self, line):
+        '''split line on words counting symbols between " chars as single word'''
+        
+        new_line = []
+        in_word = False
+        j0 = 0
+        for j, char in enumerate(line):
+            if (char == "'") or (char == "\""):
+                if in_word:
+                    new_line.append(line[j0:j])
+                else:
+                    new_line += line[j0:j].split(' ')
+    
+                in_word = not in_word
+                j0 = j+1
+                    
+        new_line += line[j0:].split(' ')
+        new_line = [elem for elem in new_line if elem != ""]      
+    
+        return new_line
+        
+    def get_list_val(self, block, keys):
+        '''return data list according to keys in _loop block'''
+        
+        lines = block.split("loop_")[-1].splitlines()
+        lines = [line for line in lines if line != ""]
+        all_keys = [line.strip() for line in lines if "_" in line]
+        all_line_vals = lines[len(all_keys):]
+        
+        data = []
+        for line in all_line_vals:
+            data_line = []  
+            for j, val in enumerate(self.words_split(line)):
+                if all_keys[j] in keys:
+                    data_line.append(val)
+            data.append(data_line)
+            
+        return data    
+    
+    
 class ExportXML(object):
     '''Class for exporting data into LATTICEGRAPH XML library'''
     
@@ -803,119 +2892,138 @@ class ExportXML(object):
                UC - UnitCell object
                NEW_ID - flag managing whether new eges ordered ids are reassigned or not 
         
+        XML is written in a single pass directly to file or stream, 
+        the ElementTree object (self.lib) is created only on demand.
+        
         '''
         self.lattice = lattice
         self.UC = UC
         self.LATTICEGRAPH_name = LATTICEGRAPH_name
         self.NEW_ID = NEW_ID
         self.dim = int(lattice.atrib["dimension"])
-        
-        lib = self.get_LATTICES_lib_ET()
-        self.lib = DealXML.prettify(lib)
+        self._lib = None
+        
+    @property
+    def lib(self):
+        '''LATTICES library ElementTree object'''
+        if self._lib is None:
+            self._lib = ET.fromstring(self.get_xml_string())
+        return self._lib
 
     def export_to_lib(self, fileName):
         '''Exports LATTICEGRAPH into library XML-file'''
 
-        ET.ElementTree(self.lib).write(fileName)        
+        with io.open(fileName, 'w', encoding='us-ascii', 
+                     errors='xmlcharrefreplace', newline='\n') as f:
+            self.write_lib(f)
 
     def dump_lib(self):
         '''writes LATTICEGRAPH library XML to sys.stdout.'''
               
-        ET.dump(self.lib)        
+        self.write_lib(sys.stdout)
+        sys.stdout.write("\n")
     
     def get_xml_string(self):
-        '''writes LATTICEGRAPH library XML to sys.stdout.'''
+        '''returns LATTICEGRAPH library XML string'''
+        
+        stream = io.StringIO()
+        self.write_lib(stream)
               
-        return ET.tostring(self.lib).decode()    
+        return stream.getvalue().encode('us-ascii', 'xmlcharrefreplace').decode()
 
-    def get_LATTICES_lib_ET(self):
-        '''Returns LATTICES library ElementTree object.'''
+    @staticmethod
+    def get_tag(tag, attrib=(), level=0, text=None, empty=False):
+        '''
+        returns indented line with start tag of the element
         
-        LATTICEGRAPH = ET.Element("LATTICEGRAPH")
-        LATTICEGRAPH.set("name", self.LATTICEGRAPH_name)
-        LATTICEGRAPH.append(self.get_FINITELATTICE_ET())
-        LATTICEGRAPH.append(self.get_UNITCELL_ET())        
-        LATTICES = ET.Element("LATTICES")
-        LATTICES.append(LATTICEGRAPH)
-
-        return LATTICES
+        input: attrib - [(name, value), ...]
+               text - element text, if given the end tag is added as well
+               empty - if True the element is closed in the same tag
+        
+        '''
+        attrs = ''.join(' {0}="{1}"'.format(name, DealXML.escape_attrib(value)) 
+                        for name, value in attrib)
+        if text is not None:
+            return '{0}<{1}{2}>{3}</{1}>\n'.format('  '*level, tag, attrs, 
+                                                   DealXML.escape_text(text))
+        elif empty:
+            return '{0}<{1}{2} />\n'.format('  '*level, tag, attrs)
+        else:
+            return '{0}<{1}{2}>\n'.format('  '*level, tag, attrs)
+        
+    def write_lib(self, stream):
+        '''Writes LATTICES library with indentation to the text stream'''
+        
+        stream.write('<LATTICES>\n')
+        self.write_LATTICEGRAPH(stream, 1)
+        stream.write('</LATTICES>')
     
-    def get_LATTICE_ET(self):
-        '''Returns LATTICE ElementTree object.'''
+    def write_LATTICEGRAPH(self, stream, level=0):
+        '''Writes LATTICEGRAPH element to the text stream'''
         
-        LATTICE = ET.Element("LATTICE")
-        LATTICE.set("name",self.lattice.atrib["name"])
-        LATTICE.set("dimension",self.lattice.atrib["dimension"])
-        BASIS = ET.Element("BASIS")
-        for vec in self.lattice.basisMatrix[:self.dim,:self.dim].T:
-            VECTOR = ET.Element("VECTOR")
-            VECTOR.text = ' '.join([str(c) for c in vec])
-            BASIS.append(VECTOR)
-        LATTICE.append(BASIS)
+        stream.write(self.get_tag("LATTICEGRAPH", [("name", self.LATTICEGRAPH_name)], level))
+        self.write_FINITELATTICE(stream, level+1)
+        self.write_UNITCELL(stream, level+1)
+        stream.write('  '*level + '</LATTICEGRAPH>\n')
+    
+    def write_LATTICE(self, stream, level=0):
+        '''Writes LATTICE element to the text stream'''
         
-        return LATTICE    
+        stream.write(self.get_tag("LATTICE", [("name", self.lattice.atrib["name"]),
+                                  ("dimension", self.lattice.atrib["dimension"])], level))
+        stream.write(self.get_tag("BASIS", level=level+1))
+        for vec in self.lattice.basisMatrix[:self.dim,:self.dim].T:
+            stream.write(self.get_tag("VECTOR", level=level+2, 
+                                      text=' '.join([str(c) for c in vec])))
+        stream.write('  '*(level+1) + '</BASIS>\n')
+        stream.write('  '*level + '</LATTICE>\n')
 
-    def get_FINITELATTICE_ET(self):
-        '''Returns FINITELATTICE ElementTree object.'''
+    def write_FINITELATTICE(self, stream, level=0):
+        '''Writes FINITELATTICE element to the text stream'''
         
-        FINITELATTICE = ET.Element("FINITELATTICE")         
-        # create LATTICE child
-        LATTICE = self.get_LATTICE_ET()
-        FINITELATTICE.append(LATTICE)        
+        stream.write(self.get_tag("FINITELATTICE", level=level))
+        # write LATTICE child
+        self.write_LATTICE(stream, level+1)
         param_list = ["L","W","H"]
-        # create PARAMETER childs
-        for j in range(self.dim):    
-            PARAMETER = ET.Element("PARAMETER")
-            PARAMETER.set("name", param_list[j])
+        # write PARAMETER childs
+        for j in range(self.dim):
+            attrib = [("name", param_list[j])]
             if j > 0:
-                PARAMETER.set("default", param_list[j-1])
-            FINITELATTICE.append(PARAMETER)
-        # create EXTENT childs
-        for j in range(self.dim):                
-            EXTENT = ET.Element("EXTENT")
-            EXTENT.set("dimension", str(j+1))
-            EXTENT.set("size", param_list[j])            
-            FINITELATTICE.append(EXTENT)        
-        # create BOUNDARY child
-        BOUNDARY = ET.Element("BOUNDARY")
-        BOUNDARY.set("type", self.lattice.atrib["BOUNDARY"])
-        FINITELATTICE.append(BOUNDARY)
-  
-        return FINITELATTICE
+                attrib.append(("default", param_list[j-1]))
+            stream.write(self.get_tag("PARAMETER", attrib, level+1, empty=True))
+        # write EXTENT childs
+        for j in range(self.dim):
+            attrib = [("dimension", str(j+1)), ("size", param_list[j])]
+            stream.write(self.get_tag("EXTENT", attrib, level+1, empty=True))
+        # write BOUNDARY child
+        attrib = [("type", self.lattice.atrib["BOUNDARY"])]
+        stream.write(self.get_tag("BOUNDARY", attrib, level+1, empty=True))
+        stream.write('  '*level + '</FINITELATTICE>\n')
     
-    def get_UNITCELL_ET(self):
-        '''Returns UNITCELL ElementTree object.'''
+    def write_UNITCELL(self, stream, level=0):
+        '''Writes UNITCELL element to the text stream'''
 
-        UNITCELL = ET.Element("UNITCELL")
-        UNITCELL.set("name", self.UC.atrib["name"])
-        UNITCELL.set("dimension", self.UC.atrib["dimension"])
-        UNITCELL.set("vertices", str(self.UC.num_vertices))
-        UNITCELL.set("edges", str(self.UC.num_edges))
-        # add vertises to UNITCELL
+        attrib = [("name", self.UC.atrib["name"]), 
+                  ("dimension", self.UC.atrib["dimension"]),
+                  ("vertices", str(self.UC.num_vertices)),
+                  ("edges", str(self.UC.num_edges))]
+        stream.write(self.get_tag("UNITCELL", attrib, level))
+        # write vertises
+        indent = '  '*(level+1)
         for key,vertex in self.UC.vertices.items():
-            VERTEX = ET.Element("VERTEX")
-            VERTEX.set("id",str(vertex.id))
-            VERTEX.set("type",str(vertex.type))
-            COORDINATE = ET.Element("COORDINATE")
-            COORDINATE.text = ' '.join([str(c) for c in vertex.coords[:self.dim]])
-            VERTEX.append(COORDINATE)
-            UNITCELL.append(VERTEX)
-        # add edges to UNITCELL
+            coords = ' '.join([str(c) for c in vertex.coords[:self.dim]])
+            stream.write('{0}<VERTEX id="{1}" type="{2}">\n'
+                         '{0}  <COORDINATE>{3}</COORDINATE>\n'
+                         '{0}</VERTEX>\n'.format(indent, vertex.id, vertex.type, 
+                                                  DealXML.escape_text(coords)))
+        # write edges
         count = 0
         for key,edge in self.UC.edges.items():
             count += 1
-            EDGE = ET.Element("EDGE")
-            EDGE.set("id", str(count) if self.NEW_ID else str(edge.id))
-            EDGE.set("type",str(edge.type))
-            # create SOURCE
-            SOURCE = ET.Element("SOURCE")
-            SOURCE.set("vertex",str(edge.source))
-            EDGE.append(SOURCE)
-            # create TARGET
-            TARGET = ET.Element("TARGET")
-            TARGET.set("vertex",str(edge.target))
-            TARGET.set("offset",' '.join([str(c) for c in edge.offset]))
-            EDGE.append(TARGET)
-            UNITCELL.append(EDGE)
-        
-        return UNITCELL
\ No newline at end of file
+            stream.write('{0}<EDGE id="{1}" type="{2}">\n'
+                         '{0}  <SOURCE vertex="{3}" />\n'
+                         '{0}  <TARGET vertex="{4}" offset="{5}" />\n'
+                         '{0}</EDGE>\n'.format(indent, count if self.NEW_ID else edge.id,
+                                                edge.type, edge.source, edge.target,
+                                                ' '.join([str(c) for c in edge.offset])))
+        stream.write('  '*level + '</UNITCELL>\n')
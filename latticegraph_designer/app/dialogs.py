@@ -83,7 +83,7 @@ import xml.etree.ElementTree as ET
 # import project modules
 from latticegraph_designer.app.mpl_pane import GraphEdgesEditor 
 from latticegraph_designer.app.core import (ParseXML, ExportXML, UnitCell, 
-                                            Lattice, CrystalCluster)
+                                            Lattice, CrystalCluster, ParseCIF)
 from latticegraph_designer.widgets import (QColorButton, XMLHighlighter, 
                                            QCodeEditor, QCustomListWidget, 
                                            QCustomListWidget_Add, DealXML,
@@ -502,123 +502,10 @@ class DialogImportCryst(QDilaog, Ui_DialogImportCryst):
         '''
         read and process data from cif file
         
-        return:
-
-            abc = [a,b,c] - list of unit cell length
-            angles = [alpha, beta, gamma] - list of unit cell angles 
-            UC_data = [site, ... ] - list of unit cell sites labels and coordinates
-                where: site = {'bool':_ ,'label':_, 'type':_, 'x':_, 'y':_, 'z':_}
-                       site['bool'] - defines wheather to use site in the model 
-            sg_data = ['x, y, z', ...] - space group symmetry operation list
+        return: abc, angles, UC_data, sg_data (see core.ParseCIF)
         
         '''        
-        with open(fileName, 'r') as f:
-            read_data = f.read()
-        
-        read_data = read_data.replace("\r","")
-        read_data = read_data.replace("\n \n","\n\n")
-        blocks = read_data.split("\n\n")
-        
-        abc, angles = self.get_lattice_data(blocks)
-        UC_data = self.get_UC_data(blocks)
-        sg_data = self.get_sg_data(blocks)
-        
-        return abc, angles, UC_data, sg_data
-
-
-    def get_lattice_data(self, blocks):
-        '''return lattice parameters data'''
-    
-        keys = ["_cell_length_a", "_cell_length_b", "_cell_length_c",
-                "_cell_angle_alpha", "_cell_angle_beta", "_cell_angle_gamma"]
-        
-        latttice_block = self.get_block_by_word(blocks, "_cell_length_a")
-        data = []
-        for key in keys:
-            for line in latttice_block.splitlines():
-                if key in line:
-                    data.append(self._float(line.split()[-1]))
-                    break
-        return data[:3], data[3:]      
-    
-    def get_UC_data(self, blocks):
-        '''return unit cell data'''
-    
-        keys = ["_atom_site_label", "_atom_site_type_symbol",
-                "_atom_site_fract_x", "_atom_site_fract_y", "_atom_site_fract_z"]
-    
-        UC_block = self.get_block_by_word(blocks, "_atom_site_fract_x")    
-        data = self.get_list_val(UC_block, keys)
-        # turn to float site coords
-        data = [[val if j<2 else self._float(val) for j, val in enumerate(line)] for line in data]
-
-        data_keys = ["label", "type", "x", "y", "z"]
-        data = [{data_keys[j]:val for j, val in enumerate(line)} for line in data]
-        for line in data:
-            line["bool"] = line["type"] in ["Cu"]  # automaticly selected atoms
-                
-        return data    
-    
-    def get_sg_data(self, blocks):
-        '''return space group symmetry operations'''
-    
-        keys = ["_space_group_symop_operation_xyz"]
-        sg_block = self.get_block_by_word(blocks, keys[0])
-        data = self.get_list_val(sg_block, keys)
-        data = [line[0] for line in data]
-        
-        return data
-
-    # helper functions
-    
-    def get_block_by_word(self, blocks, word):
-        '''helper: return block if it contains a word'''
-        for block in blocks:
-            if word in block:
-                return block
-    
-    def _float(self, string):
-        '''helper: return string without precision parenthesis: 1.23(3)'''
-        return float(string.split("(")[0])
-    
-    def words_split(self, line):
-        '''split line on words counting symbols between " chars as single word'''
-        
-        new_line = []
-        in_word = False
-        j0 = 0
-        for j, char in enumerate(line):
-            if (char == "'") or (char == "\""):
-                if in_word:
-                    new_line.append(line[j0:j])
-                else:
-                    new_line += line[j0:j].split(' ')
-    
-                in_word = not in_word
-                j0 = j+1
-                    
-        new_line += line[j0:].split(' ')
-        new_line = [elem for elem in new_line if elem != ""]      
-    
-        return new_line
-        
-    def get_list_val(self, block, keys):
-        '''return data list according to keys in _loop block'''
-        
-        lines = block.split("loop_")[-1].splitlines()
-        lines = [line for line in lines if line != ""]
-        all_keys = [line.strip() for line in lines if "_" in line]
-        all_line_vals = lines[len(all_keys):]
-        
-        data = []
-        for line in all_line_vals:
-            data_line = []  
-            for j, val in enumerate(self.words_split(line)):
-                if all_keys[j] in keys:
-                    data_line.append(val)
-            data.append(data_line)
-            
-        return data    
+        return ParseCIF(fileName).get_data()
     
                        
 # Preference dialog classes
@@ -770,6 +657,9 @@ class MyWidgetPreferences(WidgetPreferences, Ui_WidgetPreferences):
         self.vertPref = QGraphElemPreference("Vertices")
         self.hbox_pref.addWidget(self.vertPref)
         
+        # settings without widget representation which are kept unchanged
+        self.LEVELOFDETAIL = None
+        
     def set_theme_ET(self, THEME):
         '''initialize preference widget according to THEME ElementTree''' 
 
@@ -780,6 +670,7 @@ class MyWidgetPreferences(WidgetPreferences, Ui_WidgetPreferences):
         self.btn_activateColor.set_color(THEME.find("COLORACTIVATE").get("value"))
         self.edgePref.set_data_ET(THEME.find("EDGES"))
         self.vertPref.set_data_ET(THEME.find("VERTICES"))
+        self.LEVELOFDETAIL = THEME.find("LEVELOFDETAIL")
         
     def get_current_theme_ET(self):
         '''get xml ElementTree containing setting data in preference widget'''
@@ -799,6 +690,10 @@ class MyWidgetPreferences(WidgetPreferences, Ui_WidgetPreferences):
         
         THEME.append(self.edgePref.get_data_ET("EDGES"))
         THEME.append(self.vertPref.get_data_ET("VERTICES"))
+        if self.LEVELOFDETAIL is not None:
+            item = ET.Element("LEVELOFDETAIL")
+            item.attrib.update(self.LEVELOFDETAIL.attrib)
+            THEME.append(item)
         
         return DealXML.prettify(THEME)
     
@@ -829,11 +724,12 @@ class QDistListItemWidget(QWidget, Ui_myDistListItem):
             
     def set_data(self, data, strFlag=False):
  
-        if data.get("bool") is not None: self.checkBox.setChecked(data["bool"])
         if data.get("type") is not None: self.spinBox.setValue(data["type"])
         if data.get("dist") is not None: self.lineEdit_dist.setText(str(data["dist"]))
         if data.get("err") is not None: self.lineEdit_err.setText(str(data["err"]))
         if data.get("found") is not None: self.set_found(data["found"])
+        # the last since changing the type activates checkbox
+        if data.get("bool") is not None: self.checkBox.setChecked(data["bool"])
          
     def get_data(self):        
 
@@ -869,6 +765,8 @@ class MyDistToolBox(QCustomListWidget_Add):
         self.btnRemove = QPushButton("-")
         self.btnRemove.setSizePolicy(sizePolicy)
         self.btnRemove.setMaximumWidth(40)     
+        self.btnShells = QPushButton("Shells")
+        self.btnShells.setToolTip("Fill the list with the nearest coordination shells")
         self.btnSearch = QPushButton("Search")
         self.btnClose = QPushButton("Close")
         self.btnSearch.setDefault(True)
@@ -877,6 +775,7 @@ class MyDistToolBox(QCustomListWidget_Add):
         hbox.addWidget(self.btnAdd)
         hbox.addWidget(self.btnRemove)
         hbox.addStretch(1)
+        hbox.addWidget(self.btnShells)
         hbox.addWidget(self.btnSearch)
         hbox.addWidget(self.btnClose)
         
@@ -892,6 +791,8 @@ class MyDistToolBox(QCustomListWidget_Add):
 class DialogDistSearch(QDialog, MyDistToolBox):
     '''dialog for manipulating edges relating to their length'''
     
+    SHELLS_NUM = 8 # number of coordination shells suggested by btnShells
+    
     def __init__(self, parent):
         
         super(DialogDistSearch, self).__init__()
@@ -907,57 +808,89 @@ class DialogDistSearch(QDialog, MyDistToolBox):
         self.listWidget.currentItemChanged.connect(self.selectDistList_callback) 
         self.parent.selectedEdgeChanged.connect(self.selectEdgeSignal_slot)
         self.parent.unitCellChanged.connect(self.update)
+        self.btnShells.clicked.connect(self.shells_callback)
         self.btnSearch.clicked.connect(self.search_callback)
         self.btnClose.clicked.connect(self.close_callback)
         
         QShortcut(QKeySequence("Del"), self, self.parent.gee.delete_active_edge_callback)
         QShortcut(QKeySequence("Shift+Del"), self, self.parent.gee.clearEdges_callback)
 
-    def update(self):
-        '''update listWidget'''
-
+    def update(self, shells=()):
+        '''
+        update listWidget
+        
+        input: shells - coordination shells (see NeighbourIndex.get_shells)
+                        added as unchecked items after the edges lengths
+        
+        '''
         self.initialization = True # block QListWidget valuechanged callback
         
-        # read data from parent unitcell
-        init_data  = []
-        for length, ids in self.parent.UC.lengthDic.items():
+        # read data from parent unitcell, lengths equal within tolerance
+        # are shown as one item
+        UC = self.parent.UC
+        init_data, lengths, ids = [], [], []
+        for shell in UC.lengthIndex.get_shells(UC.LENGTH_TOLERANCE):
             init_data.append({"bool": True, 
-                              "type":self.parent.UC.edges[ids[0]].type, 
-                              "dist":length,
+                              "type":UC.edges[shell["ids"][0]].type, 
+                              "dist":shell["dist"],
                               "err":1,
-                              "found":len(ids)})
+                              "found":len(shell["ids"])})
+            lengths.append(shell["lengths"])
+            ids.append(shell["ids"]) # shell can be wider than the tolerance
+        for j, shell in enumerate(shells):
+            if len(UC.find_edges_by_length(shell["dist"])) == 0:
+                init_data.append({"bool": False, "type": j, 
+                                  "dist": shell["dist"], "err": 1})
+                lengths.append([])
+                ids.append([])
         init_data.append({}) # add one empty item
+        lengths.append([None])
+        ids.append([])
         self.listWidget.set_data(init_data)
         # select empty item (the last)
         lastItemID = self.listWidget.count() - 1
         self.listWidget.setCurrentItem(self.listWidget.item(lastItemID))        
         
         # create binding dictionaries
-        self.distToListItem, self.itemIDToDist = {}, {}
+        self.distToListItem, self.itemIDToDist, self.itemIDToEdges = {}, {}, {}
         for j in range(self.listWidget.count()):
-            self.distToListItem[init_data[j].get("dist")] = self.listWidget.item(j)
+            for length in lengths[j]:
+                self.distToListItem[length] = self.listWidget.item(j)
             self.itemIDToDist[j] = init_data[j].get("dist")
+            self.itemIDToEdges[j] = ids[j]
         
         self.initialization = False # relieze QListWidget valuechanged callback
         
+    def shells_callback(self):
+        '''suggest the nearest coordination shells in listWidget'''
+        
+        neighbours = self.parent.cluster.edges.neighbours
+        shells = neighbours.get_shells(num=self.SHELLS_NUM)
+        self.update(shells)
+        
+        msg = ' {0} coordination shells were found'.format(len(shells))
+        self.parent.statusBar().showMessage(msg, 2000)
+        if self.parent.TEXT_MODE:
+            print(msg)
+        
     def search_callback(self):
         '''searching edges by their length given in listWidget'''
         
         self.parent.UC.clearEdges()
         
-        for dataDic in self.listWidget.get_data():
-            if (dataDic is not None) and dataDic["bool"]:
-                search = self.parent.cluster.edges.search_edges_by_dist
-                search(dataDic["type"], dataDic["dist"], dataDic["err"])
-                
-                # show message                        
-                dist = dataDic["dist"]
-                edgesList = self.parent.UC.lengthDic.get(dist)
-                num = 0 if edgesList is None else len(edgesList)
-                msg = ' {0} edges were found with dist={1:.3f}'.format(num,dist)    
-                self.parent.statusBar().showMessage(msg, 2000)
-                if self.parent.TEXT_MODE:
-                    print(msg)
+        searches = [(dataDic["type"], dataDic["dist"], dataDic["err"]) 
+                    for dataDic in self.listWidget.get_data()
+                    if (dataDic is not None) and dataDic["bool"]]
+        # all distance shells are searched and expanded at once
+        self.parent.cluster.edges.search_edges_by_dists(searches)
+        
+        for _type, dist, err in searches:
+            # show message                        
+            num = len(self.parent.UC.find_edges_by_length(dist))
+            msg = ' {0} edges were found with dist={1:.3f}'.format(num,dist)    
+            self.parent.statusBar().showMessage(msg, 2000)
+            if self.parent.TEXT_MODE:
+                print(msg)
 
         # make chnages on mpl_pane
         self.parent.gee.create_artists_graph()
@@ -969,11 +902,9 @@ class DialogDistSearch(QDialog, MyDistToolBox):
         '''select edges from listWidget according to their length'''
         
         if not self.initialization:
-            activeDist = self.itemIDToDist[self.listWidget.row(selectedItem)]
-            if activeDist is None:
-                self.edgesIDs = []
-            else:
-                self.edgesIDs = self.parent.UC.lengthDic[activeDist][:]
+            row = self.listWidget.row(selectedItem)
+            activeDist = self.itemIDToDist[row]
+            self.edgesIDs = list(self.itemIDToEdges.get(row, []))
                         
             self.parent.gee.select_edges(self.edgesIDs)
                         
@@ -991,6 +922,7 @@ class DialogDistSearch(QDialog, MyDistToolBox):
         '''add item to the list toolbox'''
         MyDistToolBox.add_item_callback(self)
         self.itemIDToDist[self.listWidget.count()-1] = None
+        self.itemIDToEdges[self.listWidget.count()-1] = []
 
     def remove_item_callback(self):
         '''remove item from the list toolbox'''
@@ -37,7 +37,7 @@ if pyQtVersion == "PyQt4":
     from matplotlib.backends.backend_qt4agg import FigureCanvasQTAgg as FigureCanvas
     # impoort pyQt modules
     from PyQt4.uic import loadUiType
-    from PyQt4.QtCore import Qt, pyqtSignal
+    from PyQt4.QtCore import Qt, QTimer, pyqtSignal
     from PyQt4.QtGui import (QApplication, QMessageBox, QFileDialog, 
                              QListWidgetItem, QPushButton, QHBoxLayout, 
                              QVBoxLayout)
@@ -47,7 +47,7 @@ else:
     from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
     # impoort pyQt modules
     from PyQt5.uic import loadUiType
-    from PyQt5.QtCore import Qt, pyqtSignal
+    from PyQt5.QtCore import Qt, QTimer, pyqtSignal
     from PyQt5.QtWidgets import (QApplication, QMessageBox, QFileDialog, 
                                  QListWidgetItem, QPushButton, QHBoxLayout, 
                                  QVBoxLayout)
@@ -66,12 +66,14 @@ import os
 import sys
 import webbrowser
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor, wait
 from matplotlib.figure import Figure
     
 # import project modules
 from mpl_animationmanager import QDialogAnimManager
 from latticegraph_designer.app.mpl_pane import GraphEdgesEditor 
-from latticegraph_designer.app.core import CrystalCluster, ParseXML, ExportXML, DealXML
+from latticegraph_designer.app.core import (CrystalCluster, ParseXML, ExportXML, DealXML,
+                                            ParseCache)
 from latticegraph_designer.app.dialogs import (QNotImplemented, DialogExportLG, 
                                                DialogSelectLG, DialogImportCryst, 
                                                DialogEditXML, MyDialogPreferences,
@@ -90,6 +92,9 @@ class MainWindow(QMainWindow, Ui_MainWindow):
     unitCellChanged = pyqtSignal()
     latticeVisibleChanged = pyqtSignal(object) # used to bind with mpl.event
     arrowsVisibleChanged = pyqtSignal(object) # used to bind with mpl.event
+    resizeDone = pyqtSignal(object) # emitted from the resize worker thread
+    
+    RESIZE_DELAY = 150 # ms, size spinBoxes changes are coalesced
     
     def __init__(self, fileName=None, TEXT_MODE=True):
         
@@ -100,6 +105,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.SETTINGS = ET.parse(self.prefFileName).getroot()
         self.CURRENT_THEME = DealXML.get_child_by_name(self.SETTINGS,"THEME","Current theme") 
         self.TEXT_MODE = TEXT_MODE
+        self.parseCache = ParseCache() # cache of parsed xml libraries
         
         self.size = (2,2,2)
         self.spinBox_sizeL.setValue(self.size[0])
@@ -139,6 +145,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.unitCellChanged.connect(self.update_listEdges)
  
         self.setup_menu()
+        self.setup_resize_worker()
         
         if self.TEXT_MODE:
             print(self.gee.__doc__)
@@ -166,6 +173,25 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.action_About.triggered.connect(self.about_callback)
         self.action_Doc.triggered.connect(self.doc_callback)
         
+    def setup_resize_worker(self):
+        '''
+        cluster geometry of the new size is computed in a worker thread
+        after RESIZE_DELAY debounce, only the newest request is applied
+        
+        '''
+        self.resizeTimer = QTimer(self)
+        self.resizeTimer.setSingleShot(True)
+        self.resizeTimer.setInterval(self.RESIZE_DELAY)
+        self.resizeTimer.timeout.connect(self.submit_resize)
+        self.resizeExecutor = ThreadPoolExecutor(max_workers=1)
+        self.resizeGeneration = 0 # id of the newest resize request
+        self.resizePending = False
+        self.resizeJob = None # (generation, cluster, future)
+        self.resizeClosed = False # worker is shut down with the window
+        
+        self.resizeDone.connect(self.apply_resize)
+        self.unitCellChanged.connect(self.unitCellChanged_resize_slot)
+        
     def setup_mpl_canvas(self):
         '''
         setup matplotlib manipulation pane widget 
@@ -200,7 +226,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         '''import lattice graph form xml file'''
         
         self.fileNameXML = path
-        self.parser = ParseXML(fileName = self.fileNameXML)
+        self.parser = ParseXML(fileName = self.fileNameXML, cache = self.parseCache)
         LG_name_list = self.parser.get_LATTICEGRAPH_names()
         if len(LG_name_list) > 1:
             self.dlgSelectLG = DialogSelectLG(self, LG_name_list)
@@ -251,7 +277,76 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.size = (self.spinBox_sizeL.value(), 
                      self.spinBox_sizeW.value(),
                      self.spinBox_sizeH.value())
-        self.gee.reset_size(self.size)        
+        self.request_resize()
+        
+    def request_resize(self):
+        '''(re)start resize debounce, previous requests become stale'''
+        
+        self.resizeGeneration += 1
+        self.resizePending = True
+        if self.resizeJob is not None:
+            self.resizeJob[2].cancel() # succeeds if job is not started yet
+        self.resizeTimer.start()
+        
+    def submit_resize(self):
+        '''submit computation of the cluster geometry to the worker thread'''
+        
+        cluster = self.gee.cluster
+        # the worker reads only the copies of the data edited in GUI thread
+        resized = cluster.copy_for_resize(cluster.UC.snapshot())
+        future = self.resizeExecutor.submit(cluster.compute_size, self.size,
+                                            resized)
+        self.resizeJob = job = (self.resizeGeneration, cluster, future)
+        future.add_done_callback(lambda future: self.resizeClosed or 
+                                 self.resizeDone.emit(job))
+        
+    def apply_resize(self, job):
+        '''display the result of the newest resize job (in GUI thread)'''
+        
+        generation, cluster, future = job
+        if (not self.resizePending or generation != self.resizeGeneration or
+            future.cancelled() or cluster is not self.gee.cluster):
+            return # stale job
+        
+        self.resizePending = False
+        if future.exception() is not None:
+            msg = " cluster resizing failed: {}".format(future.exception())
+            self.statusBar().showMessage(msg, 2000)
+            if self.TEXT_MODE:
+                print(msg)
+        else:
+            self.gee.apply_size(future.result())
+        
+    def flush_resize(self):
+        '''wait for the pending resize request and apply it immediately'''
+        
+        if self.resizeTimer.isActive():
+            self.resizeTimer.stop()
+            self.submit_resize()
+        if self.resizePending and self.resizeJob is not None:
+            wait([self.resizeJob[2]])
+            self.apply_resize(self.resizeJob)
+        
+    def stop_resize_worker(self):
+        '''cancel the pending resize and shut down the worker thread'''
+        
+        self.resizeTimer.stop()
+        self.resizeClosed = True
+        self.resizePending = False
+        if self.resizeJob is not None:
+            self.resizeJob[2].cancel() # running job is finished and ignored
+        self.resizeExecutor.shutdown(wait=False)
+        
+    def closeEvent(self, evnt):
+        '''overload close in order to stop the resize worker thread'''
+        self.stop_resize_worker()
+        super(MainWindow, self).closeEvent(evnt)
+        
+    def unitCellChanged_resize_slot(self):
+        '''UC edited during resizing: recompute the geometry of the new size'''
+        
+        if self.resizePending:
+            self.request_resize()
         
     def changeType_callback(self):
         '''called when value of self.spinBox_type is changed'''
@@ -373,9 +468,11 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         # disable animated GraphEdgeEditor artists
         self.gee.sc_active.set_visible(False)
         self.gee.new_edge.set_visible(False)
+        self.gee.edges_active.set_visible(False)
         # enabele animated GraphEdgeEditor artists
         self.dlgExportAnim.closed.connect(self.gee.sc_active.set_visible)
         self.dlgExportAnim.closed.connect(self.gee.new_edge.set_visible)
+        self.dlgExportAnim.closed.connect(self.gee.edges_active.set_visible)
         
     def quit_callback(self):
         self.close()    
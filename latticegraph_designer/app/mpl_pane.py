@@ -22,7 +22,6 @@ from __future__ import division # make python 2 use float division
 import numpy as np
 from mpl_toolkits.mplot3d.art3d import Line3D
 from mpl_toolkits.mplot3d.proj3d import proj_transform
-from matplotlib.mlab import dist_point_to_segment
 from matplotlib.patches import FancyArrowPatch
 from mpl_toolkits.mplot3d.art3d import Line3DCollection
 from matplotlib.text import Annotation
@@ -79,6 +78,9 @@ class GraphEdgesEditor(object):
  ##         'n' - switch on/off displaying of the lattice               ##
  ##         'm' - switch on/off displaying of the unit cell arrows      ##
  ##                                                                     ##
+ ##     * Large clusters are rotated in level of detail mode: only      ##
+ ##       the boundary unit cells and the lattice outline are drawn     ##
+ ##                                                                     ##
  ##     * Close manipulation window in order to finish editing          ##
  ##                                                                     ##
  #########################################################################
@@ -86,7 +88,6 @@ class GraphEdgesEditor(object):
     
     buttonHold = False # the no hold button event so lets create one
     isRotated = False # True when axes3D is rotated
-    USE_COLLECTIONS = False # use Line3DCollection for edge representation
     
     def __init__(self, ax, cluster, parent=None, display_report=False):
         '''
@@ -130,6 +131,7 @@ class GraphEdgesEditor(object):
         
         # create artists
         self.edges_lines, self.sc, self.latticeNet = None, None, None
+        self.LOD_artists = [] # decimated scene displayed during rotation
         self.create_artists_graph()
         self.create_artists_highlight()
         self.create_artists_arrows()
@@ -167,14 +169,24 @@ class GraphEdgesEditor(object):
                 dic["color"].append(pref.get("color"))
         
         self.colors_e = np.array(dic1['color']*20)
+        self.rgba_e = np.array([list(hex2color(c))+[1] for c in self.colors_e])
         self.visible_e = np.array(dic1['bool']*20, dtype=bool)
         self.lw = dic1["size"]*7/100
         self.lw_active = self.lw*1.7
         
         self.colors_v = np.array(dic2['color']*20)
+        self.rgba_v = np.array([list(hex2color(c))+[1] for c in self.colors_v])
         self.visible_v = np.array(dic2['bool']*20, dtype=bool)
         self.sc_size = dic2["size"]*20/100
         self.sc_size_active = self.sc_size*1.7
+        
+        # level of detail thresholds (number of cluster edges and vertices)
+        LOD = theme_ET.find("LEVELOFDETAIL")
+        if LOD is None: # theme saved by earlier version
+            LOD = ET.Element("LEVELOFDETAIL", value="True", edges="2000", vertices="2000")
+        self.LOD = LOD.get("value") == "True"
+        self.LOD_edges = int(LOD.get("edges"))
+        self.LOD_vertices = int(LOD.get("vertices"))
                       
     def adjust_scale(self):
         '''hack requirired for ajusting sclale in matplotlib axes3D'''
@@ -205,37 +217,24 @@ class GraphEdgesEditor(object):
                 
         # create vertices
         if self.sc is not None: # remove previous vertices points
-            self.ax.collections.remove(self.sc)
+            self.sc.remove()
  
         self.sc = self.ax.scatter(self.x,self.y,self.z, marker='o')
 
-        # create edges
-        if self.USE_COLLECTIONS:
-            if self.edges_lines is not None: # remove previous edges lines
-                for key, edge_col in self.edges_lines.items():
-                    self.ax.collections.remove(edge_col)
-            
-            self.edges_lines = {}
-            for key, edge in self.UC.edges.items():
-                segments = [self.xyz[self.edges.source_target[j],:] for j in self.edges.array_ind[key]]
-                edge_col = Line3DCollection(segments) 
-                self.ax.add_collection3d(edge_col)
-                self.edges_lines[key] = edge_col
-        else:
-            if self.edges_lines is not None: # remove previous lines edges
-                for line in self.edges_lines:
-                    self.ax.artists.remove(line)
-            
-            self.edges_lines = []
-            for j in range(len(self.edges.ids)):
-                st = list(self.edges.source_target[j])
-                line = Line3D(self.x[st], self.y[st], self.z[st])
-                self.ax.add_artist(line)
-                self.edges_lines.append(line)
+        # create edges: all the cluster edges are drawn by single collection
+        # with per segment color (alpha=0 - invisible) and linewidth arrays
+        if self.edges_lines is not None: # remove previous edges lines
+            self.edges_lines.remove()
+        
+        self.edges_segments = self.xyz[self.edges.source_target].reshape(-1,2,3)
+        self.edges_colors = np.zeros((len(self.edges_segments),4))
+        self.edges_lw = np.zeros(len(self.edges_segments))
+        self.edges_lines = Line3DCollection(self.edges_segments)
+        self.ax.add_collection(self.edges_lines) # limits are set by adjust_scale
             
         # create latticeNet
         if self.latticeNet is not None:  # remove previous lattice lines
-            self.ax.collections.remove(self.latticeNet)
+            self.latticeNet.remove()
         self.latticeNet = Line3DCollection(self.cluster.latticeLines, 
                                            linestyle = '--', lw=0.2)
         self.ax.add_collection3d(self.latticeNet)
@@ -253,6 +252,10 @@ class GraphEdgesEditor(object):
         self.new_edge = Line3D([], [], [], color=self.color_active,
                                lw=self.lw, animated=True)
         self.ax.add_artist(self.new_edge)      
+        # active edges overlay: segments separated by nan in a single line
+        self.edges_active = Line3D([], [], [], color=self.color_active,
+                                   lw=self.lw_active, animated=True)
+        self.ax.add_artist(self.edges_active)
             
     def create_artists_arrows(self):
         '''create and add unit cell arrows artists'''
@@ -285,38 +288,153 @@ class GraphEdgesEditor(object):
             elem.set_color(self.color_lattice)
 
         # set props of the vertices
-        colors = [list(hex2color(c))+[1] for c in self.colors_v[self.vertices.types]]
-        self.sc._facecolor3d = colors
-        self.sc._edgecolor3d = colors
-        self.sc.set_sizes([self.sc_size**2]*len(self.vertices.types))
+        self.set_vertices_properties(self.sc, self.vertices.types)
             
-        # set props of the edges colentions
-        if self.USE_COLLECTIONS:
-            for key, edge_col in self.edges_lines.items():
-                edge_col.set_color(self.colors_e[self.UC.edges[key].type])
-                edge_col.set_visible(self.visible_e[self.UC.edges[key].type])
-                edge_col.set_linewidth(self.lw)
-        else:
-            for j in range(len(self.edges.ids)):
-                self.edges_lines[j].set_color(self.colors_e[self.edges.types[j]])
-                self.edges_lines[j].set_visible(self.visible_e[self.edges.types[j]])
-                self.edges_lines[j].set_linewidth(self.lw)
+        # set props of the edges collection
+        types = self.edges.types
+        self.edges_colors = self.rgba_e[types]
+        self.edges_colors[:,3] = self.visible_e[types]
+        self.edges_lw = np.full(len(types), self.lw)
+        self.update_edges_lines()
                             
         # set activation elements and new_edge      
         self.sc_active.set_markersize(self.sc_size_active)
         self.sc_active.set_color(self.color_active)
         self.new_edge.set_linewidth(self.lw_active)
         self.new_edge.set_color(self.color_active)       
+        self.edges_active.set_linewidth(self.lw_active)
+        self.edges_active.set_color(self.color_active)       
 
         self.canvas.draw()           
 
+    def set_vertices_properties(self, sc, types):
+        '''set color and size of the vertices scatter'''
+        
+        colors = self.rgba_v[types]
+        sc._facecolor3d = colors
+        sc._edgecolor3d = colors
+        sc.set_sizes([self.sc_size**2]*len(types))
+
+    def use_LOD(self):
+        '''True if cluster is large enough for level of detail mode'''
+        
+        return self.LOD and (len(self.edges_segments) > self.LOD_edges or 
+                             len(self.x) > self.LOD_vertices)
+
+    def get_LOD_masks(self):
+        '''
+        returns: masks of the vertices and edges displayed in LOD mode:
+                 the ones within boundary unit cells of the cluster 
+                 and one representative cluster edge per UC edge
+        
+        '''
+        size = np.array(self.vertices.size)
+        sites = self.vertices.sites[np.arange(len(self.x)) // self.vertices.num_UC]
+        # dimensions of size 1 are not taken into account (e.g. 2D lattice)
+        boundary = ((sites == 0) | (sites == size-1)) & (size > 1)
+        mask_v = np.any(boundary, axis=1)
+        
+        mask_e = mask_v[self.edges.source_target[:,0]]
+        for ind in self.edges.array_ind.values():
+            if len(ind) > 0:
+                mask_e[ind[0]] = True
+            
+        return mask_v, mask_e
+
+    def enter_LOD(self):
+        '''replace the scene by decimated one (used during rotation)'''
+        
+        if len(self.LOD_artists) > 0 or not self.use_LOD():
+            return
+        
+        mask_v, mask_e = self.get_LOD_masks()
+        edges = Line3DCollection(self.edges_segments[mask_e], 
+                                 colors=self.edges_colors[mask_e],
+                                 linewidths=self.edges_lw[mask_e])
+        outline = Line3DCollection(self.cluster.latticeOutline, linestyle='--',
+                                   lw=0.2, color=self.color_lattice)
+        outline.set_visible(self.display_lattice)
+        self.ax.add_collection(edges)
+        self.ax.add_collection(outline)
+        sc = self.ax.scatter(self.x[mask_v], self.y[mask_v], self.z[mask_v], marker='o')
+        self.set_vertices_properties(sc, self.vertices.types[mask_v])
+        
+        self.LOD_artists = [edges, outline, sc]
+        self.set_visible([self.edges_lines, self.latticeNet, self.sc], False)
+
+    def exit_LOD(self):
+        '''restore the full scene, returns True if LOD mode was active'''
+        
+        if len(self.LOD_artists) == 0:
+            return False
+        
+        for artist in self.LOD_artists:
+            artist.remove()
+        self.LOD_artists = []
+        self.set_visible([self.edges_lines, self.sc], True)
+        self.latticeNet.set_visible(self.display_lattice)
+        
+        return True
+
     def reset_size(self, size):
         '''resize the displayed lattice cluster'''
         
-        self.cluster.reset_size(size)
-        self.create_artists_graph()
+        self.apply_size(self.cluster.compute_size(size))
+
+    def apply_size(self, cluster):
+        '''display resized cluster computed by self.cluster.compute_size'''
+        
+        growth = cluster.growth
+        if growth is not None: # artists can be extended if they show the old cluster
+            if (growth["size"] != self.cluster.size or growth["vertices"] != len(self.x)
+                or len(growth["edges"]) + len(self.edges_segments) != 
+                   len(cluster.edges.source_target)):
+                growth = None
+        
+        self.exit_LOD()
+        self.cluster.apply_size(cluster)
+        self.vertices = self.cluster.vertices
+        self.edges = self.cluster.edges
+        if growth is None:
+            self.create_artists_graph()
+            self.adjust_scale()
+            self.set_artists_properties()
+        else:
+            self.append_artists_graph(growth["edges"])
+
+    def append_artists_graph(self, newEdges):
+        '''
+        extend the artists by vertices and edges added by growing the cluster
+        
+        input: newEdges - indexes of the new edges in the cluster edges arrays
+        
+        '''
+        # vertices of the new sites are appended
+        self.xyz = self.vertices.coords
+        self.x, self.y, self.z = self.xyz.T
+        self.update_XY_scr()
+        self.sc._offsets3d = (self.x, self.y, self.z)
+        self.set_vertices_properties(self.sc, self.vertices.types)
+        
+        # new edges are inserted after the old ones of the same UC edge
+        num = len(self.edges.source_target)
+        isOld = np.ones(num, dtype=bool)
+        isOld[newEdges] = False
+        types = self.edges.types[newEdges]
+        for name, new in (("edges_segments", 
+                           self.xyz[self.edges.source_target[newEdges]]),
+                          ("edges_colors", np.hstack((self.rgba_e[types][:,:3],
+                                           self.visible_e[types][:,np.newaxis]))),
+                          ("edges_lw", np.full(len(newEdges), self.lw))):
+            old = getattr(self, name)
+            array = np.empty((num,)+old.shape[1:])
+            array[isOld], array[newEdges] = old, new
+            setattr(self, name, array)
+        self.update_edges_lines(SEGMENTS=True)
+        
+        self.latticeNet.set_segments(self.cluster.latticeLines)
         self.adjust_scale()
-        self.set_artists_properties()        
+        self.canvas.draw()
                         
  
     def update_XY_scr(self):
@@ -339,6 +457,24 @@ class GraphEdgesEditor(object):
             ind = None
             
         return ind
+
+    def get_edge_under_point(self, event):
+        'get the id of the edge nearest to the point if within lw_active tolerance'
+        
+        if len(self.edges.source_target) == 0:
+            return None
+        
+        # distance from point to all the projected segments at once
+        s, t = self.edges.source_target.T
+        x0, y0 = self.x_scr[s], self.y_scr[s]
+        dx, dy = self.x_scr[t] - x0, self.y_scr[t] - y0
+        l2 = dx**2 + dy**2
+        u = ((event.x - x0)*dx + (event.y - y0)*dy)/np.where(l2 > 0, l2, 1)
+        u = np.clip(u, 0, 1) # closest point is restricted to the segment
+        d = np.hypot(x0 + u*dx - event.x, y0 + u*dy - event.y)
+        i = np.argmin(d)
+        
+        return self.edges.ids[i] if d[i] <= self.lw_active else None
         
     def getMouseXYZ(self, event):
         '''return xyz of the mouse in 3D space (like in coord_string)'''
@@ -353,8 +489,36 @@ class GraphEdgesEditor(object):
         if not self.isRotated:    
             self.update_XY_scr() 
 
-        # store background for blitting
+        # store background (without animated artists) for blitting
         self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.update_highlight()
+        self.ax.draw_artist(self.edges_active)
+
+    def update_highlight(self):
+        '''set the data of active edges overlay (visible active edges only)'''
+        
+        ids = set(self.e_activeDist_ids)
+        if self.e_active_ind is not None:
+            ids.add(self.e_active_ind)
+        
+        array_ind = self.edges.array_ind
+        ind = np.array([j for _id in ids for j in array_ind.get(_id, [])], dtype=int)
+        ind = ind[self.edges_colors[ind,3] > 0]
+        
+        xyz = np.full((len(ind),3,3), np.nan) # nan breaks the line
+        xyz[:,:2,:] = self.edges_segments[ind]
+        x, y, z = xyz.reshape(-1,3).T
+        self.edges_active.set_data(x, y)
+        self.edges_active.set_3d_properties(z)
+
+    def blit_highlight(self):
+        '''restore background and blit the highlighted elements only'''
+        
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.edges_active)
+        if self.v_active_ind is not None:
+            self.ax.draw_artist(self.sc_active)
+        self.canvas.blit(self.ax.bbox)
             
 
     def motion_notify_callback(self, event):
@@ -365,6 +529,8 @@ class GraphEdgesEditor(object):
         
         # when axes3D is rotated
         if self.buttonHold and (self.v_source_ind is None):
+            if not self.isRotated:
+                self.enter_LOD()
             self.isRotated = True                       
             return 
         
@@ -376,6 +542,7 @@ class GraphEdgesEditor(object):
 
             if self.v_source_ind is None: 
                 self.canvas.restore_region(self.background)
+                self.ax.draw_artist(self.edges_active)
             # else background would be restored during new edge redrawing
             if self.v_active_ind is not None: # activation (color)
                 self.sc_active.set_data(self.x[self.v_active_ind],
@@ -412,14 +579,10 @@ class GraphEdgesEditor(object):
             return
         
         # edge selection
-        p = event.x, event.y  # display coords
-        for i in range(len(self.edges.source_target)):
-            (s, t) = self.edges.source_target[i]
-            d = dist_point_to_segment(p, (self.x_scr[s],self.y_scr[s]),
-                                      (self.x_scr[t],self.y_scr[t]))
-            if d <= self.lw_active:                
-                self.select_edge(self.edges.ids[i])
-                return
+        ind = self.get_edge_under_point(event)
+        if ind is not None:
+            self.select_edge(ind)
+            return
             
         self.e_ind = None
 
@@ -432,8 +595,7 @@ class GraphEdgesEditor(object):
             if (self.v_active_ind is None) or \
                (self.v_active_ind == self.v_source_ind):          
                 self.v_source_ind = None
-                self.canvas.restore_region(self.background)
-                self.canvas.blit(self.ax.bbox)           
+                self.blit_highlight()
             else:
                 self.v_target_ind = self.v_active_ind
                 self.add_edge()            
@@ -442,6 +604,8 @@ class GraphEdgesEditor(object):
         elif self.isRotated: # Axes3D was rotated
             self.update_XY_scr()
             self.isRotated = False
+            if self.exit_LOD():
+                self.canvas.draw()
             
         # Axes3D was not rotated             
         # deactivate active edge if no new edge is selected
@@ -456,35 +620,35 @@ class GraphEdgesEditor(object):
         for elem in elements_list:
             elem.set_visible(boolVisible)   
 
-    def reset_e_color(self, ind, color, lw):
-        '''reset the color of selected edge'''
+    def update_edges_lines(self, SEGMENTS=False):
+        '''pass edges color and linewidth arrays (and segments) to collection'''
         
-        if self.USE_COLLECTIONS:
-            self.edges_lines[ind].set_color(color)  
-            self.edges_lines[ind].set_linewidth(lw)  
-        else:
-            for j in self.edges.array_ind[ind]:             
-                self.edges_lines[j].set_color(color)
-                self.edges_lines[j].set_linewidth(lw)
-
-    def reset_active_e_color(self, color, lw):
-        '''reset the color of selected active edge'''        
+        if SEGMENTS:
+            self.edges_lines.set_segments(self.edges_segments)
+        self.edges_lines.set_color(self.edges_colors)
+        self.edges_lines.set_linewidth(self.edges_lw)
 
-        self.reset_e_color(self.e_active_ind, color, lw)
-        self.canvas.draw()
-        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+    def reset_e_color(self, ids, color, lw):
+        '''reset the color of the edges with given ids (full redraw is required)'''
+        
+        # each edge occupies a contiguous slice of the collection arrays
+        array_ind = self.edges.array_ind
+        index = np.concatenate([np.arange(array_ind[ind].start, array_ind[ind].stop)
+                                for ind in ids] + [np.zeros(0, dtype=int)])
+        if len(index) == 0:
+            return
+        self.edges_colors[index,:3] = hex2color(color)
+        self.edges_colors[index,3] = self.visible_e[self.edges.types[index]]
+        self.edges_lw[index] = lw
+        self.update_edges_lines()
 
     def select_edge(self, ind):
         '''select (ativate) edge with index ind. If ind=None unselect active'''
 
         self.e_ind = ind
-        if self.e_active_ind is not None: # deactivate previouse
-            color = self.colors_e[self.UC.edges[self.e_active_ind].type]
-            self.reset_active_e_color(color, self.lw)
-        
         self.e_active_ind = self.e_ind # activate new edge
-        if ind is not None:
-            self.reset_active_e_color(self.color_active, self.lw_active)
+        self.update_highlight()
+        self.blit_highlight()
 
         if self.parent is not None: # pass signals and notifications
             self.parent.selectedEdgeChanged.emit(self.e_active_ind)
@@ -496,18 +660,11 @@ class GraphEdgesEditor(object):
     def select_edges(self, ids):
         '''select (ativate) edge with index in ids list'''
                     
-        for ind in self.e_activeDist_ids: # deactivate previouse
-            color = self.colors_e[self.UC.edges[ind].type]
-            self.reset_e_color(ind, color, self.lw)
-
-        self.e_activeDist_ids = ids # activate new edge
+        self.e_activeDist_ids = ids # activate new edges
         self.e_ind = None if len(ids) == 0 else ids[0]
         self.e_active_ind = self.e_ind
-        for ind in ids:
-            self.reset_e_color(ind, self.color_active, self.lw_active)
-            
-        self.canvas.draw()
-        self.background = self.canvas.copy_from_bbox(self.ax.bbox)              
+        self.update_highlight()
+        self.blit_highlight()
 
     def change_active_edge_type(self, new_type):
         '''change selected adge type'''
@@ -519,14 +676,17 @@ class GraphEdgesEditor(object):
                 self.edges.change_edge_type(self.e_active_ind, new_type)
                 msg = ' type of the edge id={0} was changed from {1} to {2}'.format(
                         self.e_active_ind, old_type, new_type)
-                
-                #self.reset_active_e_color(self.colors_e[new_type], self.lw)            
-                #self.e_active_ind = None
             else:
                 for ind in self.e_activeDist_ids:
                     self.edges.change_edge_type(ind, new_type)
                 msg = ' type of the edges was changed from {1} to {2}'.format(
                         self.e_active_ind, old_type, new_type)
+            
+            # edges stay selected (highlight is updated on draw)
+            ids = self.e_activeDist_ids
+            self.reset_e_color(ids if len(ids) > 0 else [self.e_active_ind],
+                               self.colors_e[new_type], self.lw)
+            self.canvas.draw()
                                             
             if self.display_report:
                 print(msg)
@@ -542,27 +702,18 @@ class GraphEdgesEditor(object):
                 
         if newEdge_id is not None:
             
-            if self.USE_COLLECTIONS:
-                segments = [self.xyz[self.edges.source_target[j],:] for j in self.edges.array_ind[newEdge_id]]
-                new_edge_col = Line3DCollection(segments,color=self.colors_e[0],lw=self.lw) 
-                self.ax.add_collection3d(new_edge_col)
-                self.edges_lines[newEdge_id] = new_edge_col
-            else:
-                for j in self.edges.array_ind[newEdge_id]:
-                    edge = self.edges.source_target[j]
-                    st = list(edge)
-                    line = Line3D(self.x[st], self.y[st], self.z[st], 
-                                  color = self.colors_e[0], lw=self.lw)
-                    self.ax.add_artist(line)
-                    self.edges_lines.append(line)
+            # new edge segments are appended to the end of edges arrays
+            j = self.edges.array_ind[newEdge_id]
+            segments = self.xyz[self.edges.source_target[j]].reshape(-1,2,3)
+            colors = np.tile(self.rgba_e[0], (len(j),1))
+            colors[:,3] = self.visible_e[0]
+            self.edges_segments = np.concatenate((self.edges_segments, segments))
+            self.edges_colors = np.concatenate((self.edges_colors, colors))
+            self.edges_lw = np.concatenate((self.edges_lw, np.full(len(j), self.lw)))
+            self.update_edges_lines(SEGMENTS=True)
             
-            # deactivate previous active edge
-            if self.e_active_ind is not None:
-                color = self.colors_e[self.UC.edges[self.e_active_ind].type]
-                self.reset_active_e_color(color, self.lw)
-
             self.e_active_ind = newEdge_id # activate new edge
-            self.reset_active_e_color(self.color_active, self.lw_active)
+            self.update_highlight()
 
             if self.display_report:
                 print(' added edge: {}'.format(self.UC.edges[newEdge_id]))
@@ -577,24 +728,26 @@ class GraphEdgesEditor(object):
     def delete_edge_callback(self, _id):
         '''deleted edge with _id'''
 
-        if self.edges.array_ind.get(_id) is None:
+        self.delete_edges([_id])
+
+    def delete_edges(self, ids):
+        '''deleted edges with ids, collection arrays are updated at once'''
+
+        array_ind = self.edges.array_ind
+        ids = [_id for _id in ids if array_ind.get(_id) is not None]
+        if len(ids) == 0:
             return
-        if len(self.edges.array_ind.get(_id)) == 0:
+        
+        # remove from both the ClusterEdges and the collection arrays
+        removed = np.concatenate([array_ind[_id] for _id in ids]).astype(int)
+        for _id in ids:
             self.edges.remove_edge(_id)
-            return
-            
-        #remove from both list                
-        if self.USE_COLLECTIONS:
-            self.ax.collections.remove(self.edges_lines[_id])
-            del self.edges_lines[_id]
-        else:
-            for j in self.edges.array_ind[_id]:             
-                self.ax.artists.remove(self.edges_lines[j])                    
-            begin = self.edges.array_ind[_id][0]
-            end = self.edges.array_ind[_id][-1]
-            self.edges_lines[begin:end+1] = []
-                       
-        self.edges.remove_edge(_id)
+        
+        if len(removed) > 0:
+            self.edges_segments = np.delete(self.edges_segments, removed, axis=0)
+            self.edges_colors = np.delete(self.edges_colors, removed, axis=0)
+            self.edges_lw = np.delete(self.edges_lw, removed)
+            self.update_edges_lines(SEGMENTS=True)
 
     def delete_active_edge_callback(self):
         '''deleted selected (active) edge'''
@@ -607,8 +760,7 @@ class GraphEdgesEditor(object):
                 activeDist = self.UC.edges[self.e_activeDist_ids[0]].length
                 numActDist = len(self.e_activeDist_ids)
                 msg = " deleted {0} edges with length: {1}".format(numActDist, activeDist)
-                for ind in self.e_activeDist_ids[:]:
-                    self.delete_edge_callback(ind)                
+                self.delete_edges(self.e_activeDist_ids[:])
                         
             if self.display_report:
                 print(msg)
@@ -661,7 +813,7 @@ class GraphEdgesEditor(object):
         
         # show message                        
         dist = self.UC.edges[ind].length
-        num = len(self.UC.lengthDic[dist])
+        num = len(self.UC.find_edges_by_length(dist))
         msg = ' {0} edges were found with dist={1:.3f}'.format(num,dist)    
         if self.display_report:
             print(msg)
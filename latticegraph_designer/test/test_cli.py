@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testing of the headless command line interface"""
+
+from __future__ import division
+
+__author__ = "Ivan Luchko (luchko.ivan@gmail.com)"
+__version__ = "1.0a1"
+__date__ = "Apr 4, 2017"
+__copyright__ = "Copyright (c) 2017, Ivan Luchko and Project Contributors "
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+from latticegraph_designer.app import cli
+from latticegraph_designer.app.core import ParseXML
+
+test_folder = os.path.dirname(os.path.abspath(__file__))
+root_folder = os.path.dirname(os.path.dirname(test_folder))
+
+
+class CLITest(unittest.TestCase):
+    '''Test the latticegraph-designer command line tool'''
+
+    def setUp(self):
+
+        self.tmpDir = tempfile.mkdtemp()
+        self.fn_cif = os.path.join(test_folder, "test.cif")
+        self.fn_output = os.path.join(self.tmpDir, "lib.xml")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpDir)
+
+    def test_cif_edges_search(self):
+
+        argv = [self.fn_cif, "--atoms", "Cu", "-e", "0:5.514:1", "-e", "1:7.55",
+                "--lg-name", "test", "-o", self.fn_output]
+        self.assertEqual(cli.run(argv), 0)
+
+        lattice, UC = ParseXML(fileName=self.fn_output).parse_LATTICEGRAPH("test")
+        self.assertEqual(UC.num_vertices, 8)
+        self.assertEqual(UC.num_edges, 20)
+        self.assertEqual(len([e for e in UC.edges.values() if e.type == 1]), 4)
+
+    def test_xml_input(self):
+
+        fn_input = os.path.join(test_folder, "testALPS_lib.xml")
+        argv = [fn_input, "-n", "simple cubic lattice", "--clear-edges",
+                "-e", "3:1.0", "-o", self.fn_output]
+        self.assertEqual(cli.run(argv), 0)
+
+        lattice, UC = ParseXML(fileName=self.fn_output).parse_LATTICEGRAPH("simple cubic lattice")
+        self.assertEqual(UC.num_edges, 3)
+        self.assertEqual(set(edge.type for edge in UC.edges.values()), set([3]))
+
+        self.assertEqual(cli.run([fn_input, "-n", "undefined graph"]), 1)
+
+    def test_batch(self):
+
+        inputDir = os.path.join(self.tmpDir, "cifs")
+        os.makedirs(os.path.join(inputDir, "sub"))
+        for fn in ("a.cif", "sub/b.cif", "sub/a.cif"):
+            shutil.copy(self.fn_cif, os.path.join(inputDir, fn))
+        with open(os.path.join(inputDir, "broken.cif"), "w") as f:
+            f.write("not a cif file")
+
+        argv = [inputDir, "--atoms", "Cu", "-e", "0:5.514:1", "-j", "2",
+                "-o", self.fn_output]
+        # broken file is reported but the others are converted
+        self.assertEqual(cli.run(argv), 1)
+        parser = ParseXML(fileName=self.fn_output)
+        self.assertEqual(parser.get_LATTICEGRAPH_names(), ["a", "a_2", "b"])
+        lattice, UC = parser.parse_LATTICEGRAPH("a_2")
+        self.assertEqual(UC.num_edges, 16)
+
+        outputDir = os.path.join(self.tmpDir, "libs")
+        argv = [os.path.join(inputDir, "a.cif"), os.path.join(inputDir, "sub"),
+                "--atoms", "Cu", "-j", "1", "--output-dir", outputDir]
+        self.assertEqual(cli.run(argv), 0)
+        self.assertEqual(sorted(os.listdir(outputDir)), ["a.xml", "a_2.xml", "b.xml"])
+
+    def test_no_gui_imports(self):
+
+        code = ("import sys; from latticegraph_designer.app import cli; "
+                "cli.run(sys.argv[1:]); "
+                "print(any(m.split('.')[0] in ('PyQt4','PyQt5','matplotlib') "
+                "for m in sys.modules))")
+        # the package is imported from the source tree even if not installed
+        output = subprocess.check_output([sys.executable, "-c", code, self.fn_cif,
+                                          "-f", "txt"], cwd=root_folder)
+        self.assertTrue(output.decode().strip().endswith("False"))
+
+
+if __name__ == "__main__":
+    unittest.main()
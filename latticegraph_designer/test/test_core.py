@@ -0,0 +1,665 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Testing of the core classes (do not require PyQt and matplotlib)"""
+
+from __future__ import division
+
+__author__ = "Ivan Luchko (luchko.ivan@gmail.com)"
+__version__ = "1.0a1"
+__date__ = "Apr 4, 2017"
+__copyright__ = "Copyright (c) 2017, Ivan Luchko and Project Contributors "
+
+import os
+import unittest
+import itertools
+import shutil
+import tempfile
+import xml.etree.ElementTree as ET
+import numpy as np
+try:
+    import scipy.sparse as sparse
+except ImportError: # scipy is optional
+    sparse = None
+
+from latticegraph_designer.app.core import (Vertex, Edge, UnitCell, Lattice,
+                                            NeighbourIndex, CrystalCluster,
+                                            GeometryCache,
+                                            ParseXML, ParseCache, ExportXML,
+                                            compile_symop)
+
+
+def create_test_UC(**kwargs):
+    '''returns lattice and unit cell used in tests'''
+
+    lattice = Lattice(basisMatrix=np.array([[1,0,0],[0,1,0],[0,0,1.3]]).T)
+    UC = UnitCell(lattice, **kwargs)
+    UC.add_vertex(Vertex(0,0,[0.2,0.2,0.2]))
+    UC.add_vertex(Vertex(0,0,[0.3,0.3,0.6]))
+    UC.add_edge(Edge(0,1,(1,2),(0,0,0)))
+    UC.add_edge(Edge(0,2,(2,1),(0,0,1)))
+    UC.add_edge(Edge(0,0,(1,1),(1,0,0)))
+    UC.add_edge(Edge(0,0,(1,1),(0,1,0)))
+    UC.add_edge(Edge(0,0,(2,2),(1,0,0)))
+    UC.add_edge(Edge(0,0,(2,2),(0,1,0)))
+
+    return lattice, UC
+
+
+class LatticeTest(unittest.TestCase):
+    '''Test the finite lattice geometry'''
+
+    def setUp(self):
+
+        self.basis = np.array([[1,0,0],[0.1,1.2,0],[0.05,0.05,1]]).T
+        self.lattice = Lattice(basisMatrix=self.basis)
+
+    def test_finite_lattice_sites(self):
+
+        size = (3,2,4)
+        sites = self.lattice.get_finite_lattice_sites(size)
+        expected = [np.dot(self.basis, site) for site in 
+                    itertools.product(range(3),range(2),range(4))]
+        self.assertTrue(np.allclose(sites, expected))
+        # memoized read-only array
+        self.assertTrue(sites is self.lattice.get_finite_lattice_sites(size))
+        self.assertFalse(sites.flags.writeable)
+        self.lattice.basisMatrix = 2*self.basis
+        self.assertTrue(np.allclose(self.lattice.get_finite_lattice_sites(size), 
+                                    2*np.array(expected)))
+
+    def test_lattice_lines(self):
+
+        L,W,H = size = (3,2,4)
+        lines, outline = self.lattice.get_lattice_lines(size)
+        self.assertEqual(lines.shape, ((L+1)*(W+1)+(L+1)*(H+1)+(W+1)*(H+1),2,3))
+        self.assertTrue(np.allclose(lines[1], np.dot(self.basis, [[0,0],[1,1],[0,H]]).T))
+        self.assertEqual(outline.shape, (12,2,3))
+        corners = np.dot(np.array(list(itertools.product((0,L),(0,W),(0,H)))), self.basis.T)
+        for point in outline.reshape(-1,3):
+            self.assertTrue(np.min(np.linalg.norm(corners-point, axis=1)) < 1e-9)
+
+
+class UnitCellTest(unittest.TestCase):
+    '''Test the UnitCell edges container'''
+
+    def setUp(self):
+
+        self.lattice, self.UC = create_test_UC()
+
+    def test_duplicates(self):
+
+        # (2,2) offset (-1,0,0) is the same edge as (2,2) offset (1,0,0)
+        self.assertTrue(self.UC.add_edge(Edge(0,0,(2,2),(-1,0,0))) is None)
+        self.assertEqual(self.UC.get_edge_id(2,2,(-1,0,0)), 5)
+        self.assertEqual(self.UC.get_edge_id(1,2), 1)
+
+        self.UC.remove_edge(5)
+        self.assertTrue(self.UC.get_edge_id(2,2,(1,0,0)) is None)
+        self.assertEqual(self.UC.add_edge(Edge(0,0,(2,2),(-1,0,0))), 7)
+
+        self.UC.clearEdges()
+        self.assertEqual(len(self.UC.edgesIndex), 0)
+        self.assertEqual(self.UC.add_edge(Edge(0,0,(2,2),(1,0,0))), 1)
+
+    def test_add_edges(self):
+
+        source_target = [(1,2),(1,1),(1,1),(2,2),(2,1)]
+        offsets = [(1,0,0),(0,0,1),(0,0,-1),(0,1,0),(-1,0,0)]
+        ids = self.UC.add_edges(source_target, offsets, _type=3)
+        # (2,2) offset (0,1,0) already exists, (1,1) and (1,2) are given twice
+        self.assertEqual(ids, [7, 8])
+        self.assertEqual(self.UC.num_edges, 8)
+        self.assertEqual(self.UC.get_edge_id(2,1,(-1,0,0)), 7)
+        self.assertEqual(self.UC.get_edge_id(1,1,(0,0,1)), 8)
+        self.assertEqual(self.UC.edges[8].type, 3)
+        self.assertEqual(self.UC.edges[8].length, 1.3)
+
+    def test_compute_edgesLength(self):
+
+        lattice = Lattice(basisMatrix=np.array([[1,0,0],[0.3,1.1,0],[0.1,0.2,1.7]]).T)
+        self.UC.add_edges([(1,2),(2,1)], [(1,1,0),(0,-1,1)], _type=3)
+        self.UC.compute_edgesLength(lattice)
+        lengthDic = {}
+        for _id, edge in self.UC.edges.items():
+            length = edge.length
+            self.assertEqual(edge.recompute_length(self.UC, lattice), length)
+            lengthDic.setdefault(length, []).append(_id)
+        self.assertEqual(self.UC.lengthDic, lengthDic)
+
+    def test_length_index(self):
+
+        # lengths: 1 - 0.5389, 2 - 0.7927, 3,4,5,6 - 1.0
+        ids = self.UC.add_edges([(1,2),(2,1)], [(0,1,0),(1,0,0)], lengths=[1.0001, 1.6])
+        self.assertEqual(self.UC.lengthDic[1.0], [3,4,5,6])
+        self.assertEqual(list(self.UC.lengthDic.keys())[-2:], [1.0001, 1.6])
+        # lengths differing by rounding noise are found within tolerance
+        self.assertEqual(self.UC.find_edges_by_length(1.0), [3,4,5,6,7])
+        self.assertEqual(self.UC.find_edges_by_length(1.5, 0.2), [8])
+        shells = self.UC.lengthIndex.get_shells(self.UC.LENGTH_TOLERANCE)
+        self.assertEqual([shell["lengths"] for shell in shells][-3:], 
+                         [[0.7927], [1.0, 1.0001], [1.6]])
+        self.assertEqual(shells[-2]["ids"], [3,4,5,6,7])
+
+        self.UC.remove_edge(4)
+        self.UC.remove_edge(7)
+        self.assertEqual(self.UC.add_edge(Edge(0,0,(1,1),(0,0,1))), 9)
+        self.assertEqual(self.UC.find_edges_by_length(1.0), [3,5,6])
+        self.assertEqual(self.UC.lengthDic[1.3], [9])
+        # index is rebuilt with the new lattice
+        self.UC.compute_edgesLength(Lattice(basisMatrix=2*self.lattice.basisMatrix))
+        self.assertEqual(self.UC.find_edges_by_length(2.0), [3,5,6])
+        self.assertEqual(len(self.UC.lengthIndex), self.UC.num_edges)
+
+    def test_array_storage(self):
+
+        lattice, UC = create_test_UC(ARRAY_STORAGE=True)
+        self.assertEqual(UC.fingerprint(), self.UC.fingerprint())
+        for uc in (UC, self.UC):
+            self.assertTrue(uc.add_edge(Edge(0,0,(2,2),(-1,0,0))) is None)
+            self.assertEqual(uc.add_edges([(1,2),(2,2),(2,1)], 
+                                          [(1,0,0),(0,1,0),(-1,0,1)], 3), [7,8])
+            uc.remove_edge(5)
+            uc.edges[8].type = 2
+            for source_target in ((1,3), (0,2)): # unknown vertex id
+                with self.assertRaises(KeyError):
+                    uc.add_edges([source_target], [(0,0,0)])
+        self.assertEqual(UC.get_edge_id(2,1,(-1,0,1)), 8)
+        self.assertEqual(str(UC), str(self.UC))
+        self.assertEqual(dict(UC.lengthDic), self.UC.lengthDic)
+        self.assertEqual(UC.fingerprint(), self.UC.fingerprint())
+
+        # views follow the rows moved by the compaction of the arrays
+        edge = UC.edges[8]
+        for _id in (1,2,3,4):
+            UC.remove_edge(_id)
+            self.UC.remove_edge(_id)
+        self.assertEqual((edge.id, edge.type, edge.length), (8, 2, self.UC.edges[8].length))
+        self.assertEqual(list(UC.edges.keys()), [6,7,8])
+        self.assertEqual(UC.lengthDic.get(1.0), [6])
+
+        CrystalCluster.geometryCache.clear()
+        edges = CrystalCluster(UC, lattice, (2,2,2)).edges
+        CrystalCluster.geometryCache.clear()
+        expected = CrystalCluster(self.UC, self.lattice, (2,2,2)).edges
+        self.assertTrue(np.array_equal(edges.source_target, expected.source_target))
+        self.assertTrue(np.array_equal(edges.ids, expected.ids))
+
+    def test_symops(self):
+
+        matrix = compile_symop(['-y','x-y+1/2','z'])
+        self.assertTrue(np.allclose(matrix.dot([0.1,0.2,0.3,1]), [-0.2,0.4,0.3]))
+
+        symops = [['x','y','z'],['-x','-y','-z'],['y','x+1/2','z']]
+        sites = self.UC.apply_symops([0.25,0.5,0.0], symops)
+        # coordinates are wrapped into UC: (0.5,1.25,0.0) -> (0.5,0.25,0.0)
+        self.assertEqual(sites, [(0.25,0.5,0.0),(0.75,0.5,0.0),
+                                 (0.5,0.75,0.0),(0.5,0.25,0.0)])
+
+
+class NeighbourIndexTest(unittest.TestCase):
+    '''Test the search of vertices pairs within cutoff distance'''
+
+    def setUp(self):
+
+        self.lattice, self.UC = create_test_UC()
+        self.index = NeighbourIndex(self.UC, self.lattice)
+
+    def brute_force_pairs(self, cutoff, n=4):
+        '''returns set of edge keys within cutoff found by direct search'''
+
+        pairs = set()
+        for offset in itertools.product(range(-n,n+1), repeat=3):
+            for source, target in itertools.product(self.UC.vertices, repeat=2):
+                if source == target and offset == (0,0,0):
+                    continue
+                coords = (np.array(self.UC.vertices[target].coords) + offset - 
+                          self.UC.vertices[source].coords)
+                dist = np.linalg.norm(self.lattice.convert_to_Cartesian(coords))
+                if dist <= cutoff:
+                    edge = Edge(0,0,(source,target),offset)
+                    edge.standart_form()
+                    pairs.add(UnitCell.get_edge_key(edge))
+        return pairs
+
+    def test_get_pairs(self):
+
+        for cutoff in (2.5, 1.0, 0.5):
+            source_target, offsets, dists = self.index.get_pairs(cutoff)
+            pairs = set((s,t)+tuple(o) for (s,t),o in zip(source_target, offsets))
+            self.assertEqual(len(pairs), len(dists))
+            self.assertEqual(pairs, self.brute_force_pairs(cutoff))
+            self.assertTrue(np.all(dists <= cutoff))
+
+    def test_search_edges_by_dist(self):
+
+        cluster = CrystalCluster(self.UC, self.lattice, (2,2,2))
+        self.UC.clearEdges()
+        cluster.edges.search_edges_by_dist(1, 1.0)
+        # 2 vertices x 2 in-plane directions
+        self.assertEqual(self.UC.num_edges, 4)
+        self.assertEqual(self.UC.lengthDic, {1.0: [1,2,3,4]})
+
+    def test_get_shells(self):
+
+        shells = self.index.get_shells(2.0)
+        dists = [shell["dist"] for shell in shells]
+        self.assertEqual(dists, sorted(dists))
+        self.assertTrue(all(dist <= 2.0 for dist in dists))
+        # every pair of vertices belongs to one shell
+        source_target, offsets, pairDists = self.index.get_pairs(2.0)
+        self.assertEqual(sum(shell["num"] for shell in shells), len(pairDists))
+        for dist in pairDists:
+            self.assertTrue(np.min(np.abs(np.array(dists) - dist)) < 2e-4)
+        self.assertEqual(shells[2], {"dist": 1.0, "num": 4, "types": [(0,0)]})
+        # cached
+        hits = NeighbourIndex.shellsCache.stats()["hits"]
+        self.assertEqual(self.index.get_shells(2.0, num=3), shells[:3])
+        self.assertEqual(NeighbourIndex.shellsCache.stats()["hits"], hits+1)
+
+    def test_search_edges_by_dists(self):
+
+        # shells are searched at once, wide shell adds only (2,1) edges
+        searches = [(1, 1.0, 0.1), (2, 1.3, 0.1), (3, 1.0, 5)]
+        cluster = CrystalCluster(self.UC, self.lattice, (2,2,2))
+        self.UC.clearEdges()
+        cluster.edges.search_edges_by_dists(searches)
+        edges = set((UnitCell.get_edge_key(e), e.type, e.length) 
+                    for e in self.UC.edges.values())
+        self.assertEqual(len(edges), 8)
+        self.assertEqual(sorted(e[1] for e in edges), [1]*4+[2]*2+[3]*2)
+
+        self.UC.clearEdges()
+        for search in searches:
+            cluster.edges.search_edges_by_dist(*search)
+        self.assertEqual(edges, set((UnitCell.get_edge_key(e), e.type, e.length) 
+                                    for e in self.UC.edges.values()))
+
+
+class ClusterEdgesTest(unittest.TestCase):
+    '''Test the extension of the unit cell edges over the cluster'''
+
+    def setUp(self):
+
+        self.lattice, self.UC = create_test_UC()
+        self.cluster = CrystalCluster(self.UC, self.lattice, (2,3,2))
+
+    def test_process_edges(self):
+
+        edges = self.cluster.edges
+        vertices = self.cluster.vertices
+        # compare with the site by site expansion of the unit cell edges
+        source_target = []
+        for key, edge in self.UC.edges.items():
+            for site in edges.sites:
+                source = vertices.get_arrayIndex(edge.source, site)
+                target = vertices.get_arrayIndex(edge.target, site+edge.offset)
+                if (source is not None) and (target is not None):
+                    source_target.append((source, target))
+
+        self.assertTrue(np.array_equal(edges.source_target, source_target))
+        for key, edge in self.UC.edges.items():
+            self.assertTrue(np.all(edges.ids[edges.array_ind[key]] == key))
+            self.assertTrue(np.all(edges.types[edges.array_ind[key]] == edge.type))
+
+    def test_get_arrayIndex(self):
+
+        vertices = self.cluster.vertices
+        ids = np.array([1,2,2,1,3])
+        sites = np.array([(0,0,0),(1,2,1),(1,3,0),(-1,0,0),(0,0,0)])
+        ind = vertices.get_arrayIndex(ids, sites)
+        self.assertEqual(list(ind[2:]), [-1,-1,-1])
+        self.assertEqual(vertices.get_arrayIndex(2, (1,2,1)), ind[1])
+        self.assertTrue(vertices.get_arrayIndex(2, (1,3,0)) is None)
+        self.assertTrue(np.array_equal(vertices.ids[ind[:2]], ids[:2]))
+        coords = [self.lattice.convert_to_Cartesian(self.UC.vertices[_id].coords + site)
+                  for _id, site in zip(ids[:2], sites[:2])]
+        self.assertTrue(np.allclose(vertices.coords[ind[:2]], coords))
+
+    def test_add_remove_edge(self):
+
+        edges = self.cluster.edges
+        num = len(edges.vertices.ids)
+        for j in range(num):
+            edges.add_edge(j, (7*j+3) % num)
+            if j % 3 == 0:
+                edges.remove_edge(min(self.UC.edges.keys()))
+        edges.change_edge_type(max(self.UC.edges.keys()), 2)
+
+        # the same arrays are obtained by processing the final unit cell
+        source_target = edges.source_target.copy()
+        ids, types = edges.ids.copy(), edges.types.copy()
+        array_ind = dict(edges.array_ind)
+        edges.process_edges(self.cluster.size)
+        self.assertTrue(np.array_equal(source_target, edges.source_target))
+        self.assertTrue(np.array_equal(ids, edges.ids))
+        self.assertTrue(np.array_equal(types, edges.types))
+        self.assertEqual(array_ind, edges.array_ind)
+
+    def test_process_no_edges(self):
+
+        self.UC.clearEdges()
+        self.cluster.edges.process_edges(self.cluster.size)
+        self.assertEqual(len(self.cluster.edges.ids), 0)
+        self.assertEqual(len(self.cluster.edges.source_target), 0)
+
+    def get_edges_set(self, cluster):
+        '''returns set of (UC edge id, source coords, target coords)'''
+
+        edges, coords = cluster.edges, np.round(cluster.vertices.coords, 6)
+        return set((edges.ids[j], tuple(coords[source]), tuple(coords[target]))
+                   for j, (source, target) in enumerate(edges.source_target))
+
+    def test_grow(self):
+
+        coords = self.cluster.vertices.coords.copy()
+        self.cluster.edges.remove_edge(2)
+        self.cluster.reset_size((3,4,2))
+        growth = self.cluster.growth
+        self.assertEqual(growth["size"], (2,3,2))
+        # existing vertices keep their indexes
+        self.assertTrue(np.array_equal(self.cluster.vertices.coords[:len(coords)], coords))
+        self.assertEqual(growth["vertices"], len(coords))
+
+        CrystalCluster.geometryCache.clear()
+        expected = CrystalCluster(self.UC, self.lattice, (3,4,2))
+        self.assertTrue(expected.growth is None)
+        self.assertEqual(self.get_edges_set(self.cluster), self.get_edges_set(expected))
+        self.assertEqual(len(self.cluster.edges.ids), len(expected.edges.ids))
+        for key, ind in self.cluster.edges.array_ind.items():
+            self.assertTrue(np.all(self.cluster.edges.ids[ind.start:ind.stop] == key))
+        self.assertEqual(len(growth["edges"]), len(expected.edges.ids) - 
+                         len(CrystalCluster(self.UC, self.lattice, (2,3,2)).edges.ids))
+        
+        # shrinking cluster is not incremental
+        self.cluster.reset_size((1,1,1))
+        self.assertTrue(self.cluster.growth is None)
+
+    def test_compute_apply_size(self):
+
+        cluster = self.cluster.compute_size((3,2,1))
+        # computing the new geometry doesn't change the current cluster
+        self.assertEqual(self.cluster.size, (2,3,2))
+        self.cluster.apply_size(cluster)
+        self.assertEqual(self.cluster.size, (3,2,1))
+        expected = CrystalCluster(self.UC, self.lattice, (3,2,1))
+        self.assertTrue(np.array_equal(self.cluster.edges.source_target,
+                                       expected.edges.source_target))
+        self.assertTrue(np.allclose(self.cluster.vertices.coords,
+                                    expected.vertices.coords))
+
+        lattice, UC = create_test_UC()
+        with self.assertRaises(ValueError):
+            self.cluster.apply_size(CrystalCluster(UC, lattice, (1,1,1)))
+
+    def test_compute_size_snapshot(self):
+
+        for ARRAY_STORAGE in (False, True):
+            lattice, UC = create_test_UC(ARRAY_STORAGE=ARRAY_STORAGE)
+            cluster = CrystalCluster(UC, lattice, (2,3,2))
+            expected = CrystalCluster(UC, lattice, (3,3,2)).edges.source_target
+            # the copy is taken before UC is edited, the resize is computed after
+            resized = cluster.copy_for_resize(UC.snapshot())
+            UC.remove_edge(3)
+            UC.add_edges([(1,2)], [(1,1,0)])
+            UC.add_vertex(Vertex(0,0,[0.7,0.7,0.7]))
+            CrystalCluster.geometryCache.clear()
+            resized = cluster.compute_size((3,3,2), resized)
+            self.assertTrue(np.array_equal(resized.edges.source_target, expected))
+            self.assertEqual(len(resized.vertices.ids), 2*18)
+            cluster.apply_size(resized)
+            self.assertTrue(cluster.UC is UC and cluster.edges.UC is UC)
+
+
+class ClusterMatricesTest(unittest.TestCase):
+    '''Test the sparse matrices of the cluster graph'''
+
+    def setUp(self):
+
+        self.lattice, self.UC = create_test_UC()
+        self.cluster = CrystalCluster(self.UC, self.lattice, (2,3,2))
+        self.tmpDir = tempfile.mkdtemp()
+
+    def tearDown(self):
+
+        shutil.rmtree(self.tmpDir)
+
+    def get_dense_adjacency(self, couplings):
+        '''returns adjacency matrix built edge by edge'''
+
+        num = len(self.cluster.vertices.ids)
+        matrix = np.zeros((num, num))
+        edges = self.cluster.edges
+        for (source, target), _type in zip(edges.source_target, edges.types):
+            matrix[source, target] += couplings.get(_type, 0)
+            matrix[target, source] += couplings.get(_type, 0)
+        return matrix
+
+    @unittest.skipIf(sparse is None, "scipy is not installed")
+    def test_adjacency(self):
+
+        couplings = {0: 1.0, 1: -0.5}
+        adjacency = self.cluster.get_adjacency(couplings=couplings)
+        self.assertTrue(sparse.isspmatrix_csr(adjacency))
+        self.assertTrue(np.allclose(adjacency.toarray(), 
+                                    self.get_dense_adjacency(couplings)))
+        typed = self.cluster.get_adjacency(1, FORMAT="coo")
+        self.assertTrue(np.array_equal(typed.toarray(), 
+                                       self.get_dense_adjacency({1: 1})))
+        ones = dict((_type, 1) for _type in set(self.cluster.edges.types))
+        self.assertTrue(np.array_equal(self.cluster.get_degrees(),
+                        self.get_dense_adjacency(ones).sum(axis=1)))
+        self.assertTrue(self.cluster.get_adjacency(couplings=couplings) is adjacency)
+
+        incidence, index = self.cluster.get_incidence(1)
+        self.assertEqual(incidence.shape, (len(self.cluster.vertices.ids), len(index)))
+        self.assertTrue(np.all(self.cluster.edges.types[index] == 1))
+        # B*B^T = D - A
+        laplacian = (incidence.dot(incidence.T)).toarray()
+        adjacency = typed.toarray()
+        self.assertTrue(np.array_equal(laplacian, 
+                                       np.diag(adjacency.sum(axis=1)) - adjacency))
+
+    @unittest.skipIf(sparse is None, "scipy is not installed")
+    def test_invalidation(self):
+
+        adjacency = self.cluster.get_adjacency()
+        degrees = self.cluster.get_degrees()
+        self.cluster.edges.change_edge_type(1, 3)
+        self.assertEqual(self.cluster.get_adjacency(3).nnz, 2*np.sum(
+                         self.cluster.edges.types == 3))
+        self.cluster.edges.remove_edge(3)
+        self.assertTrue(self.cluster.get_degrees().sum() < degrees.sum())
+        self.cluster.reset_size((3,3,2))
+        self.assertTrue(self.cluster.get_adjacency().shape[0] > adjacency.shape[0])
+        ones = dict((_type, 1) for _type in set(self.cluster.edges.types))
+        self.assertTrue(np.array_equal(self.cluster.get_adjacency().toarray(),
+                                       self.get_dense_adjacency(ones)))
+
+    def test_export_npz(self):
+
+        fileName = os.path.join(self.tmpDir, "graph.npz")
+        self.cluster.export_npz(fileName, couplings={0: 2.0})
+        data = np.load(fileName)
+        row, col, values = self.cluster.get_adjacency_coo(couplings={0: 2.0})
+        self.assertTrue(np.array_equal(data["row"], row))
+        self.assertTrue(np.all(data["data"] == 2.0))
+        self.assertEqual(len(data["edges_types"]), len(self.cluster.edges.ids))
+        if sparse is not None:
+            matrix = sparse.load_npz(fileName)
+            self.assertTrue(np.array_equal(matrix.toarray(), 
+                                           self.get_dense_adjacency({0: 2.0})))
+
+
+class GeometryCacheTest(unittest.TestCase):
+    '''Test the LRU cache of the cluster geometry'''
+
+    def setUp(self):
+
+        self.sharedCache = CrystalCluster.geometryCache
+        CrystalCluster.geometryCache = GeometryCache(max_entries=2)
+        self.lattice, self.UC = create_test_UC()
+
+    def tearDown(self):
+
+        CrystalCluster.geometryCache = self.sharedCache
+
+    def test_fingerprint(self):
+
+        lattice, UC = create_test_UC()
+        self.assertEqual(UC.fingerprint(), self.UC.fingerprint())
+        self.assertEqual(lattice.fingerprint(), self.lattice.fingerprint())
+        UC.edges[1].type = 3
+        self.assertNotEqual(UC.fingerprint(), self.UC.fingerprint())
+        UC.remove_edge(1)
+        self.assertNotEqual(UC.fingerprint(), self.UC.fingerprint())
+        UC.vertices[1].coords = np.array([0.2,0.2,0.25])
+        self.assertNotEqual(UC.fingerprint(), self.UC.fingerprint())
+        self.assertNotEqual(Lattice().fingerprint(), self.lattice.fingerprint())
+
+    def test_cache_hits(self):
+
+        cache = CrystalCluster.geometryCache
+        cluster = CrystalCluster(self.UC, self.lattice, (2,3,2))
+        expected = cluster.edges.source_target.copy()
+        cluster.reset_size((3,1,1))
+        coords = cluster.vertices.coords
+        cluster.reset_size((2,3,2))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 2)
+        self.assertTrue(np.array_equal(cluster.edges.source_target, expected))
+
+        # the same graph imported again is a cache hit
+        lattice, UC = create_test_UC()
+        other = CrystalCluster(UC, lattice, (3,1,1))
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertTrue(np.array_equal(other.vertices.coords, coords))
+        # edges of the cluster created from cache can be edited
+        other.edges.remove_edge(1)
+        other.edges.add_edge(0, 1)
+        self.assertEqual(len(cluster.edges.source_target), len(expected))
+
+        # least recently used entry is evicted
+        cluster.reset_size((1,1,1))
+        self.assertEqual(cache.stats()["entries"], 2)
+        cluster.reset_size((2,3,2))
+        self.assertEqual(cache.stats()["misses"], 4)
+
+
+class ExportXMLTest(unittest.TestCase):
+    '''Test the streaming XML export'''
+
+    def setUp(self):
+
+        self.lattice, self.UC = create_test_UC()
+        self.UC.atrib["name"] = 'a&b <"UC">'
+
+    def test_xml_string(self):
+
+        exporter = ExportXML(self.lattice, self.UC, "test", NEW_ID=False)
+        xml = exporter.get_xml_string()
+        self.assertTrue(xml.startswith('<LATTICES>\n  <LATTICEGRAPH name="test">\n'))
+        self.assertTrue(xml.endswith('    </UNITCELL>\n  </LATTICEGRAPH>\n</LATTICES>'))
+        # the output is indented in the same way as ElementTree would do it
+        lib = ET.fromstring(xml)
+        self.assertEqual(ET.tostring(lib).decode(), xml)
+        UNITCELL = lib.find("LATTICEGRAPH/UNITCELL")
+        self.assertEqual(UNITCELL.get("name"), 'a&b <"UC">')
+        EDGES = UNITCELL.findall("EDGE")
+        self.assertEqual(len(EDGES), self.UC.num_edges)
+        self.assertEqual(EDGES[1].get("id"), "2")
+        self.assertEqual(EDGES[1].find("TARGET").get("offset"), "0 0 1")
+
+    def test_export_to_lib(self):
+
+        exporter = ExportXML(self.lattice, self.UC, "test")
+        fd, fileName = tempfile.mkstemp(suffix=".xml")
+        os.close(fd)
+        try:
+            exporter.export_to_lib(fileName)
+            with open(fileName) as f:
+                self.assertEqual(f.read(), exporter.get_xml_string())
+        finally:
+            os.remove(fileName)
+
+
+class ParseXMLTest(unittest.TestCase):
+    '''Test the indexed parsing of the XML library'''
+
+    def setUp(self):
+
+        self.fileName = os.path.join(os.path.dirname(__file__), "testALPS_lib.xml")
+        self.parser = ParseXML(fileName=self.fileName)
+
+    def test_names(self):
+
+        names = self.parser.get_LATTICEGRAPH_names()
+        self.assertEqual(len(names), 31)
+        self.assertEqual(names[0], "square lattice 3x3")
+        self.assertTrue("simple2d" in self.parser.index["UNITCELL"])
+        # library tree is not built for indexing
+        self.assertTrue(self.parser._LATTICES is None)
+
+    def test_parse_refs(self):
+
+        lattice, UC = self.parser.parse_LATTICEGRAPH("square lattice 3x3")
+        self.assertTrue(np.allclose(lattice.basisMatrix, np.diag([1,1,0])))
+        self.assertEqual(lattice.atrib["name"], "square lattice")
+        self.assertEqual(UC.atrib["name"], "simple2d")
+        self.assertEqual((UC.num_vertices, UC.num_edges), (1, 2))
+
+    def test_export_parse(self):
+
+        lattice, UC = create_test_UC()
+        xml = ExportXML(lattice, UC, "test").get_xml_string()
+        parser = ParseXML(string=xml)
+        self.assertEqual(parser.get_LATTICEGRAPH_names(), ["test"])
+        lattice2, UC2 = parser.parse_LATTICEGRAPH("test")
+        self.assertTrue(np.allclose(lattice.basisMatrix, lattice2.basisMatrix))
+        self.assertEqual(str(UC), str(UC2))
+
+
+class ParseCacheTest(unittest.TestCase):
+    '''Test the persistent cache of parsed lattice graphs'''
+
+    def setUp(self):
+
+        self.cacheDir = tempfile.mkdtemp()
+        self.cache = ParseCache(self.cacheDir)
+        self.fileName = os.path.join(os.path.dirname(__file__), "testALPS_lib.xml")
+
+    def tearDown(self):
+
+        shutil.rmtree(self.cacheDir)
+
+    def test_cached_graph(self):
+
+        name = "simple cubic lattice"
+        lattice, UC = ParseXML(fileName=self.fileName).parse_LATTICEGRAPH(name)
+        parser = ParseXML(fileName=self.fileName, cache=self.cache)
+        parser.parse_LATTICEGRAPH(name)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 1))
+
+        parser = ParseXML(fileName=self.fileName, cache=self.cache)
+        self.assertEqual(parser.index, ParseXML(fileName=self.fileName).index)
+        lattice2, UC2 = parser.parse_LATTICEGRAPH(name)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+        self.assertTrue(np.array_equal(lattice.basisMatrix, lattice2.basisMatrix))
+        self.assertEqual(lattice.atrib, lattice2.atrib)
+        self.assertEqual(UC.atrib, UC2.atrib)
+        self.assertEqual(str(UC), str(UC2))
+        self.assertEqual(UC.lengthDic, UC2.lengthDic)
+
+    def test_eviction(self):
+
+        parser = ParseXML(fileName=self.fileName, cache=self.cache)
+        for name in parser.get_LATTICEGRAPH_names()[:5]:
+            parser.parse_LATTICEGRAPH(name)
+        self.assertEqual(len(os.listdir(self.cacheDir)), 6)
+
+        self.cache.max_size = 1
+        self.cache.evict()
+        self.assertEqual(len(os.listdir(self.cacheDir)), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
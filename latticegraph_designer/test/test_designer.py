@@ -67,6 +67,7 @@ H=2'''.format(libFile)
 from latticegraph_designer.app.core import Vertex, Edge, UnitCell, Lattice, CrystalCluster
 from latticegraph_designer.app.mpl_pane import GraphEdgesEditor
 from matplotlib.backend_bases import KeyEvent, MouseEvent
+from matplotlib.colors import hex2color
 import matplotlib.pyplot as plt
 import numpy as np
 
@@ -96,8 +97,8 @@ class GeeMethodsTest(unittest.TestCase):
         self.setUp()        
         self.assertEqual(self.gee.UC.num_vertices, 2)        
         self.assertEqual(self.gee.UC.num_edges, 6)        
-        self.assertEqual(len(self.ax.artists), 6+1+4*4+4*3) # arrows + new edge + edges
-        self.assertEqual(len(self.gee.edges_lines), 28)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
+        self.assertEqual(len(self.gee.edges_segments), 28)
 
     def test_clear(self):
         
@@ -105,10 +106,12 @@ class GeeMethodsTest(unittest.TestCase):
         self.gee.clearEdges_callback()
         
         self.assertEqual(self.gee.UC.num_edges, 0)
-        self.assertEqual(len(self.ax.artists), 6+1) # arrows + new edge
-        self.assertEqual(len(self.gee.edges_lines), 0)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
+        self.assertEqual(len(self.gee.edges_segments), 0)
  
     def addEdge(self, source, target):
+        # vertices are stored site by site, e.g. for 2 vertices in UC: 
+        # 0 - vertex 1 at (0,0,0), 1 - vertex 2 at (0,0,0), 8 - vertex 1 at (1,0,0)
 
         self.gee.v_source_ind = source
         self.gee.v_target_ind = target       
@@ -119,75 +122,133 @@ class GeeMethodsTest(unittest.TestCase):
         self.setUp()
         self.gee.clearEdges_callback()
         
-        self.addEdge(0, 8)
+        self.addEdge(0, 1)
         self.assertEqual(self.gee.UC.num_edges, 1)
-        self.assertEqual(len(self.gee.edges_lines), 8)
-        self.assertEqual(len(self.ax.artists), 6+1+8)
+        self.assertEqual(len(self.gee.edges_segments), 8)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
 
-        self.addEdge(0, 4)
+        self.addEdge(0, 8)
         self.assertEqual(self.gee.UC.num_edges, 2)
-        self.assertEqual(len(self.gee.edges_lines), 8+4)
-        self.assertEqual(len(self.ax.artists), 6+1+8+4)
+        self.assertEqual(len(self.gee.edges_segments), 8+4)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
   
         self.gee.select_edge(1)
         self.gee.delete_active_edge_callback()
         self.assertEqual(self.gee.UC.num_edges, 1)
-        self.assertEqual(len(self.gee.edges_lines), 4)
-        self.assertEqual(len(self.ax.artists), 6+1+4)
+        self.assertEqual(len(self.gee.edges_segments), 4)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
   
     def test_edgeSelection(self):
         
         self.setUp()
         self.gee.clearEdges_callback()       
-        self.addEdge(0, 8)
-        self.addEdge(0, 4)        
+        self.addEdge(0, 1)
+        self.addEdge(0, 8)        
  
         # select edge
         _id = 2
         self.gee.select_edge(_id)
         self.assertTrue(self.gee.e_active_ind == _id)
-        for j in self.gee.edges.array_ind[_id]:             
-            self.assertTrue(self.gee.edges_lines[j].get_color() == self.gee.color_active)
-            self.assertTrue(self.gee.edges_lines[j].get_linewidth() == self.gee.lw_active)
+        # highlighted by overlay: 3 points (source, target, nan) per segment
+        self.assertEqual(len(self.gee.edges_active.get_xdata()),
+                         3*len(self.gee.edges.array_ind[_id]))
         
         # test unselect edge
         self.gee.select_edge(None)
         self.assertTrue(self.gee.e_active_ind is None)
+        self.assertEqual(len(self.gee.edges_active.get_xdata()), 0)
         color = self.gee.colors_e[self.UC.edges[_id].type]
         for j in self.gee.edges.array_ind[_id]:             
-            self.assertTrue(self.gee.edges_lines[j].get_color() == color)
-            self.assertTrue(self.gee.edges_lines[j].get_linewidth() == self.gee.lw)
+            self.assertTrue(np.allclose(self.gee.edges_colors[j,:3], hex2color(color)))
+            self.assertTrue(self.gee.edges_lw[j] == self.gee.lw)
        
         # test edge unselection by selecting another edge
         self.gee.select_edge(_id)
         id_new = 1
         self.gee.select_edge(id_new)
         self.assertTrue(self.gee.e_active_ind == id_new)
-        for j in self.gee.edges.array_ind[id_new]:             
-            self.assertTrue(self.gee.edges_lines[j].get_color() == self.gee.color_active)
-            self.assertTrue(self.gee.edges_lines[j].get_linewidth() == self.gee.lw_active)
+        # highlighted by overlay: 3 points (source, target, nan) per segment
+        self.assertEqual(len(self.gee.edges_active.get_xdata()),
+                         3*len(self.gee.edges.array_ind[id_new]))
         #check if previous active unselected
         color = self.gee.colors_e[self.UC.edges[_id].type]
         for j in self.gee.edges.array_ind[_id]:             
-            self.assertTrue(self.gee.edges_lines[j].get_color() == color)
-            self.assertTrue(self.gee.edges_lines[j].get_linewidth() == self.gee.lw)
+            self.assertTrue(np.allclose(self.gee.edges_colors[j,:3], hex2color(color)))
+            self.assertTrue(self.gee.edges_lw[j] == self.gee.lw)
+        
+    def test_edgePicking(self):
+        
+        self.setUp()
+        self.gee.clearEdges_callback()       
+        self.addEdge(0, 8)
+        self.gee.update_XY_scr()
+        
+        # point in the middle of the edge
+        x = (self.gee.x_scr[0] + self.gee.x_scr[8])/2
+        y = (self.gee.y_scr[0] + self.gee.y_scr[8])/2
+        event = MouseEvent('button_press_event', self.fig.canvas, x, y)
+        self.assertEqual(self.gee.get_edge_under_point(event), 1)
+        
+        # point far from all the edges
+        x, y = min(self.gee.x_scr) - 100, min(self.gee.y_scr) - 100
+        event = MouseEvent('button_press_event', self.fig.canvas, x, y)
+        self.assertTrue(self.gee.get_edge_under_point(event) is None)
+        
+    def test_LOD(self):
+        '''testing level of detail mode used during rotation'''
+        
+        self.setUp()
+        self.assertFalse(self.gee.use_LOD()) # small cluster
+        self.gee.enter_LOD()
+        self.assertEqual(len(self.gee.LOD_artists), 0)
+        
+        self.gee.LOD_edges = 10
+        self.gee.enter_LOD()
+        self.assertEqual(len(self.gee.LOD_artists), 3) # edges, outline, vertices
+        self.assertFalse(self.gee.edges_lines.get_visible())
+        self.assertEqual(len(self.cluster.latticeOutline), 12)
+        
+        self.assertTrue(self.gee.exit_LOD())
+        self.assertEqual(len(self.gee.LOD_artists), 0)
+        self.assertTrue(self.gee.edges_lines.get_visible())
+        self.assertFalse(self.gee.exit_LOD())
+        
+    def test_growCluster(self):
+        '''growing cluster extends the existing artists'''
         
+        self.setUp()
+        self.gee.select_edge(1)
+        sc, edges_lines = self.gee.sc, self.gee.edges_lines
+        self.gee.reset_size((3,2,2))
+        self.assertTrue(self.gee.cluster.growth is not None)
+        self.assertTrue(self.gee.sc is sc and self.gee.edges_lines is edges_lines)
+        self.assertEqual(len(self.gee.x), 2*3*2*2)
+        self.assertEqual(len(self.gee.edges_segments), len(self.gee.edges.ids))
+        self.assertTrue(np.allclose(self.gee.edges_segments,
+                                    self.gee.xyz[self.gee.edges.source_target]))
+        self.assertEqual(self.gee.e_active_ind, 1) # selection is kept
+        
+        # shrinking cluster recreates the artists
+        self.gee.reset_size((2,2,2))
+        self.assertTrue(self.gee.cluster.growth is None)
+        self.assertEqual(len(self.gee.edges_segments), 28)
+
     def test_searchActiveDistEdge(self):
 
         self.setUp()
         self.gee.clearEdges_callback()        
+        self.addEdge(0, 1)
         self.addEdge(0, 8)
-        self.addEdge(0, 4)
 
         self.assertEqual(self.gee.UC.num_edges, 1+1)
-        self.assertEqual(len(self.gee.edges_lines), 8+4)
-        self.assertEqual(len(self.ax.artists), 6+1+8+4)
+        self.assertEqual(len(self.gee.edges_segments), 8+4)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
 
         self.gee.select_edge(2)
         self.gee.searchActiveDistEdge_callback()
         self.assertEqual(self.gee.UC.num_edges, 1+4) # 4 edges simmilar to 2 found
-        self.assertEqual(len(self.gee.edges_lines), 8+4*4)
-        self.assertEqual(len(self.ax.artists), 6+1+8+4*4)
+        self.assertEqual(len(self.gee.edges_segments), 8+4*4)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
         
     def test_xml_ImportExport(self):
         
@@ -209,55 +270,62 @@ class GeeMethodsTest(unittest.TestCase):
         # check initialization
         self.assertEqual(self.gee.UC.num_vertices, 2)        
         self.assertEqual(self.gee.UC.num_edges, 6)        
-        self.assertEqual(len(self.ax.artists), 6+1+4*4+4*3) # arrows + new edge + edges
-        self.assertEqual(len(self.gee.edges_lines), 28)
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
+        self.assertEqual(len(self.gee.edges_segments), 28)
 
-    def test_USE_COLLECTIONS(self):
-        '''testing the usage of lineCollection for depicting edges'''
+    def test_edgesCollection(self):
+        '''testing the usage of single lineCollection for depicting edges'''
 
-        GraphEdgesEditor.USE_COLLECTIONS = True
         self.setUp()
-        try:
-            self.assertEqual(self.gee.UC.num_vertices, 2)        
-            self.assertEqual(self.gee.UC.num_edges, 6)        
-            self.assertEqual(len(self.ax.artists), 6+1) # arrows + new edge
-            self.assertEqual(len(self.gee.edges_lines), 6)
-            # collections: vertices, lattice, edges
-            self.assertEqual(len(self.ax.collections), 1+1+6) 
-
-            # select edge
-            _id = 3
-            self.gee.select_edge(_id)
-            self.assertTrue(self.gee.e_active_ind == _id)
-
-            # remove edge
-            self.gee.delete_active_edge_callback()
-            self.assertEqual(self.gee.UC.num_edges, 5)
-            self.assertEqual(len(self.gee.edges_lines), 5)
-            # collections: vertices, lattice, edges
-            self.assertEqual(len(self.ax.collections), 1+1+5) 
-
-            # clear edges
-            self.gee.clearEdges_callback()
-            self.assertEqual(self.gee.UC.num_edges, 0)        
-            self.assertEqual(len(self.ax.artists), 6+1) # arrows + new edge
-            self.assertEqual(len(self.gee.edges_lines), 0)
-            # collections: vertices, lattice, edges
-            self.assertEqual(len(self.ax.collections), 1+1+0) 
-            
-            # add edge
-            self.addEdge(0, 4)
-            self.assertEqual(self.gee.UC.num_edges, 1)
-            self.assertEqual(len(self.gee.edges_lines), 1)
-            # collections: vertices, lattice, edges
-            self.assertEqual(len(self.ax.collections), 1+1+1) 
-                  
-        except:  # we have to  set USE_COLLECTIONS=False for other tests
-            GraphEdgesEditor.USE_COLLECTIONS = False
-            raise
-            
-        finally:    
-            GraphEdgesEditor.USE_COLLECTIONS = False
+        self.assertEqual(self.gee.UC.num_vertices, 2)        
+        self.assertEqual(self.gee.UC.num_edges, 6)        
+        self.assertEqual(len(self.ax.artists), 6+2) # arrows + new edge + active edges
+        self.assertEqual(len(self.gee.edges_segments), 28)
+        # collections: vertices, lattice, edges
+        self.assertEqual(len(self.ax.collections), 1+1+1) 
+        self.assertTrue(np.allclose(self.gee.edges_segments, 
+                            self.gee.xyz[self.gee.edges.source_target]))
+
+        # change type of the group of edges at once
+        self.gee.select_edges([1, 2])
+        self.gee.change_active_edge_type(4)
+        index = np.concatenate([list(self.gee.edges.array_ind[j]) for j in (1, 2)])
+        self.assertTrue(np.allclose(self.gee.edges_colors[index,:3], 
+                                    hex2color(self.gee.colors_e[4])))
+        self.assertTrue(np.all(self.gee.edges_lw[index] == self.gee.lw))
+        self.gee.select_edges([])
+
+        # select edge
+        _id = 3
+        self.gee.select_edge(_id)
+        self.assertTrue(self.gee.e_active_ind == _id)
+
+        # remove edge
+        self.gee.delete_active_edge_callback()
+        self.assertEqual(self.gee.UC.num_edges, 5)
+        self.assertEqual(len(self.gee.edges_segments), 28-4)
+        self.assertEqual(len(self.gee.edges_colors), 28-4)
+        self.assertEqual(len(self.gee.edges_lw), 28-4)
+        self.assertTrue(np.allclose(self.gee.edges_segments, 
+                            self.gee.xyz[self.gee.edges.source_target]))
+        self.assertEqual(len(self.ax.collections), 1+1+1) 
+
+        # clear edges
+        self.gee.clearEdges_callback()
+        self.assertEqual(self.gee.UC.num_edges, 0)        
+        self.assertEqual(len(self.gee.edges_segments), 0)
+        self.assertEqual(len(self.ax.collections), 1+1+1) 
+        
+        # add edge
+        self.addEdge(0, 8)
+        self.assertEqual(self.gee.UC.num_edges, 1)
+        self.assertEqual(len(self.gee.edges_segments), 4)
+        self.assertEqual(len(self.ax.collections), 1+1+1) 
+
+        # invisible edge type is drawn transparent
+        self.gee.visible_e[:] = False
+        self.gee.set_artists_properties()
+        self.assertTrue(np.all(self.gee.edges_colors[:,3] == 0))
 
 class GeeInteractionTest(unittest.TestCase):
     '''Test the mpl_pane keybounding and mouse manipulation'''
@@ -281,8 +349,8 @@ class GeeInteractionTest(unittest.TestCase):
         self.assertTrue(self.gee.UC.edges[_id].type == new_type)
         color = self.gee.colors_e[new_type]
         for j in self.gee.edges.array_ind[_id]:             
-            self.assertTrue(self.gee.edges_lines[j].get_color() == color)
-            self.assertTrue(self.gee.edges_lines[j].get_linewidth() == self.gee.lw)
+            self.assertTrue(np.allclose(self.gee.edges_colors[j,:3], hex2color(color)))
+            self.assertTrue(self.gee.edges_lw[j] == self.gee.lw)
 
         self.canvas.key_press_event('delete')        
         
@@ -380,7 +448,7 @@ class GeeInteractionTest(unittest.TestCase):
         # draw potential edge
         self.canvas.motion_notify_event(x=30, y=30)
         # select target vertex
-        target_ind = 4
+        target_ind = 8
         x_data, y_data = self.gee.x_scr[target_ind], self.gee.y_scr[target_ind]
         self.canvas.motion_notify_event(x=x_data, y=y_data)  
         self.canvas.button_release_event(x=x_data, y=y_data, button=1)
@@ -396,11 +464,11 @@ class GeeInteractionTest(unittest.TestCase):
         self.assertTrue(self.gee.e_active_ind is None)
         color = self.gee.colors_e[self.gee.UC.edges[_id].type]
         for j in self.gee.edges.array_ind[_id]:             
-            self.assertTrue(self.gee.edges_lines[j].get_color() == color)
-            self.assertTrue(self.gee.edges_lines[j].get_linewidth() == self.gee.lw)
+            self.assertTrue(np.allclose(self.gee.edges_colors[j,:3], hex2color(color)))
+            self.assertTrue(self.gee.edges_lw[j] == self.gee.lw)
 
         # select the edge
-        source_ind, target_ind = 0, 4
+        source_ind, target_ind = 0, 8
         x_data = (self.gee.x_scr[source_ind] + self.gee.x_scr[target_ind])/2
         y_data = (self.gee.y_scr[source_ind] + self.gee.y_scr[target_ind])/2
         # simulate selection
@@ -408,9 +476,9 @@ class GeeInteractionTest(unittest.TestCase):
         self.canvas.button_press_event(x=x_data, y=y_data, button=1)
         self.canvas.button_release_event(x=x_data, y=y_data, button=1)
         self.assertTrue(self.gee.e_active_ind == _id)
-        for j in self.gee.edges.array_ind[_id]:             
-            self.assertTrue(self.gee.edges_lines[j].get_color() == self.gee.color_active)
-            self.assertTrue(self.gee.edges_lines[j].get_linewidth() == self.gee.lw_active)
+        # highlighted by overlay: 3 points (source, target, nan) per segment
+        self.assertEqual(len(self.gee.edges_active.get_xdata()),
+                         3*len(self.gee.edges.array_ind[_id]))
 
         # search for edges having the same length as selected
         self.mainWindow.action_AddSimEdges.trigger()
@@ -519,6 +587,40 @@ class MainWindowTest(unittest.TestCase):
 
         self.dlgDistSearch.btnClose.click()
 
+    def test_DistShells(self):
+        
+        self.test_ImportCIF() 
+        self.mainWindow.action_AddDistEdges.trigger()
+        self.dlgDistSearch = self.mainWindow.dlgDistSearch
+        
+        lw = self.dlgDistSearch.listWidget        
+        # suggested coordination shells are not checked
+        self.dlgDistSearch.btnShells.click()
+        self.assertEqual(lw.count(), self.dlgDistSearch.SHELLS_NUM+1)
+        data = lw.get_data()[:-1]
+        self.assertEqual([item["dist"] for item in data[:3]], [3.4647, 5.5046, 5.5143])
+        self.assertFalse(any(item["bool"] for item in data))
+        # selecting suggested shell doesn't select any edges
+        lw.setCurrentItem(lw.item(0))
+        self.assertEqual(len(self.mainWindow.gee.e_activeDist_ids), 0)
+        # search edges of the nearest shell
+        lw.itemWidget(lw.item(0)).checkBox.setChecked(True)
+        self.dlgDistSearch.btnSearch.click()
+        self.assertEqual(self.mainWindow.cluster.UC.num_edges, 4)
+        # lengths grouped in a chain: shell is wider than the tolerance
+        cluster = self.mainWindow.cluster
+        cluster.UC.clearEdges()
+        cluster.UC.add_edges([(1,1)]*5, [(1,0,0),(0,1,0),(0,0,1),(1,1,0),(1,0,1)],
+                             lengths=[1.0, 1.0001, 1.0002, 1.0003, 1.0004])
+        cluster.edges.process_edges(cluster.size)
+        self.mainWindow.gee.create_artists_graph()
+        self.mainWindow.unitCellChanged.emit()
+        self.assertEqual(lw.count(), 2)
+        lw.setCurrentItem(lw.item(0))
+        self.assertEqual(len(self.mainWindow.gee.e_activeDist_ids), 5)
+        
+        self.dlgDistSearch.btnClose.click()
+
  
     def ExportXML(self, fn_output):
         
@@ -543,15 +645,18 @@ class MainWindowTest(unittest.TestCase):
     def test_resetSize(self):
         
         self.test_ImportXML()
-        self.assertEqual(len(self.mainWindow.gee.ax.artists), 1+6+4*4+4*3)
+        self.assertEqual(len(self.mainWindow.gee.edges_segments), 4*4+4*3)
         self.mainWindow.spinBox_sizeL.setValue(3)
-        self.assertEqual(len(self.mainWindow.gee.ax.artists), 1+6+4*7+6*3)
+        self.mainWindow.flush_resize() # resize is computed by worker thread
+        self.assertEqual(len(self.mainWindow.gee.edges_segments), 4*7+6*3)
         
         self.mainWindow.spinBox_sizeW.setValue(3)
-        self.assertEqual(len(self.mainWindow.gee.ax.artists), 1+6+4*12+9*3)
+        self.mainWindow.flush_resize()
+        self.assertEqual(len(self.mainWindow.gee.edges_segments), 4*12+9*3)
         
         self.mainWindow.spinBox_sizeH.setValue(3)
-        self.assertEqual(len(self.mainWindow.gee.ax.artists), 1+6+6*12+9*5)
+        self.mainWindow.flush_resize()
+        self.assertEqual(len(self.mainWindow.gee.edges_segments), 6*12+9*5)
 
     def test_changeEdgeType(self):
         
@@ -83,7 +83,7 @@ setup(
               'latticegraph_designer.widgets', 
               'latticegraph_designer.test', 
               'mpl_animationmanager'],
-    scripts=['scripts/graphdesigner'],
+    scripts=['scripts/graphdesigner', 'scripts/latticegraph-designer'],
     install_requires=install_requires,
     platforms='any',
     include_package_data=True,
@@ -104,5 +104,6 @@ setup(
         ],
     extras_require={
         'testing': ['unittest'],
+        'sparse': ['scipy'],
     }
 )